@@ -0,0 +1,55 @@
+"""partial unique index on deployed model version
+
+Revision ID: a7c3e91d0b52
+Revises: f0c98594aa8d
+Create Date: 2026-10-17 10:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e91d0b52'
+down_revision: Union[str, Sequence[str], None] = 'f0c98594aa8d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # enforces "exactly one deployed version per org" and turns the
+    # org_id + status lookup into a single index probe
+    duplicated = op.get_bind().execute(sa.text(
+        "SELECT org_id, count(*) FROM model_version "
+        "WHERE status = 'COLLECTING_FEEDBACK' "
+        "GROUP BY org_id HAVING count(*) > 1"
+    )).all()
+
+    if duplicated:
+        # which of them is the real deployed version is not ours to guess
+        orgs = ", ".join(f"{org_id} ({count} versions)" for org_id, count in duplicated)
+        raise RuntimeError(
+            "Cannot create uq_model_version_org_collecting: these organizations "
+            f"have more than one COLLECTING_FEEDBACK model version: {orgs}. "
+            "Move all but the deployed one to another status, then re-run the migration."
+        )
+
+    op.create_index(
+        'uq_model_version_org_collecting',
+        'model_version',
+        ['org_id'],
+        unique=True,
+        postgresql_where=sa.text("status = 'COLLECTING_FEEDBACK'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'uq_model_version_org_collecting',
+        table_name='model_version',
+        postgresql_where=sa.text("status = 'COLLECTING_FEEDBACK'"),
+    )
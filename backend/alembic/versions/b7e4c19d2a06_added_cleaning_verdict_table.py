@@ -0,0 +1,36 @@
+"""added cleaning_verdict table
+
+Revision ID: b7e4c19d2a06
+Revises: f5a2c8d41b96
+Create Date: 2026-10-17 21:05:12.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c19d2a06'
+down_revision: Union[str, Sequence[str], None] = 'f5a2c8d41b96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cleaning_verdict',
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('classifier', sa.String(), nullable=False),
+        sa.Column('scores', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('fingerprint', 'classifier'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cleaning_verdict')
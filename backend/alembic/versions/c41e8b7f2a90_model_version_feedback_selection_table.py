@@ -0,0 +1,84 @@
+"""model_version_feedback selection table
+
+Revision ID: c41e8b7f2a90
+Revises: a7c3e91d0b52
+Create Date: 2026-10-17 13:48:05.402311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e8b7f2a90'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e91d0b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'model_version_feedback',
+        sa.Column('model_version_id', sa.UUID(), nullable=False),
+        sa.Column('feedback_id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['model_version_id'], ['model_version.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['feedback_id'], ['feedback.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('model_version_id', 'feedback_id'),
+    )
+    op.create_index(
+        op.f('ix_model_version_feedback_feedback_id'),
+        'model_version_feedback',
+        ['feedback_id'],
+        unique=False,
+    )
+
+    # 1. copy the existing selections; ids pointing at deleted feedback are dropped
+    op.execute(
+        """
+        INSERT INTO model_version_feedback (model_version_id, feedback_id)
+        SELECT DISTINCT mv.id, f.id
+        FROM model_version mv
+        CROSS JOIN LATERAL unnest(mv.feedback_ids) AS sel(feedback_id)
+        JOIN feedback f ON f.id = sel.feedback_id
+        """
+    )
+
+    # 2. the table is now the single source of truth
+    op.drop_column('model_version', 'feedback_ids')
+
+    op.create_index(
+        'ix_feedback_org_version_created',
+        'feedback',
+        ['org_id', 'model_version_id', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_feedback_org_version_created', table_name='feedback')
+
+    op.add_column(
+        'model_version',
+        sa.Column('feedback_ids', postgresql.ARRAY(sa.UUID()), server_default='{}', nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE model_version mv
+        SET feedback_ids = sel.ids
+        FROM (
+            SELECT model_version_id, array_agg(feedback_id ORDER BY created_at) AS ids
+            FROM model_version_feedback
+            GROUP BY model_version_id
+        ) sel
+        WHERE sel.model_version_id = mv.id
+        """
+    )
+    op.alter_column('model_version', 'feedback_ids', server_default=None)
+
+    op.drop_index(op.f('ix_model_version_feedback_feedback_id'), table_name='model_version_feedback')
+    op.drop_table('model_version_feedback')
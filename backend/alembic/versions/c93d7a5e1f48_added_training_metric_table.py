@@ -0,0 +1,47 @@
+"""added training_metric table
+
+Revision ID: c93d7a5e1f48
+Revises: b7e4c19d2a06
+Create Date: 2026-10-17 23:52:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c93d7a5e1f48'
+down_revision: Union[str, Sequence[str], None] = 'b7e4c19d2a06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'training_metric',
+        sa.Column('job_id', sa.UUID(), nullable=False),
+        sa.Column('step', sa.Integer(), nullable=False),
+        sa.Column('model_version_id', sa.UUID(), nullable=False),
+        sa.Column('max_steps', sa.Integer(), nullable=True),
+        sa.Column('epoch', sa.Float(), nullable=True),
+        sa.Column('loss', sa.Float(), nullable=True),
+        sa.Column('learning_rate', sa.Float(), nullable=True),
+        sa.Column('grad_norm', sa.Float(), nullable=True),
+        sa.Column('step_seconds', sa.Float(), nullable=True),
+        sa.Column('tokens_per_second', sa.Float(), nullable=True),
+        sa.Column('peak_memory_mb', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['job.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['model_version_id'], ['model_version.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('job_id', 'step'),
+    )
+    op.create_index(op.f('ix_training_metric_model_version_id'), 'training_metric', ['model_version_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_training_metric_model_version_id'), table_name='training_metric')
+    op.drop_table('training_metric')
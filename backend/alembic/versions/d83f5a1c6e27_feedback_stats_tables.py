@@ -0,0 +1,84 @@
+"""feedback stats tables
+
+Revision ID: d83f5a1c6e27
+Revises: c41e8b7f2a90
+Create Date: 2026-10-17 16:20:37.551942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd83f5a1c6e27'
+down_revision: Union[str, Sequence[str], None] = 'c41e8b7f2a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'feedback_stats',
+        sa.Column('model_version_id', sa.UUID(), nullable=False),
+        sa.Column('scope', sa.String(), nullable=False),
+        sa.Column('org_id', sa.UUID(), nullable=False),
+        sa.Column('total_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_bad', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_neutral', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_good', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('corrected_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['model_version_id'], ['model_version.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['org_id'], ['organization.id']),
+        sa.PrimaryKeyConstraint('model_version_id', 'scope'),
+    )
+    op.create_index(op.f('ix_feedback_stats_org_id'), 'feedback_stats', ['org_id'], unique=False)
+
+    op.create_table(
+        'feedback_tag_stats',
+        sa.Column('model_version_id', sa.UUID(), nullable=False),
+        sa.Column('scope', sa.String(), nullable=False),
+        sa.Column('tag', sa.Text(), nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['model_version_id'], ['model_version.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('model_version_id', 'scope', 'tag'),
+    )
+
+    # backfill, same aggregates as feedback_stats --rebuild
+    for scope, version, source in (
+        ('all', 'f.model_version_id', 'FROM feedback f'),
+        ('selected', 's.model_version_id',
+         'FROM model_version_feedback s JOIN feedback f ON f.id = s.feedback_id'),
+    ):
+        op.execute(
+            f"""
+            INSERT INTO feedback_stats (model_version_id, scope, org_id, total_count,
+                                        rating_bad, rating_neutral, rating_good, corrected_count)
+            SELECT {version}, '{scope}', f.org_id, count(*),
+                   count(*) FILTER (WHERE f.rating = -1),
+                   count(*) FILTER (WHERE f.rating = 0),
+                   count(*) FILTER (WHERE f.rating = 1),
+                   count(*) FILTER (WHERE coalesce(f.corrected_response, '') <> '')
+            {source}
+            GROUP BY {version}, f.org_id
+            """
+        )
+        op.execute(
+            f"""
+            INSERT INTO feedback_tag_stats (model_version_id, scope, tag, count)
+            SELECT {version}, '{scope}', t.tag::text, count(*)
+            {source}
+            CROSS JOIN LATERAL unnest(f.tags) AS t(tag)
+            GROUP BY {version}, t.tag
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('feedback_tag_stats')
+    op.drop_index(op.f('ix_feedback_stats_org_id'), table_name='feedback_stats')
+    op.drop_table('feedback_stats')
@@ -0,0 +1,28 @@
+"""added external_id to job
+
+Revision ID: f5a2c8d41b96
+Revises: e2b6d09a4f13
+Create Date: 2026-10-17 19:20:41.218733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a2c8d41b96'
+down_revision: Union[str, Sequence[str], None] = 'e2b6d09a4f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job', sa.Column('external_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('job', 'external_id')
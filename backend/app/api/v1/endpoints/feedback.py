@@ -1,26 +1,58 @@
 import os
+import uuid
 from typing import Optional
-import requests
 import sqlalchemy as sa
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy import cast
-from sqlalchemy.dialects.postgresql import ARRAY
-from app.schemas.feedback import AddFeedbackRequest, FeedbackFilterResponse, GenerateRequest, GenerateResponse, FeedbackRequest, feedbackResponse
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from app.schemas.feedback import AddFeedbackRequest, BulkFeedbackRequest, BulkFeedbackResponse, FeedbackBatchResponse, FeedbackFilterResponse, FeedbackStatsResponse, GenerateRequest, GenerateResponse, FeedbackRequest, feedbackResponse
 from sqlalchemy.orm import session
 from app.db.session import session_local
-from app.db.models import Feedback, ModelVersion, Organization
+from app.db.models import Feedback, ModelVersion, ModelVersionFeedback, Organization
 from app.api.deps import get_db
 from app.services.jwt_helper import get_org_context
 
-from fastapi import Depends, HTTPException, status, Request
+from fastapi import Depends, Header, HTTPException, status, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import requests
+import httpx
 import json
-
-from app.services.feedback import extract_by_path
+import time
+
+from app.services.feedback import (
+    FEEDBACK_RATINGS,
+    FEEDBACK_TAGS,
+    decode_feedback_cursor,
+    encode_feedback_cursor,
+    feedback_filter_conditions,
+    feedback_out,
+    insert_feedback_rows,
+    parse_feedback_batch,
+    selected_for_training,
+    sse_event,
+    validate_feedback_row,
+)
+from app.services.feedback_stats import STATS_COLUMNS, load_feedback_stats, record_feedback_stats
+from app.services.feedback_writer import FEEDBACK_WRITE_BEHIND, feedback_writer
+from app.services.hmac_auth import get_hmac_org_context
+from app.services.llm_adapter import DEFAULT_STREAM_DONE_MARKER, get_llm_adapter
+from app.services.llm_client import iter_sse_data, open_llm_stream, send_llm_request
+from app.services.model_version import (
+    count_selected_feedback,
+    get_deployed_version,
+    get_deployed_version_id,
+    lock_deployed_version_id,
+    selected_feedback_query,
+)
 
 router = APIRouter()
 
+FEEDBACK_BATCH_MAX_ROWS = int(os.getenv("FEEDBACK_BATCH_MAX_ROWS", "10000"))
+FEEDBACK_FILTER_MAX_LIMIT = int(os.getenv("FEEDBACK_FILTER_MAX_LIMIT", "1000"))
+FEEDBACK_STREAM_BATCH_ROWS = int(os.getenv("FEEDBACK_STREAM_BATCH_ROWS", "500"))
+FEEDBACK_BULK_MAX_IDS = int(os.getenv("FEEDBACK_BULK_MAX_IDS", "10000"))
+
 OPENAI_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = "llama-3.1-8b-instant"  # cheap, fast, great for feedback systems
 OPENAI_URL = "https://api.groq.com/openai/v1/chat/completions"
@@ -30,14 +62,7 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
-@router.post("/generate", response_model=GenerateResponse)
-def generate_text(
-    payload: GenerateRequest,
-    ctx=Depends(get_org_context),
-    db: Session = Depends(get_db),
-):
-    org_id = ctx["org_id"]
-
+def _load_generation_context(db: Session, org_id):
     # load org
     org = (
         db.query(Organization)
@@ -51,79 +76,52 @@ def generate_text(
             detail="Invalid organization",
         )
 
-    if not org.inference_url or not org.llm_api_key:
+    if not org.inference_url or not org.llm_api_key_encrypted:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Organization LLM configuration missing",
         )
 
-    # load deployed model version (exactly one)
-    model_version = (
-        db.query(ModelVersion)
-        .filter(
-            ModelVersion.org_id == org.id,
-            ModelVersion.status == "COLLECTING_FEEDBACK",
-        )
-        .one_or_none()
-    )
+    # deployed model version (exactly one, cached per org)
+    model_version_id = get_deployed_version_id(db, org.id)
 
-    if not model_version:
+    if not model_version_id:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="No deployed model or model is being finetuned.",
         )
 
-    # call LLM
-    schema = org.llm_request_schema or {}
-
-    request_mapping = schema.get("request_mapping", {})
-    payload_defaults = schema.get("payload_defaults", {})
-
-    request_body = {}
-
-    # canonical inputs
-    canonical_payload = {
-        "model": org.model,
-        "messages": [{"role": "user", "content": payload.prompt}],
-        "temperature": payload.temperature,
-        "max_tokens": payload.max_tokens,
-    }
+    return org, model_version_id
 
-    # apply defaults
-    for k, v in payload_defaults.items():
-        canonical_payload.setdefault(k, v)
-
-    # map canonical → provider
-    for canonical_key, provider_key in request_mapping.items():
-        if canonical_key in canonical_payload and provider_key:
-            request_body[provider_key] = canonical_payload[canonical_key]
-
-    
-    if org.model:
-        request_body["model"] = org.model
-    
-    headers = {
-        "Content-Type": "application/json",
-    }
 
-    auth_cfg = schema.get("auth")
+@router.post("/generate", response_model=GenerateResponse)
+async def generate_text(
+    payload: GenerateRequest,
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    org_id = ctx["org_id"]
 
-    if auth_cfg and org.llm_api_key:
-        header_name = auth_cfg.get("header", "Authorization")
-        prefix = auth_cfg.get("prefix", "")
-        headers[header_name] = f"{prefix}{org.llm_api_key}"
+    # DB access is sync, keep it off the event loop
+    org, _ = await run_in_threadpool(_load_generation_context, db, org_id)
 
-    
-    method = schema.get("method", "POST").upper()
-
-    response = requests.request(
-        method=method,
-        url=org.inference_url,
-        headers=headers,
-        json=request_body,
-        timeout=30,
-    )
+    # call LLM
+    adapter = get_llm_adapter(org)
+    method, headers, request_body = adapter.build_request(payload)
 
+    try:
+        response = await send_llm_request(
+            org.id,
+            method,
+            adapter.url,
+            headers,
+            request_body,
+        )
+    except httpx.HTTPError:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="LLM request failed",
+        )
 
     if response.status_code != 200:
         raise HTTPException(
@@ -132,14 +130,7 @@ def generate_text(
         )
 
     try:
-        response_json = response.json()
-        response_mapping = schema.get("response_mapping", {})
-        text_path = response_mapping.get("text")
-
-        if not text_path:
-            raise KeyError("response_mapping.text missing")
-
-        generated_text = extract_by_path(response_json, text_path)
+        generated_text = adapter.extract_text(response.json())
 
     except Exception:
         raise HTTPException(
@@ -152,6 +143,108 @@ def generate_text(
 
 
 
+@router.post("/generate-stream")
+async def generate_text_stream(
+    payload: GenerateRequest,
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Same as /generate, but relays the upstream token stream to the browser
+    as server-sent events:
+
+      event: token  data: {"text": "..."}
+      event: done   data: {"output": "<full text>", "ttft_ms": ..., "total_ms": ...}
+      event: error  data: {"detail": "..."}
+
+    Upstream failures, including before the first token, arrive as an
+    error event.
+    """
+    org_id = ctx["org_id"]
+
+    org, _ = await run_in_threadpool(_load_generation_context, db, org_id)
+
+    adapter = get_llm_adapter(org)
+    method, headers, request_body = adapter.build_request(payload, stream=True)
+
+    started = time.perf_counter()
+
+    async def events():
+        chunks = []
+        ttft_ms = None
+
+        # the upstream call (and its org / host slots) is opened here, so it
+        # only exists while the body is being sent and is always released
+        try:
+            response, stack = await open_llm_stream(
+                org.id,
+                method,
+                adapter.url,
+                headers,
+                request_body,
+            )
+        except HTTPException as e:
+            # no free org / host slot
+            yield sse_event("error", {"detail": e.detail})
+            return
+        except httpx.HTTPError:
+            yield sse_event("error", {"detail": "LLM request failed"})
+            return
+
+        try:
+            if response.status_code != 200:
+                yield sse_event("error", {"detail": "LLM request failed"})
+                return
+
+            async for data in iter_sse_data(response):
+                if data == DEFAULT_STREAM_DONE_MARKER:
+                    break
+
+                try:
+                    text = adapter.extract_stream_text(json.loads(data))
+                except (ValueError, KeyError, IndexError, TypeError):
+                    # role-only deltas, finish chunks, keep-alives
+                    continue
+
+                if not text:
+                    continue
+
+                if ttft_ms is None:
+                    ttft_ms = round((time.perf_counter() - started) * 1000, 1)
+
+                chunks.append(text)
+                yield sse_event("token", {"text": text})
+
+        except httpx.HTTPError:
+            yield sse_event("error", {"detail": "LLM stream interrupted"})
+            return
+
+        finally:
+            await stack.aclose()
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        print(f"generate-stream org={org_id} ttft_ms={ttft_ms} total_ms={total_ms}")
+
+        yield sse_event(
+            "done",
+            {
+                "output": "".join(chunks),
+                "ttft_ms": ttft_ms,
+                "total_ms": total_ms,
+            },
+        )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+
 @router.post(
     "/store-feedback",
     status_code=status.HTTP_201_CREATED,
@@ -159,36 +252,62 @@ def generate_text(
 )
 def store_feedback(
     payload: FeedbackRequest,
+    response: Response,
     ctx=Depends(get_org_context),
     db: Session = Depends(get_db)
 ):
     org_id = ctx["org_id"]
 
-    # load deployed model version (single source of truth)
-    model_version = (
-        db.query(ModelVersion)
-        .filter(
-            ModelVersion.org_id == org_id,
-            ModelVersion.status == "COLLECTING_FEEDBACK",
+    # ---- write-behind: validate now, persist in the background ----
+    # (stored synchronously below if the writer thread is not running)
+    if FEEDBACK_WRITE_BEHIND and feedback_writer.running:
+        # status re-checked here, and again under a lock when the row is written
+        model_version = get_deployed_version(db, org_id)
+
+        if not model_version:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="No deployed model version to attach feedback",
+            )
+
+        try:
+            validate_feedback_row(payload.model_dump())
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e),
+            )
+
+        queued = feedback_writer.enqueue(
+            {
+                "id": uuid.uuid4(),
+                "org_id": org_id,
+                "model_version_id": model_version.id,
+                "prompt": payload.prompt,
+                "model_response": payload.model_response,
+                "corrected_response": payload.corrected_response,
+                "rating": payload.rating,
+                "tags": payload.tags,
+            }
         )
-        .one_or_none()
-    )
 
-    if not model_version:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="No deployed model version to attach feedback",
-        )
-    
-    if model_version.status != "COLLECTING_FEEDBACK":
-        raise HTTPException(
-            status_code=400,
-            detail="Training already requested or in progress",
-        )
+        if queued:
+            response.status_code = status.HTTP_202_ACCEPTED
+            return {"message": "Feedback accepted"}
+
+        if feedback_writer.running:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Feedback queue is full, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+    # deployed model version (single source of truth), locked until commit
+    model_version_id = _lock_deployed_version(db, org_id, "No deployed model version to attach feedback")
 
     feedback = Feedback(
         org_id=org_id,
-        model_version_id=model_version.id,
+        model_version_id=model_version_id,
         prompt=payload.prompt,
         model_response=payload.model_response,
         corrected_response=payload.corrected_response,
@@ -198,6 +317,7 @@ def store_feedback(
 
     try:
         db.add(feedback)
+        record_feedback_stats(db, [feedback], "all")
         db.commit()
     except Exception:
         db.rollback()
@@ -210,90 +330,226 @@ def store_feedback(
 
 
 
+@router.post("/ingest-batch", response_model=FeedbackBatchResponse)
+def ingest_feedback_batch(
+    content_type: Optional[str] = Header(default=None),
+    ctx=Depends(get_hmac_org_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Server-to-server bulk ingestion, HMAC-signed (see get_hmac_org_context).
+    Body is NDJSON (Content-Type: application/x-ndjson) or a JSON list of
+    FeedbackRequest rows. Invalid rows are rejected individually; valid rows
+    are written in one multi-row INSERT and a single commit.
+    """
+    org_id = ctx["org_id"]
+
+    try:
+        raw_rows = parse_feedback_batch(ctx["body"], content_type)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Malformed batch body",
+        )
+
+    if len(raw_rows) > FEEDBACK_BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {FEEDBACK_BATCH_MAX_ROWS} rows",
+        )
+
+    # ---- one deployed-version lookup per batch, locked until commit ----
+    model_version_id = _lock_deployed_version(db, org_id, "No deployed model version to attach feedback")
+
+    rows = []
+    results = []
+
+    for index, raw in enumerate(raw_rows):
+        try:
+            fb = validate_feedback_row(raw)
+        except ValueError as e:
+            results.append({"index": index, "status": "rejected", "error": str(e)[:200]})
+            continue
+
+        feedback_id = uuid.uuid4()
+        rows.append(
+            {
+                "id": feedback_id,
+                "org_id": org_id,
+                "model_version_id": model_version_id,
+                "prompt": fb.prompt,
+                "model_response": fb.model_response,
+                "corrected_response": fb.corrected_response,
+                "rating": fb.rating,
+                "tags": fb.tags,
+            }
+        )
+        results.append({"index": index, "status": "accepted", "id": feedback_id})
+
+    try:
+        insert_feedback_rows(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not store feedback batch",
+        )
+
+    return {
+        "model_version_id": model_version_id,
+        "accepted": len(rows),
+        "rejected": len(raw_rows) - len(rows),
+        "results": results,
+    }
+
+
+
+_FEEDBACK_OUT_COLUMNS = (
+    Feedback.id,
+    Feedback.prompt,
+    Feedback.model_response,
+    Feedback.corrected_response,
+    Feedback.tags,
+    Feedback.rating,
+    Feedback.created_at,
+)
+
+
+def _filter_feedback_query(
+    db: Session,
+    org_id,
+    model_version_id,
+    rating_list=None,
+    tag_list=None,
+    is_corrected=None,
+    after=None,
+):
+    """
+    Untrained feedback on the deployed version, newest first, as plain
+    column rows. `after` is a decoded (created_at, id) keyset cursor.
+    """
+    query = (
+        db.query(*_FEEDBACK_OUT_COLUMNS)
+        .filter(
+            *feedback_filter_conditions(
+                org_id, model_version_id, rating_list, tag_list, is_corrected
+            ),
+            ~selected_for_training(),
+        )
+    )
+
+    # ---- keyset: strictly older than the cursor row ----
+    if after is not None:
+        query = query.filter(
+            sa.tuple_(Feedback.created_at, Feedback.id) < sa.tuple_(*after)
+        )
+
+    return query.order_by(Feedback.created_at.desc(), Feedback.id.desc())
+
+
 @router.get("/filter", response_model=FeedbackFilterResponse)
 def filter_feedbacks(
     ratings: Optional[str] = None,
     tags: Optional[str] = None,
     has_correction: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=FEEDBACK_FILTER_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    stream: bool = False,
     ctx=Depends(get_org_context),
     db: Session = Depends(get_db),
 ):
+    """
+    Without `limit` every matching row is returned, as before. With `limit`
+    the response carries `next_cursor`; pass it back as `cursor` for the
+    next page. `stream=true` returns NDJSON (one FeedbackOut per line)
+    read through a server-side cursor, so memory stays flat.
+    """
     org_id = ctx["org_id"]
 
     # ---- get current deployed model version ----
-    deployed_version = (
-        db.query(ModelVersion)
-        .filter(
-            ModelVersion.org_id == org_id,
-            ModelVersion.status == "COLLECTING_FEEDBACK",
-        )
-        .one_or_none()
-    )
+    deployed_version_id = get_deployed_version_id(db, org_id)
 
-    if not deployed_version:
+    if not deployed_version_id:
         raise HTTPException(
             status_code=409,
             detail="No deployed model version",
         )
 
-    # ---- collect feedback_ids already used in training ----
-    used_feedback_ids = (
-        db.query(sa.func.unnest(ModelVersion.feedback_ids))
-        .filter(ModelVersion.org_id == org_id)
-        .subquery()
-    )
-
-    # ---- base query ----
-    query = (
-        db.query(Feedback)
-        .filter(
-            Feedback.org_id == org_id,
-            Feedback.model_version_id == deployed_version.id,
-            ~Feedback.id.in_(used_feedback_ids),
+    # ---- parse filters up front, a stream cannot fail after it starts ----
+    try:
+        rating_list = [int(r) for r in ratings.split(",")] if ratings else None
+        after = decode_feedback_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid ratings or cursor",
         )
+
+    tag_list = tags.split(",") if tags else None
+    is_corrected = (
+        has_correction.lower() in ("true", "1", "yes")
+        if has_correction is not None else None
     )
 
-    print(type(Feedback.tags.type))
-    print(Feedback.tags.type)
+    filters = (deployed_version_id, rating_list, tag_list, is_corrected, after)
 
+    if stream:
+        return StreamingResponse(
+            _stream_feedbacks(org_id, filters, limit),
+            media_type="application/x-ndjson",
+        )
 
-    # ---- ratings filter ----
-    if ratings:
-        rating_list = [int(r) for r in ratings.split(",")]
-        query = query.filter(Feedback.rating.in_(rating_list))
+    query = _filter_feedback_query(db, org_id, *filters)
 
-    # ---- tags filter ----
-    if tags:
-        tag_list = tags.split(",")
-        query = query.filter(
-            Feedback.tags.overlap(tag_list)
-        )
+    if limit is None:
+        return {"feedbacks": [feedback_out(row) for row in query.all()]}
 
-    # ---- correction filter ----
-    if has_correction is not None:
-        is_corrected = has_correction.lower() in ("true", "1", "yes")
-        if is_corrected:
-            query = query.filter(Feedback.corrected_response != "")
-        else:
-            query = query.filter(Feedback.corrected_response == "")
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
 
-    feedbacks = query.order_by(Feedback.created_at.desc()).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_feedback_cursor(rows[-1].created_at, rows[-1].id)
 
     return {
-        "feedbacks": [
-            {
-                "id": fb.id,
-                "prompt": fb.prompt,
-                "model_response": fb.model_response,
-                "corrected_response": fb.corrected_response,
-                "tags": fb.tags or [],
-                "rating": fb.rating,
-                "timestamp": fb.created_at,
-            }
-            for fb in feedbacks
-        ]
+        "feedbacks": [feedback_out(row) for row in rows],
+        "next_cursor": next_cursor,
     }
 
+
+def _stream_feedbacks(org_id, filters, limit):
+    # the request session is closed once the endpoint returns,
+    # so the stream owns its own
+    db = session_local()
+
+    try:
+        query = _filter_feedback_query(db, org_id, *filters)
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        rows = query.execution_options(yield_per=FEEDBACK_STREAM_BATCH_ROWS)
+
+        lines = []
+        for row in rows:
+            item = feedback_out(row)
+            item["id"] = str(item["id"])
+            item["timestamp"] = item["timestamp"].isoformat()
+            lines.append(json.dumps(item, ensure_ascii=False))
+
+            # one write per fetched batch, not per row
+            if len(lines) >= FEEDBACK_STREAM_BATCH_ROWS:
+                yield "\n".join(lines) + "\n"
+                lines = []
+
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    finally:
+        db.close()
+
+
 @router.post("/add-feedback", status_code=200)
 def add_feedback_to_model_version(
     payload: AddFeedbackRequest,
@@ -319,14 +575,7 @@ def add_feedback_to_model_version(
         )
 
     # ---- load deployed model version ----
-    model_version = (
-        db.query(ModelVersion)
-        .filter(
-            ModelVersion.org_id == org_id,
-            ModelVersion.status == "COLLECTING_FEEDBACK",
-        )
-        .one_or_none()
-    )
+    model_version = get_deployed_version(db, org_id)
 
     if not model_version:
         raise HTTPException(
@@ -347,20 +596,29 @@ def add_feedback_to_model_version(
             detail="Feedback does not belong to current model version",
         )
 
-    # ---- prevent duplicates ----
-    if payload.feedback_id in model_version.feedback_ids:
-        raise HTTPException(
-            status_code=409,
-            detail="Feedback already added for training",
-        )
-
-    # ---- append feedback id ----
-    model_version.feedback_ids = (
-        model_version.feedback_ids + [payload.feedback_id]
-    )
-
+    # ---- select, duplicates are a PK conflict ----
     try:
+        inserted = db.execute(
+            pg_insert(ModelVersionFeedback)
+            .values(
+                model_version_id=model_version.id,
+                feedback_id=payload.feedback_id,
+            )
+            .on_conflict_do_nothing()
+            .returning(ModelVersionFeedback.feedback_id)
+        ).first()
+
+        if inserted is None:
+            raise HTTPException(
+                status_code=409,
+                detail="Feedback already added for training",
+            )
+
+        record_feedback_stats(db, [feedback], "selected")
         db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception:
         db.rollback()
         raise HTTPException(
@@ -371,7 +629,7 @@ def add_feedback_to_model_version(
     return {
         "message": "Feedback added to training set",
         "model_version_id": model_version.id,
-        "total_feedbacks": len(model_version.feedback_ids),
+        "total_feedbacks": count_selected_feedback(db, model_version.id),
     }
 
 
@@ -400,14 +658,7 @@ def delete_feedback(
         )
 
     # ---- load deployed model version ----
-    model_version = (
-        db.query(ModelVersion)
-        .filter(
-            ModelVersion.org_id == org_id,
-            ModelVersion.status == "COLLECTING_FEEDBACK",
-        )
-        .one_or_none()
-    )
+    model_version = get_deployed_version(db, org_id)
 
     if not model_version:
         raise HTTPException(
@@ -424,16 +675,15 @@ def delete_feedback(
 
     
 
-    # ---- remove feedback id from model version ----
-    model_version.feedback_ids = [
-        fid for fid in model_version.feedback_ids
-        if fid != payload.feedback_id
-    ]
+    selected = db.get(ModelVersionFeedback, (model_version.id, feedback.id))
 
-    # ---- delete feedback row ----
+    # ---- delete feedback row (its selection rows cascade) ----
     db.delete(feedback)
 
     try:
+        record_feedback_stats(db, [feedback], "all", sign=-1)
+        if selected is not None:
+            record_feedback_stats(db, [feedback], "selected", sign=-1)
         db.commit()
     except Exception:
         db.rollback()
@@ -445,12 +695,242 @@ def delete_feedback(
     return {
         "message": "Feedback deleted successfully",
         "model_version_id": model_version.id,
-        "total_feedbacks": len(model_version.feedback_ids),
+        "total_feedbacks": count_selected_feedback(db, model_version.id),
     }
 
 
 
 
+def _lock_deployed_version(db: Session, org_id, detail: str = "No deployed model version"):
+    """
+    Resolve the deployed version and hold a share lock on it for the rest of
+    the transaction, so a concurrent start-training cannot move it on while
+    feedback is being written or a bulk change applied.
+    """
+    locked = lock_deployed_version_id(db, org_id)
+
+    if not locked:
+        raise HTTPException(
+            status_code=409,
+            detail=detail,
+        )
+
+    return locked
+
+
+def _bulk_conditions(payload: BulkFeedbackRequest, org_id, model_version_id, selected: bool):
+    """
+    WHERE clauses for the rows a bulk request targets. Explicit ids only need
+    ownership + version membership; filters pick from the same pool /filter
+    shows (unselected rows), or from the selected rows when `selected`.
+    """
+    if payload.feedback_ids is not None:
+        if len(payload.feedback_ids) > FEEDBACK_BULK_MAX_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {FEEDBACK_BULK_MAX_IDS} feedback_ids per request",
+            )
+
+        return feedback_filter_conditions(org_id, model_version_id) + [
+            Feedback.id.in_(payload.feedback_ids)
+        ]
+
+    filters = payload.filters
+
+    if not set(filters.ratings) <= FEEDBACK_RATINGS or not set(filters.tags) <= FEEDBACK_TAGS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Unknown rating or tag in filters",
+        )
+
+    conditions = feedback_filter_conditions(
+        org_id,
+        model_version_id,
+        filters.ratings,
+        filters.tags,
+        filters.has_correction,
+    )
+    conditions.append(selected_for_training() if selected else ~selected_for_training())
+    return conditions
+
+
+def _bulk_result(db: Session, payload: BulkFeedbackRequest, model_version_id, affected_ids):
+    affected = set(affected_ids)
+    rejected_ids = []
+
+    if payload.feedback_ids is not None:
+        rejected_ids = [fid for fid in dict.fromkeys(payload.feedback_ids) if fid not in affected]
+
+    return {
+        "model_version_id": model_version_id,
+        "accepted": len(affected),
+        "rejected": len(rejected_ids),
+        "rejected_ids": rejected_ids,
+        "total_feedbacks": count_selected_feedback(db, model_version_id),
+    }
+
+
+@router.post("/add-feedback-bulk", response_model=BulkFeedbackResponse)
+def add_feedback_bulk(
+    payload: BulkFeedbackRequest,
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Select many feedback rows for training in one INSERT ... SELECT.
+    Rows already selected count as rejected.
+    """
+    org_id = ctx["org_id"]
+    model_version_id = _lock_deployed_version(db, org_id)
+    conditions = _bulk_conditions(payload, org_id, model_version_id, selected=False)
+
+    stmt = (
+        pg_insert(ModelVersionFeedback)
+        .from_select(
+            ["model_version_id", "feedback_id"],
+            sa.select(
+                sa.literal(model_version_id, ModelVersionFeedback.model_version_id.type),
+                Feedback.id,
+            ).where(*conditions),
+        )
+        .on_conflict_do_nothing()
+        .returning(ModelVersionFeedback.feedback_id)
+        .cte("added")
+    )
+
+    try:
+        added = db.execute(
+            sa.select(*STATS_COLUMNS).join(stmt, stmt.c.feedback_id == Feedback.id)
+        ).all()
+        record_feedback_stats(db, added, "selected")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail="Could not add feedback to training set",
+        )
+
+    return _bulk_result(db, payload, model_version_id, [row.id for row in added])
+
+
+@router.post("/remove-feedback-bulk", response_model=BulkFeedbackResponse)
+def remove_feedback_bulk(
+    payload: BulkFeedbackRequest,
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Deselect many feedback rows; the feedback itself is kept.
+    Rows that were not selected count as rejected.
+    """
+    org_id = ctx["org_id"]
+    model_version_id = _lock_deployed_version(db, org_id)
+    conditions = _bulk_conditions(payload, org_id, model_version_id, selected=True)
+
+    stmt = (
+        sa.delete(ModelVersionFeedback)
+        .where(
+            ModelVersionFeedback.model_version_id == model_version_id,
+            ModelVersionFeedback.feedback_id.in_(
+                sa.select(Feedback.id).where(*conditions)
+            ),
+        )
+        .returning(ModelVersionFeedback.feedback_id)
+        .cte("removed")
+    )
+
+    try:
+        removed = db.execute(
+            sa.select(*STATS_COLUMNS).join(stmt, stmt.c.feedback_id == Feedback.id)
+        ).all()
+        record_feedback_stats(db, removed, "selected", sign=-1)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail="Could not remove feedback from training set",
+        )
+
+    return _bulk_result(db, payload, model_version_id, [row.id for row in removed])
+
+
+@router.post("/delete-feedback-bulk", response_model=BulkFeedbackResponse)
+def delete_feedback_bulk(
+    payload: BulkFeedbackRequest,
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Delete many feedback rows on the deployed version (their selections
+    cascade). With filters, only rows /filter would show are deleted.
+    """
+    org_id = ctx["org_id"]
+    model_version_id = _lock_deployed_version(db, org_id)
+    conditions = _bulk_conditions(payload, org_id, model_version_id, selected=False)
+
+    # RETURNING sees the pre-delete snapshot, so `selected` is still accurate
+    stmt = (
+        sa.delete(Feedback)
+        .where(*conditions)
+        .returning(*STATS_COLUMNS, selected_for_training().label("selected"))
+        .execution_options(synchronize_session=False)
+    )
+
+    try:
+        deleted = db.execute(stmt).all()
+        record_feedback_stats(db, deleted, "all", sign=-1)
+        record_feedback_stats(db, [row for row in deleted if row.selected], "selected", sign=-1)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail="Could not delete feedback",
+        )
+
+    return _bulk_result(db, payload, model_version_id, [row.id for row in deleted])
+
+
+
+
+@router.get("/stats", response_model=FeedbackStatsResponse)
+def get_feedback_stats(
+    model_version_id: Optional[uuid.UUID] = None,
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Ratings / tags / correction breakdown for a model version (default: the
+    deployed one), read from the maintained feedback_stats totals.
+    """
+    org_id = ctx["org_id"]
+
+    if model_version_id is None:
+        model_version_id = get_deployed_version_id(db, org_id)
+    else:
+        model_version_id = (
+            db.query(ModelVersion.id)
+            .filter(
+                ModelVersion.id == model_version_id,
+                ModelVersion.org_id == org_id,
+            )
+            .scalar()
+        )
+
+    if not model_version_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Model version not found",
+        )
+
+    return {
+        "model_version_id": model_version_id,
+        **load_feedback_stats(db, model_version_id),
+    }
+
+
 @router.get("/get-training-stats", status_code=status.HTTP_200_OK)
 def get_training_stats(
     ctx=Depends(get_org_context),
@@ -471,19 +951,9 @@ def get_training_stats(
             detail="No model version found",
         )
 
-    if not model_version.feedback_ids:
-        return {
-            "model": model_version.organization.model,
-            "version": model_version.version,
-            "feedbacks": [],
-        }
-
     feedbacks = (
-        db.query(Feedback)
-        .filter(
-            Feedback.id.in_(model_version.feedback_ids),
-            Feedback.org_id == org_id,
-        )
+        selected_feedback_query(db, model_version.id)
+        .filter(Feedback.org_id == org_id)
         .order_by(Feedback.created_at.asc())
         .all()
     )
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List
+from uuid import UUID
 
 from app.db.models import ModelVersion
 from app.schemas.model_version import ModelVersionOut
 from app.api.deps import get_db
+from app.services.adapter_archive import adapter_archive
 from app.services.jwt_helper import get_org_context
 
 router = APIRouter()
@@ -28,3 +31,35 @@ def get_models(
     )
 
     return models
+
+
+@router.get("/{model_version_id}/adapter")
+def download_adapter(
+    model_version_id: UUID,
+    db: Session = Depends(get_db),
+    ctx=Depends(get_org_context),
+):
+    """
+    The version's LoRA adapter (safetensors weights, config, tokenizer) as
+    one zip, assembled from its artifact-store manifest.
+    """
+    model_version = (
+        db.query(ModelVersion)
+        .filter(ModelVersion.id == model_version_id, ModelVersion.org_id == ctx["org_id"])
+        .one_or_none()
+    )
+
+    if not model_version or not model_version.adapter_url:
+        raise HTTPException(404, "Adapter not found")
+
+    try:
+        archive = adapter_archive(model_version)
+    except Exception as e:
+        print(f"adapter download {model_version_id} failed: {type(e).__name__}: {e}")
+        raise HTTPException(502, "Could not fetch the adapter")
+
+    return FileResponse(
+        archive,
+        media_type="application/zip",
+        filename=f"lora_adapter_v{model_version.version}.zip",
+    )
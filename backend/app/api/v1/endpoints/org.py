@@ -9,7 +9,8 @@ from app.db.session import session_local
 from app.api.deps import get_db
 from app.db.models import Organization
 from sqlalchemy.exc import IntegrityError
-from app.services.jwt_helper import create_org_token
+from app.services.jwt_helper import create_org_token, get_org_context
+from app.services.hmac_auth import org_hmac_secret
 # to generate hmac
 import secrets
 
@@ -165,4 +166,29 @@ def verify_login_otp(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="could not verify OTP",
         )
-    
\ No newline at end of file
+
+
+@router.get("/hmac-secret", status_code=status.HTTP_200_OK)
+def get_hmac_secret(
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Secret used to sign server-to-server calls such as /v1/feedback/ingest-batch.
+    """
+    org = (
+        db.query(Organization)
+        .filter(Organization.id == ctx["org_id"])
+        .first()
+    )
+
+    if not org:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found"
+        )
+
+    return {
+        "org_id": org.id,
+        "hmac_secret": org_hmac_secret(org),
+    }
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from app.db.models import ModelVersion, Feedback
+from app.db.models import ModelVersion
+from app.services.feedback_stats import feedback_total
 from app.services.jwt_helper import get_org_context
 from app.schemas.sidebar import SidebarResponse
 from app.api.deps import get_db
@@ -43,11 +43,7 @@ def get_sidebar_data(
      # ---------------------------
     # Feedback
     # ---------------------------
-    feedback_count = (
-        db.query(func.count(Feedback.id))
-        .filter(Feedback.org_id == org_id, Feedback.model_version_id == latest_model.id)
-        .scalar()
-    )
+    feedback_count = feedback_total(db, latest_model.id) if latest_model else 0
 
     return {
         "org_id": org_id,
@@ -1,25 +1,51 @@
-import json
-from pathlib import Path
+import os
+import time
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from requests import Session
+from sqlalchemy.exc import IntegrityError
 
 from app.api.deps import get_db
-from app.db.models import Feedback, ModelVersion
+from app.db.models import Job, ModelVersion
+from app.db.session import session_local
 from app.services.jwt_helper import get_org_context
-from app.schemas.jsonl_cleaning import cpu_clean
-from app.schemas.training import AdapterConfigRequestSchema
-from app.services.training import trigger_training
-from app.services.supabase_upload import upload_jsonl
-from app.services.gpu_cleaning import trigger_gpu_cleaning
+from app.schemas.job import JobAccepted, JobOut
+from app.schemas.training import (
+    AdapterConfigRequestSchema,
+    TrainingCallbackSchema,
+    TrainingMetricsSchema,
+    TrainingProgressOut,
+)
+from app.services.dataset_preparation import PREPARE_DATASET
+from app.services.feedback import sse_event
+from app.services.hmac_auth import verify_training_callback
+from app.services.jobs import JOB_TERMINAL, create_job, submit_job
+from app.services.model_version import count_selected_feedback
+from app.services.training_dispatch import (
+    TRAIN_LORA,
+    complete_training,
+    fail_training,
+    warm_start_mismatch,
+    warm_start_parent,
+)
+from app.services.training_telemetry import store_metrics, training_progress
 
 router = APIRouter()
 
-@router.post("/start-training", status_code=202)
+JOB_STREAM_POLL_SECONDS = float(os.getenv("JOB_STREAM_POLL_SECONDS", "1"))
+
+@router.post("/start-training", status_code=202, response_model=JobAccepted)
 def generate_jsonl(
     ctx=Depends(get_org_context),
     db: Session = Depends(get_db),
 ):
+    """
+    Queue dataset preparation (clean, upload, GPU clean) for the latest
+    version. Poll /jobs/{job_id} or stream /jobs/{job_id}/stream; the
+    version moves to TRAINING_REQUESTED when the job succeeds.
+    """
     org_id = ctx["org_id"]
 
     model_version = (
@@ -35,85 +61,107 @@ def generate_jsonl(
     if model_version.status != "COLLECTING_FEEDBACK":
         raise HTTPException(400, "Training already requested or in progress")
 
-    if not model_version.feedback_ids:
+    if not count_selected_feedback(db, model_version.id):
         raise HTTPException(400, "No feedbacks selected for training")
 
-    output_dir = Path("training_data")
-    output_dir.mkdir(exist_ok=True)
-
-    cpu_file_path = output_dir / f"{model_version.id}_cpu.jsonl"
-
-    raw_feedbacks = (
-        db.query(Feedback)
-        .filter(
-            Feedback.id.in_(model_version.feedback_ids),
-            Feedback.org_id == org_id,
-        )
-        .all()
-    )
-
-    # 1️⃣ CPU clean
-    cpu_cleaned_feedbacks = cpu_clean(raw_feedbacks)
-
-    if not cpu_cleaned_feedbacks:
-        raise HTTPException(400, "No valid feedbacks after CPU cleaning")
-
-    # 2️⃣ write CPU-cleaned JSONL
-    with cpu_file_path.open("w", encoding="utf-8") as f:
-        for fb in cpu_cleaned_feedbacks:
-            f.write(
-                json.dumps(
-                    {
-                        "instruction": fb.prompt.strip(),
-                        "input": fb.model_response.strip(),
-                        "output": (fb.corrected_response or "").strip(),
-                    },
-                    ensure_ascii=False,
-                )
-                + "\n"
-            )
-
-    # 3️⃣ upload CPU-cleaned JSONL
-    cpu_object_path = f"{org_id}/{model_version.id}/cpu_cleaned.jsonl"
-
     try:
-        cpu_jsonl_url = upload_jsonl(cpu_file_path, cpu_object_path)
-    except Exception as e:
-        raise HTTPException(500, f"CPU upload failed: {str(e)}")
+        job = create_job(db, org_id, model_version.id, PREPARE_DATASET)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, "Training dataset is already being prepared")
 
-    # 4️⃣ trigger GPU cleaning (Modal)
-    gpu_result = trigger_gpu_cleaning(cpu_jsonl_url)
+    submit_job(job.id)
 
-    cleaned_jsonl_url = gpu_result["cleaned_jsonl_url"]
-    row_count = gpu_result["rows_kept"]
+    return {
+        "message": "Training dataset preparation queued",
+        "job_id": job.id,
+        "status": job.status,
+    }
 
-    if row_count == 0:
-        raise HTTPException(400, "No valid feedbacks after GPU cleaning")
 
-    # 5️⃣ lifecycle transition
-    model_version.status = "TRAINING_REQUESTED"
-    model_version.json_url = cleaned_jsonl_url
-    model_version.row_count = row_count
+def _get_org_job(db: Session, org_id, job_id) -> Job:
+    job = (
+        db.query(Job)
+        .filter(Job.id == job_id, Job.org_id == org_id)
+        .one_or_none()
+    )
 
-    db.commit()
+    if not job:
+        raise HTTPException(404, "Job not found")
 
-    return {
-        "message": "Training dataset created",
-        "json_url": cleaned_jsonl_url,
-        "rows": row_count,
-        "status": model_version.status,
-    }
+    return job
 
 
+@router.get("/jobs/{job_id}", response_model=JobOut)
+def get_job(
+    job_id: UUID,
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    return _get_org_job(db, ctx["org_id"], job_id)
 
 
+@router.get("/jobs/{job_id}/stream")
+def stream_job(
+    job_id: UUID,
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Server-sent events: "progress" whenever status/stage/progress changes,
+    then one "done" with the final job.
+    """
+    org_id = ctx["org_id"]
+    _get_org_job(db, org_id, job_id)
+
+    def events():
+        last = None
+
+        while True:
+            poll_db = session_local()
+            try:
+                job = JobOut.model_validate(_get_org_job(poll_db, org_id, job_id))
+            finally:
+                poll_db.close()
+
+            if job.status in JOB_TERMINAL:
+                yield sse_event("done", job.model_dump(mode="json"))
+                return
+
+            current = (job.status, job.stage, job.progress)
+            if current != last:
+                last = current
+                yield sse_event(
+                    "progress",
+                    {"status": job.status, "stage": job.stage, "progress": job.progress},
+                )
+            else:
+                yield ": keep-alive\n\n"
+
+            time.sleep(JOB_STREAM_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
 
-@router.post("/configure-lora", status_code=status.HTTP_201_CREATED)
+
+@router.post("/configure-lora", status_code=202)
 def configure_lora_adapter(
     payload: AdapterConfigRequestSchema,
     ctx=Depends(get_org_context),
     db: Session = Depends(get_db),
 ):
+    """
+    Store the adapter config and dispatch training. Returns immediately;
+    the version turns READY (and the next one is created) when the
+    training job reports back, see /jobs/{job_id}.
+    """
     org_id = ctx["org_id"]
 
     model_version = (
@@ -135,37 +183,95 @@ def configure_lora_adapter(
     if model_version.status not in ["TRAINING_REQUESTED"]:
         raise HTTPException(400, "Adapter config can no longer be modified")
 
-    
-    model_version.adapter_config = payload.model_dump()
-    model_version.status = "TRAINING_IN_PROGRESS"
-
-    db.commit()
-    db.refresh(model_version)
+    adapter_config = payload.model_dump()
 
-    # print('passing: ', model_version)
-    result = trigger_training(
-        model_version_id=str(model_version.id),
-        json_url=model_version.json_url,
-        adapter_config_json=json.dumps(model_version.adapter_config),
-    )
+    if payload.training.warm_start:
+        parent = warm_start_parent(db, model_version)
+        if parent is None:
+            raise HTTPException(400, "Warm start needs a READY parent version with an adapter")
 
-    model_version.status = "READY"
-    model_version.adapter_url = result["adapter_dir"]
+        mismatch = warm_start_mismatch(parent, adapter_config)
+        if mismatch:
+            raise HTTPException(400, f"Cannot warm start: {mismatch}")
 
-    next_model_version = ModelVersion(
-        org_id = model_version.org_id,
-        version = model_version.version + 1,
-        parent_model_version_id = model_version.id,
-        feedback_ids=[],
-        status="COLLECTING_FEEDBACK",
-        sha256="bootstrap"
-    )
+    model_version.adapter_config = adapter_config
+    model_version.status = "TRAINING_IN_PROGRESS"
 
-    db.add(next_model_version)
+    try:
+        job = create_job(db, org_id, model_version.id, TRAIN_LORA)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, "Training is already in progress")
 
-    db.commit()
+    submit_job(job.id)
 
     return {
         "model_version_id": model_version.id,
         "status": "configured",
+        "job_id": job.id,
     }
+
+
+@router.post("/callback")
+def training_callback(
+    payload: TrainingCallbackSchema,
+    body: bytes = Depends(verify_training_callback),
+    db: Session = Depends(get_db),
+):
+    """
+    Completion report from a training worker, signed with
+    TRAINING_CALLBACK_SECRET. Idempotent: repeats and reports for jobs the
+    poller already settled are acknowledged and ignored.
+    """
+    if payload.status == "succeeded":
+        if not payload.result or "adapter_dir" not in payload.result:
+            raise HTTPException(422, "Missing training result")
+        applied = complete_training(db, payload.job_id, payload.result)
+    else:
+        applied = fail_training(db, payload.job_id, payload.error or "Training failed")
+
+    return {"job_id": payload.job_id, "applied": applied}
+
+
+@router.post("/metrics")
+def training_metrics(
+    payload: TrainingMetricsSchema,
+    body: bytes = Depends(verify_training_callback),
+    db: Session = Depends(get_db),
+):
+    """
+    Telemetry points from a running training worker (see
+    training_telemetry), signed like /callback. Repeated steps are ignored.
+    """
+    job = db.get(Job, payload.job_id)
+
+    if job is None or job.kind != TRAIN_LORA or job.model_version_id != payload.model_version_id:
+        raise HTTPException(404, "Training job not found")
+
+    stored = store_metrics(db, job, [p.model_dump() for p in payload.points])
+
+    return {"job_id": payload.job_id, "stored": stored}
+
+
+@router.get("/progress/{model_version_id}", response_model=TrainingProgressOut)
+def get_training_progress(
+    model_version_id: UUID,
+    ctx=Depends(get_org_context),
+    db: Session = Depends(get_db),
+):
+    """
+    Live progress of the version's latest training run: step, loss,
+    learning rate, seconds per step, tokens/s, peak memory, ETA, whether it
+    looks stalled, and the reported points so far.
+    """
+    model_version = (
+        db.query(ModelVersion)
+        .filter(ModelVersion.id == model_version_id, ModelVersion.org_id == ctx["org_id"])
+        .one_or_none()
+    )
+
+    if not model_version:
+        raise HTTPException(404, "Model version not found")
+
+    return training_progress(db, model_version)
@@ -1,4 +1,4 @@
-from sqlalchemy import  JSON, CheckConstraint, Integer, Boolean, Text, String, Column, DateTime, ForeignKey, func, Enum, UniqueConstraint
+from sqlalchemy import  JSON, CheckConstraint, Integer, Boolean, Float, Text, String, Column, DateTime, ForeignKey, func, Enum, UniqueConstraint, Index, text
 from sqlalchemy.dialects.postgresql import ARRAY
 import uuid
 from sqlalchemy.dialects.postgresql import UUID, JSONB
@@ -112,6 +112,14 @@ class Feedback(Base):
     )
     __table_args__ = (
         CheckConstraint("rating IN (-1, 0, 1)", name="rating_valid_values"),
+        # filter / keyset pagination on the deployed version
+        Index(
+            "ix_feedback_org_version_created",
+            "org_id",
+            "model_version_id",
+            "created_at",
+            "id",
+        ),
     )
 
 
@@ -134,12 +142,6 @@ class ModelVersion(Base):
     )
 
 
-    # Immutable training snapshot
-    feedback_ids = Column(
-        ARRAY(UUID(as_uuid=True)),
-        nullable=False
-    )
-
     adapter_config = Column(JSON, nullable=True)
     json_url = Column(Text,)
     row_count = Column(Integer)
@@ -157,8 +159,162 @@ class ModelVersion(Base):
 
     __table_args__ = (
         UniqueConstraint("org_id", "version", name="uq_org_version"),
+        # at most one deployed version per org
+        Index(
+            "uq_model_version_org_collecting",
+            "org_id",
+            unique=True,
+            postgresql_where=text("status = 'COLLECTING_FEEDBACK'"),
+        ),
+    )
+
+
+
+
+# training selection: which feedback rows a model version trains on
+class ModelVersionFeedback(Base):
+    __tablename__ = "model_version_feedback"
+
+    model_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("model_version.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    feedback_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("feedback.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+
+
+# running totals per (model version, scope), kept in step by app/services/feedback_stats.py
+class FeedbackStats(Base):
+    __tablename__ = "feedback_stats"
+
+    model_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("model_version.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # "all" feedback on the version, or only rows "selected" for training
+    scope = Column(String, primary_key=True)
+
+    org_id = Column(UUID(as_uuid=True), ForeignKey("organization.id"), nullable=False, index=True)
+
+    total_count = Column(Integer, nullable=False, server_default="0")
+    rating_bad = Column(Integer, nullable=False, server_default="0")
+    rating_neutral = Column(Integer, nullable=False, server_default="0")
+    rating_good = Column(Integer, nullable=False, server_default="0")
+    corrected_count = Column(Integer, nullable=False, server_default="0")
+
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class FeedbackTagStats(Base):
+    __tablename__ = "feedback_tag_stats"
+
+    model_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("model_version.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    scope = Column(String, primary_key=True)
+    tag = Column(Text, primary_key=True)
+
+    count = Column(Integer, nullable=False, server_default="0")
+
+
+
+
+# long-running work (dataset preparation, training) tracked outside the request
+class Job(Base):
+    __tablename__ = "job"
+
+    id = Column(UUID(as_uuid=True), default=uuid.uuid4, primary_key=True)
+    org_id = Column(UUID(as_uuid=True), ForeignKey("organization.id"), nullable=False, index=True)
+    model_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("model_version.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    kind = Column(String, nullable=False)
+    # QUEUED -> RUNNING -> SUCCEEDED | FAILED
+    status = Column(String, nullable=False, server_default="QUEUED")
+    stage = Column(String, nullable=True)
+    progress = Column(Float, nullable=False, server_default="0")
+
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    # id of the remote call (e.g. Modal) once the work has been handed off
+    external_id = Column(String, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # heartbeat: bumped on every progress report
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # one active job of a kind per model version
+        Index(
+            "uq_job_active",
+            "model_version_id",
+            "kind",
+            unique=True,
+            postgresql_where=text("status IN ('QUEUED', 'RUNNING')"),
+        ),
+    )
+
+
+class CleaningVerdict(Base):
+    """
+    Safety classifier scores of a training record, keyed by its
+    fingerprint_record() and the classifier that produced them. Scores,
+    not verdicts, are stored: thresholds are applied on read.
+    """
+    __tablename__ = "cleaning_verdict"
+
+    fingerprint = Column(String(64), primary_key=True)
+    # model name @ revision; a new classifier starts with an empty cache
+    classifier = Column(String, primary_key=True)
+    scores = Column(JSONB, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class TrainingMetric(Base):
+    """
+    One telemetry point of a training run, sent by the trainer every
+    logging interval (see training_telemetry). Averages since the previous
+    point, except peak memory, which is the run's peak so far.
+    """
+    __tablename__ = "training_metric"
+
+    job_id = Column(UUID(as_uuid=True), ForeignKey("job.id", ondelete="CASCADE"), primary_key=True)
+    step = Column(Integer, primary_key=True)
+    model_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("model_version.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
 
+    max_steps = Column(Integer, nullable=True)
+    epoch = Column(Float, nullable=True)
+    loss = Column(Float, nullable=True)
+    learning_rate = Column(Float, nullable=True)
+    grad_norm = Column(Float, nullable=True)
+    step_seconds = Column(Float, nullable=True)
+    tokens_per_second = Column(Float, nullable=True)
+    peak_memory_mb = Column(Float, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
 
 
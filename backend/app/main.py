@@ -5,15 +5,36 @@ from app.db import models
 from fastapi.middleware.cors import CORSMiddleware
 
 from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
 
 from app.api.v1.api import router as v1_router
+from app.schemas.jsonl_cleaning import shutdown_cleaning_pool
+from app.services.feedback_writer import FEEDBACK_WRITE_BEHIND, feedback_writer
+from app.services.jobs import start_job_runner, stop_job_runner
+from app.services.training_dispatch import start_training_poller, stop_training_poller
+from app.services.llm_client import close_llm_client
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if FEEDBACK_WRITE_BEHIND:
+        feedback_writer.start()
+
+    # also resubmits jobs left queued / orphaned by a previous process
+    await run_in_threadpool(start_job_runner)
+    start_training_poller()
+
     yield  # startup complete, shutdown after
 
-app = FastAPI()
+    stop_training_poller()
+    stop_job_runner()
+    shutdown_cleaning_pool()
+    await close_llm_client()
+
+    # drain buffered feedback before the process exits
+    await run_in_threadpool(feedback_writer.stop)
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 def home():
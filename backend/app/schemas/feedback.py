@@ -1,10 +1,12 @@
 from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 import enum
 from sqlalchemy import Enum
 
+from app.schemas.dataset import DatasetFilters, DatasetStats
+
 class GenerateRequest(BaseModel):
     prompt: str = Field(..., min_length=1)
     # model: str
@@ -29,6 +31,20 @@ class feedbackResponse(BaseModel):
     message: str
 
 
+class FeedbackBatchRowResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[UUID] = None
+    error: Optional[str] = None
+
+
+class FeedbackBatchResponse(BaseModel):
+    model_version_id: UUID
+    accepted: int
+    rejected: int
+    results: List[FeedbackBatchRowResult]
+
+
 
 
 
@@ -60,8 +76,41 @@ class FeedbackOut(BaseModel):
 
 class FeedbackFilterResponse(BaseModel):
     feedbacks: List[FeedbackOut]
+    # set when `limit` was given and more rows follow
+    next_cursor: Optional[str] = None
 
 
 
 class AddFeedbackRequest(BaseModel):
     feedback_id: UUID
+
+
+class BulkFeedbackRequest(BaseModel):
+    """
+    Target either explicit ids or every row matching `filters`
+    (same semantics as /filter). Exactly one must be given.
+    """
+    feedback_ids: Optional[List[UUID]] = None
+    filters: Optional[DatasetFilters] = None
+
+    @model_validator(mode="after")
+    def one_target(self):
+        if (self.feedback_ids is None) == (self.filters is None):
+            raise ValueError("provide exactly one of feedback_ids or filters")
+        return self
+
+
+class BulkFeedbackResponse(BaseModel):
+    model_version_id: UUID
+    accepted: int
+    rejected: int
+    # ids that were not owned, not on the deployed version, or already in that state
+    rejected_ids: List[UUID] = Field(default_factory=list)
+    total_feedbacks: int
+
+
+class FeedbackStatsResponse(BaseModel):
+    model_version_id: UUID
+    # every feedback row on the version / only rows selected for training
+    all: DatasetStats
+    selected: DatasetStats
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class JobOut(BaseModel):
+    id: UUID
+    model_version_id: UUID
+    kind: str
+    status: str
+    stage: Optional[str]
+    progress: float
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class JobAccepted(BaseModel):
+    message: str
+    job_id: UUID
+    status: str
@@ -1,28 +1,104 @@
 # cpu_cleaning.py
-import re
+"""
+CPU cleaning for training rows: structural checks, PII and misalignment
+filters, then dedup on a normalized fingerprint.
+
+All filters for one row run in check_row() over plain strings, with each
+field normalized once and the pattern lists compiled into single regexes.
+Large inputs are fanned out to a process pool in CLEANING_CHUNK_ROWS
+chunks; dedup always happens in the caller, in input order, so the result
+is the same as a serial run.
+
+Keep this module free of app imports: pool workers import it on spawn.
+"""
 import hashlib
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+
+
+CLEANING_PROCESSES = int(os.getenv("CLEANING_PROCESSES", str(os.cpu_count() or 1)))
+CLEANING_CHUNK_ROWS = int(os.getenv("CLEANING_CHUNK_ROWS", "10000"))
+
+OUTPUT_MIN_CHARS = 5
+OUTPUT_MAX_CHARS = 5000
+
 
 def normalize_text(text: str) -> str:
-    return re.sub(r"\s+", " ", text.strip().lower())
+    # same as collapsing \s+ after strip().lower(), without the regex
+    return " ".join(text.lower().split())
+
+
+PII_PATTERNS = [
+    r"\b\d{10}\b",
+    r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",
+    r"api[_-]?key\s*=\s*\S+",
+    r"password\s*[:=]\s*\S+",
+]
+
+MISALIGNMENT_PATTERNS = [
+    "as an ai",
+    "i cannot help",
+    "the model should have",
+]
 
+_PII = re.compile("|".join(f"(?:{p})" for p in PII_PATTERNS))
+_MISALIGNED = re.compile("|".join(re.escape(p) for p in MISALIGNMENT_PATTERNS))
+
+
+def check_row(prompt, model_response, corrected_response):
+    """
+    Run every filter on one row. Returns its dedup fingerprint (sha256
+    digest) if the row is kept, else None.
+    """
+    if not prompt or not corrected_response:
+        return None
+
+    output = corrected_response.strip()
+
+    if not prompt.strip() or not (OUTPUT_MIN_CHARS <= len(output) <= OUTPUT_MAX_CHARS):
+        return None
+
+    norm_prompt = normalize_text(prompt)
+    norm_output = normalize_text(corrected_response)
+
+    if norm_prompt == norm_output:
+        return None
+
+    if _PII.search(corrected_response):
+        return None
+
+    if _MISALIGNED.search(norm_output):
+        return None
+
+    payload = norm_prompt + "|" + normalize_text(model_response or "") + "|" + norm_output
+    return hashlib.sha256(payload.encode("utf-8")).digest()
+
+
+# ---- row-object helpers (kept for callers of the per-check API) ----
 
 def is_structurally_valid(fb) -> bool:
     if not fb.prompt or not fb.corrected_response:
         return False
 
-    prompt = fb.prompt.strip()
     output = fb.corrected_response.strip()
 
-    if not prompt or not output:
+    if not fb.prompt.strip() or not (OUTPUT_MIN_CHARS <= len(output) <= OUTPUT_MAX_CHARS):
         return False
 
-    if len(output) < 5 or len(output) > 5000:
-        return False
+    return normalize_text(fb.prompt) != normalize_text(fb.corrected_response)
 
-    if normalize_text(prompt) == normalize_text(output):
-        return False
 
-    return True
+def has_pii(fb) -> bool:
+    return _PII.search(fb.corrected_response or "") is not None
+
+
+def is_misaligned(fb) -> bool:
+    return _MISALIGNED.search(normalize_text(fb.corrected_response or "")) is not None
 
 
 def fingerprint_record(prompt, model_resp, corrected):
@@ -36,9 +112,11 @@ def fingerprint_record(prompt, model_resp, corrected):
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
-def deduplicate(feedbacks):
+def iter_deduplicate(feedbacks):
+    """
+    Streaming dedup: only the fingerprints are kept in memory.
+    """
     seen = set()
-    unique = []
 
     for fb in feedbacks:
         fp = fingerprint_record(
@@ -49,45 +127,119 @@ def deduplicate(feedbacks):
         if fp in seen:
             continue
         seen.add(fp)
-        unique.append(fb)
+        yield fb
 
-    return unique
 
+def deduplicate(feedbacks):
+    return list(iter_deduplicate(feedbacks))
 
-PII_PATTERNS = [
-    r"\b\d{10}\b",
-    r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",
-    r"api[_-]?key\s*=\s*\S+",
-    r"password\s*[:=]\s*\S+",
-]
 
-def has_pii(fb) -> bool:
-    text = fb.corrected_response or ""
-    return any(re.search(p, text) for p in PII_PATTERNS)
+# ---- engine ----
 
+def _fields(fb) -> tuple:
+    return (fb.prompt, fb.model_response, fb.corrected_response)
 
-MISALIGNMENT_PATTERNS = [
-    "as an ai",
-    "i cannot help",
-    "the model should have",
-]
 
-def is_misaligned(fb) -> bool:
-    output = normalize_text(fb.corrected_response or "")
-    return any(p in output for p in MISALIGNMENT_PATTERNS)
+def check_chunk(rows: list) -> list:
+    """
+    Pool task: fingerprints (or None) for a chunk of field tuples.
+    """
+    return [check_row(*row) for row in rows]
 
 
-def cpu_clean(feedbacks):
-    filtered = []
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent runs DB and job threads
+            _pool = ProcessPoolExecutor(
+                max_workers=CLEANING_PROCESSES,
+                mp_context=get_context("spawn"),
+            )
+        return _pool
 
-    for fb in feedbacks:
-        if not is_structurally_valid(fb):
-            continue
-        if has_pii(fb):
-            continue
-        if is_misaligned(fb):
-            continue
 
-        filtered.append(fb)
+def shutdown_cleaning_pool(wait: bool = False):
+    global _pool
 
-    return deduplicate(filtered)
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+
+def _iter_checked_chunks(chunks):
+    """
+    (chunk, fingerprints) in input order. One chunk that is not full means
+    the input is small: check it inline. Otherwise keep up to two chunks
+    per worker in flight, so a streaming input stays bounded.
+    """
+    first = next(chunks, None)
+    if first is None:
+        return
+
+    if CLEANING_PROCESSES <= 1 or len(first) < CLEANING_CHUNK_ROWS:
+        yield first, check_chunk([_fields(fb) for fb in first])
+        for chunk in chunks:
+            yield chunk, check_chunk([_fields(fb) for fb in chunk])
+        return
+
+    pool = _get_pool()
+    in_flight = deque()
+
+    for chunk in _prepend(first, chunks):
+        in_flight.append((chunk, pool.submit(check_chunk, [_fields(fb) for fb in chunk])))
+
+        if len(in_flight) >= 2 * CLEANING_PROCESSES:
+            chunk, future = in_flight.popleft()
+            yield chunk, future.result()
+
+    while in_flight:
+        chunk, future = in_flight.popleft()
+        yield chunk, future.result()
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+def _chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iter_cpu_clean(feedbacks, report: dict = None):
+    """
+    cpu_clean() over any iterable of row-like objects (ORM rows, cursor
+    rows), yielding the kept rows in input order. `report`, if given, is
+    kept up to date with rows_in / rows_filtered / exact_duplicates.
+    """
+    if report is None:
+        report = {}
+    report.update(rows_in=0, rows_filtered=0, exact_duplicates=0)
+
+    seen = set()
+
+    for chunk, fingerprints in _iter_checked_chunks(_chunked(feedbacks, CLEANING_CHUNK_ROWS)):
+        report["rows_in"] += len(chunk)
+
+        for fb, fp in zip(chunk, fingerprints):
+            if fp is None:
+                report["rows_filtered"] += 1
+                continue
+            if fp in seen:
+                report["exact_duplicates"] += 1
+                continue
+            seen.add(fp)
+            yield fb
+
+
+def cpu_clean(feedbacks):
+    return list(iter_cpu_clean(feedbacks))
@@ -0,0 +1,218 @@
+# near_dedup.py
+"""
+Near-duplicate detection for training rows: MinHash signatures over
+character shingles, LSH banding to find candidates, and a signature check
+against the candidate before a row is dropped.
+
+Rows are dropped when their estimated Jaccard similarity to an earlier
+row reaches NEAR_DUP_THRESHOLD (<= 0 disables the stage). Signatures are
+computed in vectorized batches. Candidate search sorts band keys once per
+band, so it is O(n log n) and not pairwise. Memory is about
+bands * 8 + NEAR_DUP_NUM_PERM * 2 bytes per row (~330 B with defaults)
+plus the caller's key; the rows themselves are not kept.
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.schemas.jsonl_cleaning import normalize_text
+
+
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NEAR_DUP_NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "128"))
+NEAR_DUP_SHINGLE_CHARS = int(os.getenv("NEAR_DUP_SHINGLE_CHARS", "5"))
+
+# shingles hashed per vectorized step (num_perm x this many uint32s)
+_SHINGLE_BUDGET = 16384
+
+_rng = np.random.default_rng(20240611)
+
+# permutations are x -> a*x + b mod 2^32 with odd a (a bijection on uint32);
+# uint32 wrap-around is several times faster than a mod-prime family
+_PERM_A = _rng.integers(0, 1 << 32, size=NEAR_DUP_NUM_PERM, dtype=np.uint32) | np.uint32(1)
+_PERM_B = _rng.integers(0, 1 << 32, size=NEAR_DUP_NUM_PERM, dtype=np.uint32)
+
+# a shingle's bytes packed into one integer (exact for up to 8 chars)
+_SHINGLE_WEIGHTS = np.uint64(256) ** np.arange(NEAR_DUP_SHINGLE_CHARS, dtype=np.uint64)
+_SHINGLE_MIX = np.uint64(0x9E3779B97F4A7C15)
+_BAND_MIX = _rng.integers(1, 1 << 63, size=NEAR_DUP_NUM_PERM, dtype=np.uint64) | np.uint64(1)
+
+
+@lru_cache(maxsize=16)
+def optimal_bands(threshold: float, num_perm: int) -> tuple:
+    """
+    (bands, rows) with bands * rows <= num_perm minimising the area of
+    false positives below and false negatives above the threshold of the
+    LSH S-curve 1 - (1 - s^rows)^bands.
+    """
+    best, best_error = (1, num_perm), float("inf")
+    below = np.linspace(0.0, threshold, 200)
+    above = np.linspace(threshold, 1.0, 200)
+
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            fp = np.trapezoid(1 - (1 - below ** rows) ** bands, below)
+            fn = np.trapezoid((1 - above ** rows) ** bands, above)
+            if fp + fn < best_error:
+                best, best_error = (bands, rows), fp + fn
+
+    return best
+
+
+def near_dup_text(fb) -> str:
+    """
+    What two rows are compared on: the training pair (prompt, correction).
+    """
+    return normalize_text(fb.prompt) + "\n" + normalize_text(fb.corrected_response or "")
+
+
+def _shingle_hashes(texts: list) -> tuple:
+    """
+    Hashes of every character shingle of every text, computed over one
+    concatenated buffer, and the offset of each text's first shingle.
+    """
+    k = NEAR_DUP_SHINGLE_CHARS
+    # texts shorter than a shingle are padded: the whole text is one shingle
+    encoded = [t.encode("utf-8").ljust(k, b"\0") for t in texts]
+
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    counts = lengths - k + 1
+    text_starts = np.cumsum(lengths) - lengths
+    offsets = np.cumsum(counts) - counts
+
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    packed = sliding_window_view(buffer, k).astype(np.uint64) @ _SHINGLE_WEIGHTS
+
+    # drop windows that straddle two texts
+    positions = np.repeat(text_starts - offsets, counts) + np.arange(counts.sum())
+    mixed = packed[positions] * _SHINGLE_MIX
+
+    # high half of a 64-bit multiplicative mix, so the permutations see well-spread bits
+    return (mixed >> np.uint64(32)).astype(np.uint32), offsets
+
+
+def minhash_signatures(texts: list) -> np.ndarray:
+    """
+    (len(texts), NEAR_DUP_NUM_PERM) uint32 MinHash signatures.
+    """
+    signatures = np.empty((len(texts), NEAR_DUP_NUM_PERM), dtype=np.uint32)
+    if not texts:
+        return signatures
+
+    hashes, offsets = _shingle_hashes(texts)
+    start = 0
+
+    # bound the (num_perm x shingles) matrix to _SHINGLE_BUDGET columns
+    while start < len(texts):
+        end = int(np.searchsorted(offsets, offsets[start] + _SHINGLE_BUDGET, side="left"))
+        end = max(end, start + 1)
+
+        stop = offsets[end] if end < len(texts) else len(hashes)
+        segment = hashes[offsets[start]:stop]
+
+        permuted = _PERM_A[:, None] * segment[None, :] + _PERM_B[:, None]
+        signatures[start:end] = np.minimum.reduceat(permuted, offsets[start:end] - offsets[start], axis=1).T
+        start = end
+
+    return signatures
+
+
+class NearDuplicateFilter:
+    """
+    Collect (key, text) pairs, then ask which keys survive. Order of add()
+    calls decides which copy is kept: the first.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, batch_rows: int = 1024):
+        self.threshold = threshold
+        self.bands, self.rows = optimal_bands(threshold, NEAR_DUP_NUM_PERM)
+        self.batch_rows = batch_rows
+
+        self._keys = []
+        self._pending = []
+        self._band_keys = []
+        self._checks = []
+
+    def add(self, key, text: str):
+        self._keys.append(key)
+        self._pending.append(text)
+
+        if len(self._pending) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+
+        signatures = minhash_signatures(self._pending)
+        self._pending = []
+
+        used = signatures[:, : self.bands * self.rows].astype(np.uint64)
+        mixed = used * _BAND_MIX[: self.bands * self.rows]
+        self._band_keys.append(mixed.reshape(-1, self.bands, self.rows).sum(axis=2))
+
+        # low 16 bits are enough for the similarity check (1/65536 chance of a false match)
+        self._checks.append(signatures.astype(np.uint16))
+
+    def duplicate_mask(self) -> np.ndarray:
+        """
+        Boolean per added row: True if it near-duplicates an earlier row.
+        """
+        self._flush()
+
+        if not self._band_keys:
+            return np.zeros(0, dtype=bool)
+
+        band_keys = np.concatenate(self._band_keys)
+        checks = np.concatenate(self._checks)
+        n = len(band_keys)
+        index = np.arange(n)
+        duplicate = np.zeros(n, dtype=bool)
+
+        for band in range(self.bands):
+            keys = band_keys[:, band]
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+
+            # earliest row of each bucket (stable sort: lowest index first)
+            starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+            first = order[np.maximum.accumulate(np.where(starts, index, 0))]
+
+            candidate = np.empty(n, dtype=np.int64)
+            candidate[order] = first
+
+            rows = np.nonzero((candidate != index) & ~duplicate)[0]
+            if len(rows) == 0:
+                continue
+
+            similarity = (checks[rows] == checks[candidate[rows]]).mean(axis=1)
+            duplicate[rows[similarity >= self.threshold]] = True
+
+        return duplicate
+
+    def kept_keys(self, report: dict = None) -> set:
+        duplicate = self.duplicate_mask()
+
+        if report is not None:
+            report["near_duplicates"] = int(duplicate.sum())
+
+        return {key for key, dup in zip(self._keys, duplicate.tolist()) if not dup}
+
+
+def near_deduplicate(feedbacks, threshold: float = NEAR_DUP_THRESHOLD, report: dict = None) -> list:
+    """
+    In-memory variant for lists of rows.
+    """
+    feedbacks = list(feedbacks)
+
+    if threshold <= 0 or not feedbacks:
+        return feedbacks
+
+    near = NearDuplicateFilter(threshold)
+    for i, fb in enumerate(feedbacks):
+        near.add(i, near_dup_text(fb))
+
+    kept = near.kept_keys(report)
+    return [fb for i, fb in enumerate(feedbacks) if i in kept]
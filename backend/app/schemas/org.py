@@ -18,10 +18,13 @@ class RequestMapping(BaseModel):
     messages: Optional[str] = None
     temperature: Optional[str] = None
     max_tokens: Optional[str] = None
+    stream: Optional[str] = None
 
 
 class ResponseMapping(BaseModel):
     text: Optional[str] = None
+    # path into each streamed chunk, e.g. choices[0].delta.content
+    stream_text: Optional[str] = None
 
 
 class LLMConfig(BaseModel):
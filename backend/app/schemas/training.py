@@ -1,6 +1,8 @@
 
 from pydantic import BaseModel, Field, field_validator
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+from uuid import UUID
 
 
 ALLOWED_BASE_MODELS = {
@@ -46,6 +48,14 @@ class TrainingConfigSchema(BaseModel):
     batch_size: int = Field(ge=1, le=16)
     learning_rate: float = Field(ge=1e-5, le=5e-4)
     seed: int = Field(ge=0, le=10_000)
+    # sequence layout in the trainer, see PADDING_MODES in train_lora_app;
+    # the defaults are the original layout, dynamic / packed are opt-in
+    padding: Literal["max_length", "dynamic", "packed"] = "max_length"
+    max_seq_length: int = Field(default=256, ge=128, le=4096)
+    # continue from the parent version's adapter instead of a fresh LoRA
+    warm_start: bool = False
+    # earlier versions' rows mixed in, as a fraction of this version's rows
+    replay_fraction: float = Field(default=0.0, ge=0.0, le=1.0)
 
 
 class AdapterConfigRequestSchema(BaseModel):
@@ -59,3 +69,47 @@ class AdapterConfigRequestSchema(BaseModel):
         if v not in ALLOWED_BASE_MODELS:
             raise ValueError("Unsupported base model")
         return v
+
+
+class TrainingCallbackSchema(BaseModel):
+    job_id: UUID
+    model_version_id: Optional[UUID] = None
+    status: Literal["succeeded", "failed"]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class TrainingMetricPoint(BaseModel):
+    step: int = Field(ge=0)
+    max_steps: Optional[int] = None
+    epoch: Optional[float] = None
+    loss: Optional[float] = None
+    learning_rate: Optional[float] = None
+    grad_norm: Optional[float] = None
+    step_seconds: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    peak_memory_mb: Optional[float] = None
+
+
+class TrainingMetricsSchema(BaseModel):
+    job_id: UUID
+    model_version_id: UUID
+    points: List[TrainingMetricPoint] = Field(max_length=1000)
+
+
+class TrainingProgressOut(BaseModel):
+    model_version_id: UUID
+    job_id: Optional[UUID] = None
+    job_status: Optional[str] = None
+    step: Optional[int] = None
+    max_steps: Optional[int] = None
+    progress: Optional[float] = None
+    loss: Optional[float] = None
+    learning_rate: Optional[float] = None
+    step_seconds: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    peak_memory_mb: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    last_report_at: Optional[datetime] = None
+    stalled: bool = False
+    points: List[TrainingMetricPoint] = []
@@ -0,0 +1,66 @@
+# app/services/adapter_archive.py
+"""
+ModelVersion.adapter_url is the adapter's artifact-store manifest
+(modal_apps/artifact_store.py), or a zip for versions trained before the
+store existed. adapter_archive() turns either into one zip the browser
+can download: the manifest's files are fetched (digests checked) and
+zipped once per adapter, then served from ADAPTER_ARCHIVE_DIR.
+"""
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]  # project root
+sys.path.append(str(ROOT))
+
+from modal_apps.artifact_store import FilesystemArtifactStore, StorageArtifactStore
+from modal_apps.storage import download_url, storage_from_env
+
+from app.db.models import ModelVersion
+from app.services.dataset_preparation import TRAINING_DATA_DIR
+
+
+# the bucket train_lora publishes adapters to (train_lora_app.ADAPTER_BUCKET)
+ADAPTER_BUCKET = os.getenv("ADAPTER_BUCKET", "lora-adapters")
+ADAPTER_ARCHIVE_DIR = Path(os.getenv("ADAPTER_ARCHIVE_DIR", str(TRAINING_DATA_DIR / "adapter_archives")))
+
+
+def _adapter_store(manifest_ref: str):
+    if "://" not in manifest_ref:
+        # local stand-in: <root>/manifests/<name>.json
+        return FilesystemArtifactStore(Path(manifest_ref).parents[1])
+    return StorageArtifactStore(storage_from_env(ADAPTER_BUCKET))
+
+
+def adapter_archive(model_version: ModelVersion) -> Path:
+    """
+    Path of a zip with the version's adapter files, built on first use.
+    Archives are named after the adapter's content, so a republished
+    version never serves a stale one.
+    """
+    url = model_version.adapter_url
+    key = model_version.sha256 or hashlib.sha256(url.encode("utf-8")).hexdigest()
+    archive = ADAPTER_ARCHIVE_DIR / f"{key}.zip"
+
+    if archive.exists():
+        return archive
+
+    ADAPTER_ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=ADAPTER_ARCHIVE_DIR) as tmp:
+        tmp = Path(tmp)
+
+        if ".zip" in url:
+            # versions trained before the artifact store
+            built = download_url(url, tmp / "adapter.zip")
+        else:
+            _adapter_store(url).download(url, tmp / "adapter")
+            built = Path(shutil.make_archive(str(tmp / "adapter"), "zip", tmp / "adapter"))
+
+        # concurrent requests may both build it; the rename keeps one
+        os.replace(built, archive)
+
+    return archive
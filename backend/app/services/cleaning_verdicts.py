@@ -0,0 +1,133 @@
+# app/services/cleaning_verdicts.py
+"""
+Persistent cache of GPU safety scores, so a dataset rebuild only sends
+new or changed records through the classifier.
+
+Records are keyed by fingerprint_record() of (prompt, model response,
+correction) and by safety_classifier(): SAFETY_MODEL at the commit the GPU
+jobs load, never a branch name. A branch revision is resolved through the
+weight cache's pin first (gpu_cleaning.resolve_safety_revision), so
+changing the model, its revision or moving the pin changes the key and
+the cache starts empty. Thresholds are applied to the cached scores when
+they are read, so a threshold change re-judges every record without
+classifying it again.
+
+Before export, each CPU-cleaned row is looked up:
+
+  cached, safe    exported as is; the GPU pass keeps it unclassified
+  cached, unsafe  dropped here, never uploaded
+  miss            exported with its fingerprint under CLASSIFY_KEY; the
+                  GPU pass classifies it and returns its scores, which
+                  store_scores() persists
+
+CPU checks are not cached. They run in pool workers that have no DB
+access, and re-running check_row costs about three times as much as
+fingerprinting a row, so a lookup would save little.
+"""
+import os
+from itertools import islice
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models import CleaningVerdict
+from app.schemas.jsonl_cleaning import fingerprint_record
+from app.services.dataset_export import training_record
+
+
+CLEANING_VERDICT_CACHE = os.getenv("CLEANING_VERDICT_CACHE", "1") == "1"
+VERDICT_BATCH_ROWS = int(os.getenv("VERDICT_BATCH_ROWS", "2000"))
+
+SAFETY_MODEL = os.getenv("SAFETY_MODEL", "unitary/toxic-bert")
+# a branch or a commit; branches are pinned by the GPU side's weight cache
+SAFETY_MODEL_REVISION = os.getenv("SAFETY_MODEL_REVISION", "main")
+
+# label -> max score; a record is unsafe if any label exceeds its threshold
+SAFETY_THRESHOLDS = {
+    "toxic": float(os.getenv("SAFETY_TOXIC_THRESHOLD", "0.85")),
+    "severe_toxic": float(os.getenv("SAFETY_SEVERE_TOXIC_THRESHOLD", "0.7")),
+}
+
+# record field carrying the fingerprint of rows the GPU pass must classify
+CLASSIFY_KEY = "fingerprint"
+
+
+def safety_classifier(commit: str) -> str:
+    """Verdict cache key of SAFETY_MODEL at a resolved commit."""
+    return f"{SAFETY_MODEL}@{commit}"
+
+
+def is_safe(scores: dict, thresholds: dict = SAFETY_THRESHOLDS) -> bool:
+    return all(scores.get(label, 0) <= limit for label, limit in thresholds.items())
+
+
+def _lookup(db: Session, classifier: str, fingerprints: list) -> dict:
+    rows = (
+        db.query(CleaningVerdict.fingerprint, CleaningVerdict.scores)
+        .filter(
+            CleaningVerdict.classifier == classifier,
+            CleaningVerdict.fingerprint.in_(fingerprints),
+        )
+        .all()
+    )
+    return dict(rows)
+
+
+def iter_records_to_classify(db: Session, feedbacks, stats: dict, classifier: str):
+    """
+    Training records for CPU-cleaned rows. Rows with cached unsafe scores are
+    dropped; rows without cached scores carry CLASSIFY_KEY. stats gets
+    cache_hits / cache_misses / cached_unsafe.
+    """
+    stats.update(cache_hits=0, cache_misses=0, cached_unsafe=0)
+    feedbacks = iter(feedbacks)
+
+    while batch := list(islice(feedbacks, VERDICT_BATCH_ROWS)):
+        fingerprints = [
+            fingerprint_record(fb.prompt, fb.model_response, fb.corrected_response)
+            for fb in batch
+        ]
+        cached = _lookup(db, classifier, list(set(fingerprints))) if CLEANING_VERDICT_CACHE else {}
+
+        for fb, fp in zip(batch, fingerprints):
+            record = training_record(fb)
+            scores = cached.get(fp)
+
+            if scores is None:
+                stats["cache_misses"] += 1
+                record[CLASSIFY_KEY] = fp
+            elif is_safe(scores):
+                stats["cache_hits"] += 1
+            else:
+                stats["cache_hits"] += 1
+                stats["cached_unsafe"] += 1
+                continue
+
+            yield record
+
+    looked_up = stats["cache_hits"] + stats["cache_misses"]
+    stats["cache_hit_rate"] = round(stats["cache_hits"] / looked_up, 4) if looked_up else 0.0
+
+
+def store_scores(db: Session, scores: dict, classifier: str) -> int:
+    """
+    Persist {fingerprint: scores} returned by the GPU pass. Existing
+    entries are left alone. Commits.
+    """
+    if not CLEANING_VERDICT_CACHE or not scores:
+        return 0
+
+    items = iter(scores.items())
+
+    while batch := list(islice(items, VERDICT_BATCH_ROWS)):
+        db.execute(
+            pg_insert(CleaningVerdict)
+            .values([
+                {"fingerprint": fp, "classifier": classifier, "scores": s}
+                for fp, s in batch
+            ])
+            .on_conflict_do_nothing()
+        )
+
+    db.commit()
+    return len(scores)
@@ -0,0 +1,81 @@
+# app/services/dataset_export.py
+"""
+Streaming export of a version's training selection:
+
+  server-side cursor -> cpu clean -> records -> JSONL -> gzip -> fixed-size chunks
+
+Nothing is materialised or written to disk: memory is one cursor batch,
+one compressed chunk and the dedup fingerprints.
+"""
+import json
+import os
+import zlib
+
+from sqlalchemy.orm import Session
+
+from app.db.models import Feedback
+from app.services.model_version import selected_feedback_query
+
+
+DATASET_EXPORT_BATCH_ROWS = int(os.getenv("DATASET_EXPORT_BATCH_ROWS", "1000"))
+DATASET_COMPRESS_LEVEL = int(os.getenv("DATASET_COMPRESS_LEVEL", "6"))
+
+DATASET_CONTENT_TYPE = "application/gzip"
+DATASET_SUFFIX = ".jsonl.gz"
+
+# zlib window bits for a gzip container (header + crc), readable by gzip.open
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def iter_selected_feedback(db: Session, org_id, model_version_id):
+    """
+    Selected feedback rows with only the columns cleaning and export read
+    (plus id), fetched DATASET_EXPORT_BATCH_ROWS at a time from a server-side cursor.
+    """
+    return (
+        selected_feedback_query(db, model_version_id)
+        .filter(Feedback.org_id == org_id)
+        .with_entities(
+            Feedback.id,
+            Feedback.prompt,
+            Feedback.model_response,
+            Feedback.corrected_response,
+        )
+        .execution_options(yield_per=DATASET_EXPORT_BATCH_ROWS)
+    )
+
+
+def training_record(fb) -> dict:
+    return {
+        "instruction": fb.prompt.strip(),
+        "input": fb.model_response.strip(),
+        "output": (fb.corrected_response or "").strip(),
+    }
+
+
+def gzip_jsonl_chunks(records, stats: dict, chunk_size: int = 1 << 20):
+    """
+    Yield gzip-compressed JSONL of `records` (dicts, e.g. training_record())
+    in chunks of exactly `chunk_size` bytes (the last one shorter).
+    stats["rows"] counts the rows written.
+    """
+    compressor = zlib.compressobj(DATASET_COMPRESS_LEVEL, zlib.DEFLATED, _GZIP_WBITS)
+    buffer = bytearray()
+    stats["rows"] = 0
+
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        buffer += compressor.compress(line.encode("utf-8"))
+        stats["rows"] += 1
+
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+
+    buffer += compressor.flush()
+
+    while len(buffer) > chunk_size:
+        yield bytes(buffer[:chunk_size])
+        del buffer[:chunk_size]
+
+    yield bytes(buffer)
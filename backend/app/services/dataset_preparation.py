@@ -0,0 +1,178 @@
+# app/services/dataset_preparation.py
+"""
+The "prepare_dataset" job behind /v1/training/start-training:
+
+  stream selection -> cpu clean -> verdict lookup -> gzip JSONL -> upload
+    -> gpu clean -> store new verdicts -> finalize
+
+The stages up to the upload are one pipeline (see dataset_export): rows go from
+the cursor to the resumable upload without touching local disk. With
+near-duplicate detection on, the cursor is read twice: the first pass
+cleans and collects MinHash signatures, the second exports the surviving
+ids, so rows are still never held in memory. Rows whose safety scores
+are cached (see cleaning_verdicts) skip the GPU classifier.
+
+The model version stays COLLECTING_FEEDBACK while the job runs (ingestion
+keeps working, uq_job_active stops a second start) and only moves to
+TRAINING_REQUESTED once the cleaned dataset exists.
+"""
+import itertools
+from pathlib import Path
+
+from app.db.models import ModelVersion
+from app.schemas.jsonl_cleaning import iter_cpu_clean
+from app.schemas.near_dedup import NEAR_DUP_THRESHOLD, NearDuplicateFilter, near_dup_text
+from app.services.cleaning_verdicts import (
+    CLEANING_VERDICT_CACHE,
+    SAFETY_MODEL_REVISION,
+    iter_records_to_classify,
+    safety_classifier,
+    store_scores,
+)
+from app.services.dataset_export import (
+    DATASET_CONTENT_TYPE,
+    DATASET_SUFFIX,
+    gzip_jsonl_chunks,
+    iter_selected_feedback,
+)
+from app.services.jobs import TRAINING_EXECUTOR, JobError, job_handler
+from app.services.model_version import invalidate_deployed_version
+
+
+PREPARE_DATASET = "prepare_dataset"
+
+TRAINING_DATA_DIR = Path("training_data")
+
+
+@job_handler(PREPARE_DATASET)
+def prepare_dataset(db, job, report):
+    org_id = job.org_id
+    model_version = db.get(ModelVersion, job.model_version_id)
+
+    if model_version is None or model_version.status != "COLLECTING_FEEDBACK":
+        raise JobError("Model version is no longer collecting feedback")
+
+    model_version_id = model_version.id
+
+    # 1️⃣ CPU clean, streamed off a server-side cursor
+    report("cpu_cleaning", 0.1)
+    cleaning = {}
+    cleaned = iter_cpu_clean(iter_selected_feedback(db, org_id, model_version_id), cleaning)
+
+    if NEAR_DUP_THRESHOLD > 0:
+        near = NearDuplicateFilter(NEAR_DUP_THRESHOLD)
+        for fb in cleaned:
+            near.add(fb.id, near_dup_text(fb))
+
+        report("near_dedup", 0.15)
+        keep = near.kept_keys(cleaning)
+        cleaned = (
+            fb for fb in iter_selected_feedback(db, org_id, model_version_id)
+            if fb.id in keep
+        )
+
+    # peek, so an empty dataset fails before an upload is started
+    first = next(cleaned, None)
+    if first is None:
+        raise JobError("No valid feedbacks after CPU cleaning")
+
+    verdicts = {}
+    export = {}
+
+    if TRAINING_EXECUTOR == "local":
+        from app.services.gpu_cleaning import LOCAL_CLASSIFIER, local_gpu_cleaning
+
+        classifier = LOCAL_CLASSIFIER
+        records = iter_records_to_classify(db, itertools.chain([first], cleaned), verdicts, classifier)
+
+        # 2️⃣ the local stand-in for the bucket is a directory
+        report("exporting", 0.2)
+        TRAINING_DATA_DIR.mkdir(exist_ok=True)
+        cpu_file_path = TRAINING_DATA_DIR / f"{model_version_id}_cpu{DATASET_SUFFIX}"
+
+        with cpu_file_path.open("wb") as f:
+            for chunk in gzip_jsonl_chunks(records, export):
+                f.write(chunk)
+
+        db.rollback()
+
+        report("gpu_cleaning", 0.5)
+        gpu_result = local_gpu_cleaning(cpu_file_path)
+    else:
+        from app.services.gpu_cleaning import resolve_safety_revision, trigger_gpu_cleaning
+        from app.services.supabase_upload import UPLOAD_CHUNK_BYTES, upload_stream
+
+        # cached scores are keyed by the commit, never the branch it was pinned from
+        revision = resolve_safety_revision() if CLEANING_VERDICT_CACHE else SAFETY_MODEL_REVISION
+        classifier = safety_classifier(revision)
+        records = iter_records_to_classify(db, itertools.chain([first], cleaned), verdicts, classifier)
+
+        # 2️⃣ compressed JSONL straight into a resumable upload
+        report("exporting", 0.2)
+        cpu_object_path = f"{org_id}/{model_version_id}/cpu_cleaned{DATASET_SUFFIX}"
+
+        try:
+            cpu_jsonl_url = upload_stream(
+                gzip_jsonl_chunks(records, export, UPLOAD_CHUNK_BYTES),
+                cpu_object_path,
+                DATASET_CONTENT_TYPE,
+            )
+        except Exception as e:
+            raise JobError(f"CPU upload failed: {str(e)}")
+
+        # release the cursor's snapshot before the long GPU wait
+        db.rollback()
+
+        # 3️⃣ trigger GPU cleaning (Modal)
+        report("gpu_cleaning", 0.5)
+        gpu_result = trigger_gpu_cleaning(
+            cpu_jsonl_url,
+            heartbeat=lambda: report("gpu_cleaning", 0.5),
+            model_revision=revision,
+        )
+
+        # scores belong to the weights that produced them
+        used = (gpu_result.get("weights") or {}).get("revision")
+        if used and used != revision:
+            classifier = safety_classifier(used)
+
+    # new scores are worth keeping even if this attempt fails below
+    verdicts["stored"] = store_scores(db, gpu_result.get("scores") or {}, classifier)
+
+    cleaning["rows_out"] = export["rows"]
+    cleaning["safety_cache"] = verdicts
+    # weights cache hit or download, and load seconds; absent when the
+    # classifier was never loaded (every row cached, or the local stand-in)
+    if gpu_result.get("weights"):
+        cleaning["classifier_weights"] = gpu_result["weights"]
+    # resident worker: cold start, requests served, batch fill, utilization
+    if gpu_result.get("worker"):
+        cleaning["gpu_worker"] = gpu_result["worker"]
+    print(f"prepare_dataset {model_version_id}: cleaning {cleaning}")
+
+    cleaned_jsonl_url = gpu_result["cleaned_jsonl_url"]
+    row_count = gpu_result["rows_kept"]
+
+    if row_count == 0:
+        raise JobError("No valid feedbacks after GPU cleaning")
+
+    # 4️⃣ lifecycle transition
+    report("finalizing", 0.95)
+    model_version = db.get(ModelVersion, job.model_version_id, with_for_update=True)
+
+    if model_version.status != "COLLECTING_FEEDBACK":
+        raise JobError("Model version changed status during preparation")
+
+    model_version.status = "TRAINING_REQUESTED"
+    model_version.json_url = cleaned_jsonl_url
+    model_version.row_count = row_count
+
+    db.commit()
+    invalidate_deployed_version(org_id)
+
+    return {
+        "json_url": cleaned_jsonl_url,
+        "rows": row_count,
+        "status": "TRAINING_REQUESTED",
+        "cleaning": cleaning,
+    }
@@ -1,20 +1,237 @@
+import base64
+import io
+import json
 import re
+import uuid
+from datetime import datetime
+from functools import lru_cache
 
-def extract_by_path(data: dict, path: str):
+from pydantic import ValidationError
+from sqlalchemy import exists, insert
+
+from app.db.models import Feedback, ModelVersionFeedback
+from app.schemas.feedback import FeedbackRequest, FeedbackTag
+from app.services.feedback_stats import record_feedback_stats
+
+
+FEEDBACK_RATINGS = {-1, 0, 1}
+FEEDBACK_TAGS = {tag.value for tag in FeedbackTag}
+
+
+_PATH_SPLIT = re.compile(r"\.(?![^\[]*\])")
+_PATH_PART = re.compile(r"(\w+)(?:\[(\d+)\])?")
+
+
+@lru_cache(maxsize=1024)
+def compile_path(path: str) -> tuple:
     """
-    Extract value from nested dict using paths like:
-    choices[0].message.content
+    Pre-split a path like choices[0].message.content into
+    ("choices", 0, "message", "content").
     """
-    current = data
-    for part in re.split(r"\.(?![^\[]*\])", path):
-        match = re.match(r"(\w+)(?:\[(\d+)\])?", part)
+    steps = []
+    for part in _PATH_SPLIT.split(path):
+        match = _PATH_PART.match(part)
         if not match:
             raise KeyError(part)
 
         key, index = match.groups()
-        current = current[key]
+        steps.append(key)
 
         if index is not None:
-            current = current[int(index)]
+            steps.append(int(index))
+
+    return tuple(steps)
+
 
+def walk_path(data, steps: tuple):
+    current = data
+    for step in steps:
+        current = current[step]
     return current
+
+
+def extract_by_path(data: dict, path: str):
+    """
+    Extract value from nested dict using paths like:
+    choices[0].message.content
+    """
+    return walk_path(data, compile_path(path))
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def encode_feedback_cursor(created_at: datetime, feedback_id) -> str:
+    """
+    Opaque keyset cursor for (created_at, id) ordering.
+    """
+    raw = f"{created_at.isoformat()}|{feedback_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_feedback_cursor(cursor: str) -> tuple:
+    """
+    Inverse of encode_feedback_cursor. Raises ValueError on anything malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, feedback_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(feedback_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def feedback_out(row) -> dict:
+    """
+    FeedbackOut-shaped dict from a Feedback row (ORM object or column row).
+    """
+    return {
+        "id": row.id,
+        "prompt": row.prompt,
+        "model_response": row.model_response,
+        "corrected_response": row.corrected_response,
+        "tags": [getattr(tag, "value", tag) for tag in row.tags or []],
+        "rating": row.rating,
+        "timestamp": row.created_at,
+    }
+
+
+def feedback_filter_conditions(
+    org_id,
+    model_version_id,
+    ratings=None,
+    tags=None,
+    has_correction=None,
+) -> list:
+    """
+    WHERE clauses shared by /filter and the bulk selection endpoints:
+    ownership, version membership and the ratings/tags/correction filters.
+    """
+    conditions = [
+        Feedback.org_id == org_id,
+        Feedback.model_version_id == model_version_id,
+    ]
+
+    if ratings:
+        conditions.append(Feedback.rating.in_(ratings))
+
+    if tags:
+        conditions.append(Feedback.tags.overlap(tags))
+
+    if has_correction is not None:
+        if has_correction:
+            conditions.append(Feedback.corrected_response != "")
+        else:
+            conditions.append(Feedback.corrected_response == "")
+
+    return conditions
+
+
+def selected_for_training():
+    """
+    EXISTS clause: the feedback row is in some version's training selection.
+    """
+    return exists().where(ModelVersionFeedback.feedback_id == Feedback.id)
+
+
+def parse_feedback_batch(body: bytes, content_type: str | None) -> list:
+    """
+    Split a batch body into raw rows. NDJSON rows stay as strings so a bad
+    line is rejected on its own instead of failing the whole batch.
+    """
+    if content_type and "ndjson" in content_type:
+        return [line for line in body.decode("utf-8").splitlines() if line.strip()]
+
+    data = json.loads(body)
+    if isinstance(data, dict):
+        data = data.get("feedbacks")
+
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON list or {\"feedbacks\": [...]}")
+
+    return data
+
+
+def validate_feedback_row(raw) -> FeedbackRequest:
+    """
+    Validate one batch row, including the checks the DB would otherwise
+    enforce for the whole multi-row INSERT. Raises ValueError.
+    """
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+
+    try:
+        fb = FeedbackRequest.model_validate(raw)
+    except ValidationError as e:
+        err = e.errors()[0]
+        field = ".".join(str(p) for p in err["loc"]) or "row"
+        raise ValueError(f"{field}: {err['msg']}")
+
+    if fb.rating not in FEEDBACK_RATINGS:
+        raise ValueError("rating: must be one of -1, 0, 1")
+
+    if fb.tags:
+        invalid = set(fb.tags) - FEEDBACK_TAGS
+        if invalid:
+            raise ValueError(f"tags: unknown tags {sorted(invalid)}")
+
+    return fb
+
+
+_COPY_COLUMNS = (
+    "id",
+    "org_id",
+    "model_version_id",
+    "prompt",
+    "model_response",
+    "corrected_response",
+    "rating",
+    "tags",
+)
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, list):
+        # tags are enum identifiers, no quoting needed inside the array literal
+        return "{" + ",".join(value) + "}"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def insert_feedback_rows(db, rows: list[dict]):
+    """
+    Bulk-write prepared feedback dicts in the caller's transaction, together
+    with their feedback_stats deltas. Postgres/psycopg2 gets a single COPY;
+    other drivers fall back to a batched multi-row INSERT. Caller commits.
+    """
+    if not rows:
+        return
+
+    connection = db.connection()
+
+    if connection.dialect.driver != "psycopg2":
+        db.execute(insert(Feedback.__table__), rows)
+        record_feedback_stats(db, rows, "all")
+        return
+
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_value(row.get(c)) for c in _COPY_COLUMNS))
+        buf.write("\n")
+    buf.seek(0)
+
+    with connection.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY feedback ({', '.join(_COPY_COLUMNS)}) FROM STDIN",
+            buf,
+        )
+
+    record_feedback_stats(db, rows, "all")
@@ -0,0 +1,317 @@
+# app/services/feedback_stats.py
+"""
+Running feedback totals per (model version, scope), so dashboards read one
+row instead of counting the feedback table.
+
+scope "all" covers every feedback row on the version, "selected" only the
+rows in its training selection. Every write path calls
+record_feedback_stats() in the same transaction as the change itself;
+rows are feedback-shaped (ORM objects, column rows or dicts).
+
+Consistency check / rebuild from the source tables:
+
+    python -m app.services.feedback_stats --check
+    python -m app.services.feedback_stats --rebuild [--org <uuid>]
+"""
+import argparse
+import sys
+import uuid
+from collections import Counter
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models import Feedback, FeedbackStats, FeedbackTagStats
+
+
+STATS_SCOPES = ("all", "selected")
+
+# what record_feedback_stats() reads; use in RETURNING / joins on bulk paths
+STATS_COLUMNS = (
+    Feedback.id,
+    Feedback.org_id,
+    Feedback.model_version_id,
+    Feedback.rating,
+    Feedback.tags,
+    Feedback.corrected_response,
+)
+
+_COUNTERS = ("total_count", "rating_bad", "rating_neutral", "rating_good", "corrected_count")
+_RATING_COUNTER = {-1: "rating_bad", 0: "rating_neutral", 1: "rating_good"}
+
+
+def _field(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def record_feedback_stats(db: Session, rows, scope: str, sign: int = 1):
+    """
+    Add (sign=1) or subtract (sign=-1) `rows` from the `scope` totals.
+    Rows are upserted in key order so concurrent writers lock stats rows in
+    the same sequence. Caller commits.
+    """
+    totals = {}
+    tags = Counter()
+
+    for row in rows:
+        model_version_id = _field(row, "model_version_id")
+
+        counters = totals.get(model_version_id)
+        if counters is None:
+            counters = totals[model_version_id] = dict.fromkeys(_COUNTERS, 0)
+            counters["org_id"] = _field(row, "org_id")
+
+        counters["total_count"] += sign
+        counters[_RATING_COUNTER[_field(row, "rating")]] += sign
+
+        # NULL and "" are both "no correction"
+        if _field(row, "corrected_response"):
+            counters["corrected_count"] += sign
+
+        for tag in _field(row, "tags") or []:
+            tags[(model_version_id, getattr(tag, "value", tag))] += sign
+
+    if not totals:
+        return
+
+    stmt = pg_insert(FeedbackStats).values(
+        [
+            {"model_version_id": model_version_id, "scope": scope, **counters}
+            for model_version_id, counters in sorted(totals.items(), key=lambda kv: str(kv[0]))
+        ]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[FeedbackStats.model_version_id, FeedbackStats.scope],
+            set_={
+                **{c: getattr(FeedbackStats, c) + getattr(stmt.excluded, c) for c in _COUNTERS},
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+    if not tags:
+        return
+
+    stmt = pg_insert(FeedbackTagStats).values(
+        [
+            {"model_version_id": model_version_id, "scope": scope, "tag": tag, "count": n}
+            for (model_version_id, tag), n in sorted(tags.items(), key=lambda kv: (str(kv[0][0]), kv[0][1]))
+        ]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[FeedbackTagStats.model_version_id, FeedbackTagStats.scope, FeedbackTagStats.tag],
+            set_={"count": FeedbackTagStats.count + stmt.excluded.count},
+        )
+    )
+
+
+def _empty_stats() -> dict:
+    return {
+        "total_feedbacks": 0,
+        "ratings_breakdown": {-1: 0, 0: 0, 1: 0},
+        "tags_breakdown": {},
+        "corrected_count": 0,
+        "uncorrected_count": 0,
+    }
+
+
+def load_feedback_stats(db: Session, model_version_id) -> dict:
+    """
+    {"all": DatasetStats, "selected": DatasetStats} for one version,
+    read from the maintained totals (two primary-key range reads).
+    """
+    result = {scope: _empty_stats() for scope in STATS_SCOPES}
+
+    for row in db.query(FeedbackStats).filter(FeedbackStats.model_version_id == model_version_id):
+        stats = result[row.scope]
+        stats["total_feedbacks"] = row.total_count
+        stats["ratings_breakdown"] = {-1: row.rating_bad, 0: row.rating_neutral, 1: row.rating_good}
+        stats["corrected_count"] = row.corrected_count
+        stats["uncorrected_count"] = row.total_count - row.corrected_count
+
+    tag_rows = (
+        db.query(FeedbackTagStats)
+        .filter(
+            FeedbackTagStats.model_version_id == model_version_id,
+            FeedbackTagStats.count > 0,
+        )
+        .order_by(FeedbackTagStats.count.desc())
+    )
+    for row in tag_rows:
+        result[row.scope]["tags_breakdown"][row.tag] = row.count
+
+    return result
+
+
+def feedback_total(db: Session, model_version_id) -> int:
+    return (
+        db.query(FeedbackStats.total_count)
+        .filter(
+            FeedbackStats.model_version_id == model_version_id,
+            FeedbackStats.scope == "all",
+        )
+        .scalar()
+    ) or 0
+
+
+# ---- consistency check / rebuild ----
+
+# f.model_version_id for "all", the selecting version for "selected"
+_SOURCE_SQL = {
+    "all": "FROM feedback f",
+    "selected": "FROM model_version_feedback s JOIN feedback f ON f.id = s.feedback_id",
+}
+_VERSION_COLUMN = {"all": "f.model_version_id", "selected": "s.model_version_id"}
+
+
+def _expected_sql(scope: str, org_filter: str) -> tuple:
+    version = _VERSION_COLUMN[scope]
+    source = _SOURCE_SQL[scope]
+
+    totals = f"""
+        SELECT {version} AS model_version_id, '{scope}' AS scope, f.org_id,
+               count(*) AS total_count,
+               count(*) FILTER (WHERE f.rating = -1) AS rating_bad,
+               count(*) FILTER (WHERE f.rating = 0) AS rating_neutral,
+               count(*) FILTER (WHERE f.rating = 1) AS rating_good,
+               count(*) FILTER (WHERE coalesce(f.corrected_response, '') <> '') AS corrected_count
+        {source}
+        {org_filter}
+        GROUP BY {version}, f.org_id
+    """
+    tags = f"""
+        SELECT {version} AS model_version_id, '{scope}' AS scope, t.tag::text AS tag, count(*) AS count
+        {source}
+        CROSS JOIN LATERAL unnest(f.tags) AS t(tag)
+        {org_filter}
+        GROUP BY {version}, t.tag
+    """
+    return totals, tags
+
+
+def _org_filter(org_id) -> tuple:
+    if org_id is None:
+        return "", {}
+    return "WHERE f.org_id = :org_id", {"org_id": org_id}
+
+
+def check_feedback_stats(db: Session, org_id=None) -> list:
+    """
+    Differences between the maintained totals and a fresh aggregate, as
+    (model_version_id, scope, field, stored, expected) tuples.
+    """
+    where, params = _org_filter(org_id)
+    stats_where = "WHERE org_id = :org_id" if org_id else ""
+    tag_where = (
+        "WHERE model_version_id IN (SELECT id FROM model_version WHERE org_id = :org_id)"
+        if org_id else ""
+    )
+
+    expected, stored = {}, {}
+    expected_tags, stored_tags = Counter(), Counter()
+
+    for scope in STATS_SCOPES:
+        totals_sql, tags_sql = _expected_sql(scope, where)
+
+        for row in db.execute(text(totals_sql), params).mappings():
+            expected[(row["model_version_id"], scope)] = {c: row[c] for c in _COUNTERS}
+
+        for row in db.execute(text(tags_sql), params).mappings():
+            expected_tags[(row["model_version_id"], scope, row["tag"])] = row["count"]
+
+    for row in db.execute(text(f"SELECT * FROM feedback_stats {stats_where}"), params).mappings():
+        stored[(row["model_version_id"], row["scope"])] = {c: row[c] for c in _COUNTERS}
+
+    for row in db.execute(text(f"SELECT * FROM feedback_tag_stats {tag_where}"), params).mappings():
+        if row["count"]:
+            stored_tags[(row["model_version_id"], row["scope"], row["tag"])] = row["count"]
+
+    zero = dict.fromkeys(_COUNTERS, 0)
+    drift = []
+
+    for key in sorted(expected.keys() | stored.keys(), key=str):
+        have, want = stored.get(key, zero), expected.get(key, zero)
+        for c in _COUNTERS:
+            if have[c] != want[c]:
+                drift.append((*key, c, have[c], want[c]))
+
+    for key in sorted(expected_tags.keys() | stored_tags.keys(), key=str):
+        if stored_tags[key] != expected_tags[key]:
+            drift.append((key[0], key[1], f"tag:{key[2]}", stored_tags[key], expected_tags[key]))
+
+    return drift
+
+
+def rebuild_feedback_stats(db: Session, org_id=None):
+    """
+    Recompute totals from feedback / model_version_feedback. Writers are
+    blocked (SHARE lock) until the caller commits, so no delta is lost.
+    """
+    db.execute(text("LOCK TABLE feedback, model_version_feedback IN SHARE MODE"))
+
+    where, params = _org_filter(org_id)
+
+    if org_id is None:
+        db.execute(text("DELETE FROM feedback_tag_stats"))
+        db.execute(text("DELETE FROM feedback_stats"))
+    else:
+        db.execute(
+            text(
+                "DELETE FROM feedback_tag_stats WHERE model_version_id IN "
+                "(SELECT id FROM model_version WHERE org_id = :org_id)"
+            ),
+            params,
+        )
+        db.execute(text("DELETE FROM feedback_stats WHERE org_id = :org_id"), params)
+
+    for scope in STATS_SCOPES:
+        totals_sql, tags_sql = _expected_sql(scope, where)
+        db.execute(
+            text(
+                "INSERT INTO feedback_stats (model_version_id, scope, org_id, "
+                + ", ".join(_COUNTERS) + ") "
+                + f"SELECT model_version_id, scope, org_id, {', '.join(_COUNTERS)} FROM ({totals_sql}) e"
+            ),
+            params,
+        )
+        db.execute(
+            text(
+                "INSERT INTO feedback_tag_stats (model_version_id, scope, tag, count) "
+                f"SELECT model_version_id, scope, tag, count FROM ({tags_sql}) e"
+            ),
+            params,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--check", action="store_true", help="report drift, exit 1 if any")
+    mode.add_argument("--rebuild", action="store_true", help="recompute from source tables")
+    parser.add_argument("--org", type=uuid.UUID, default=None)
+    args = parser.parse_args()
+
+    from app.db.session import session_local
+
+    db = session_local()
+    try:
+        if args.rebuild:
+            rebuild_feedback_stats(db, args.org)
+            db.commit()
+            print("feedback stats rebuilt")
+            return 0
+
+        drift = check_feedback_stats(db, args.org)
+        for model_version_id, scope, field, stored, expected in drift:
+            print(f"{model_version_id} {scope:<8} {field:<24} stored={stored} expected={expected}")
+        print(f"{len(drift)} mismatches")
+        return 1 if drift else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+# app/services/feedback_writer.py
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+from app.db.session import session_local
+from app.services.feedback import insert_feedback_rows
+from app.services.model_version import lock_deployed_version_id
+
+
+FEEDBACK_WRITE_BEHIND = os.getenv("FEEDBACK_WRITE_BEHIND", "false").lower() in ("true", "1", "yes")
+FEEDBACK_QUEUE_MAX_ROWS = int(os.getenv("FEEDBACK_QUEUE_MAX_ROWS", "10000"))
+FEEDBACK_FLUSH_ROWS = int(os.getenv("FEEDBACK_FLUSH_ROWS", "500"))
+FEEDBACK_FLUSH_INTERVAL_SECONDS = float(os.getenv("FEEDBACK_FLUSH_INTERVAL_SECONDS", "0.5"))
+FEEDBACK_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv("FEEDBACK_ENQUEUE_TIMEOUT_SECONDS", "0.05"))
+FEEDBACK_SPILL_PATH = Path(os.getenv("FEEDBACK_SPILL_PATH", "feedback_spill.jsonl"))
+
+_UUID_FIELDS = ("id", "org_id", "model_version_id")
+
+
+class _SpillLock:
+    """
+    Guards the spill file against this process's threads and, through an
+    flock on "<spill>.lock", against other processes sharing
+    FEEDBACK_SPILL_PATH (uvicorn workers). Re-entrant, so a replay can
+    spill the rows it could not write.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1 and fcntl is not None:
+            self._file = self._path.open("a")
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+
+class FeedbackWriter:
+    """
+    Write-behind buffer for single feedback rows.
+
+    Requests enqueue prepared rows into a bounded queue; a background thread
+    flushes them with insert_feedback_rows() when FEEDBACK_FLUSH_ROWS are
+    waiting or FEEDBACK_FLUSH_INTERVAL_SECONDS have passed. If the database
+    is unreachable the batch is appended to a spill file and replayed after
+    the next successful flush (or on the next start).
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=FEEDBACK_QUEUE_MAX_ROWS)
+        self._stop = threading.Event()
+        self._thread = None
+        self._spill_lock = _SpillLock(FEEDBACK_SPILL_PATH.with_suffix(".lock"))
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="feedback-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """
+        Stop accepting work and drain whatever is queued before returning.
+        """
+        if not self.running:
+            return
+
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def enqueue(self, row: dict) -> bool:
+        """
+        Returns False when the queue stays full for the enqueue timeout,
+        so the caller can shed load instead of blocking a worker, and when
+        the writer is not running (the caller stores the row itself).
+        """
+        if self._stop.is_set() or not self.running:
+            return False
+
+        try:
+            self._queue.put(row, timeout=FEEDBACK_ENQUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            return False
+
+        return True
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    # ---- background thread ----
+
+    def _run(self):
+        # nothing may end this thread early: enqueued rows are already
+        # acknowledged, and only this thread writes them
+        try:
+            self._replay_spill()
+        except Exception as e:
+            print(f"feedback-writer: spill replay failed: {e!r}")
+
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = []
+            try:
+                batch = self._collect()
+                if batch and self._flush(batch) and FEEDBACK_SPILL_PATH.exists():
+                    self._replay_spill()
+            except Exception as e:
+                print(f"feedback-writer: unexpected error ({len(batch)} rows in flight): {e!r}")
+
+    def _collect(self) -> list:
+        batch = []
+        deadline = time.monotonic() + FEEDBACK_FLUSH_INTERVAL_SECONDS
+
+        while len(batch) < FEEDBACK_FLUSH_ROWS:
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                break
+
+            if self._stop.is_set():
+                # draining: take what is left without waiting
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                continue
+
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _insert(self, db, rows: list):
+        """
+        insert_feedback_rows() with each org's deployed version re-checked
+        and share-locked like the synchronous paths. Rows accepted for a
+        version that has since left COLLECTING_FEEDBACK move to the org's
+        current deployed version; with none, they stay where they were.
+        """
+        deployed = {}
+
+        for row in rows:
+            org_id = row["org_id"]
+            if org_id not in deployed:
+                deployed[org_id] = lock_deployed_version_id(db, org_id)
+
+            current = deployed[org_id]
+            if current is None:
+                print(f"feedback-writer: org {org_id} has no deployed version, feedback {row['id']} stays on {row['model_version_id']}")
+            elif current != row["model_version_id"]:
+                row["model_version_id"] = current
+
+        insert_feedback_rows(db, rows)
+
+    def _flush(self, rows: list) -> bool:
+        """True when the database took the batch (so a spill can be replayed)."""
+        db = session_local()
+
+        try:
+            self._insert(db, rows)
+            db.commit()
+        except OperationalError as e:
+            db.rollback()
+            print(f"feedback-writer: database unavailable, spilling {len(rows)} rows: {e}")
+            self._spill(rows)
+            return False
+        except Exception as e:
+            db.rollback()
+            print(f"feedback-writer: batch insert failed, retrying row by row: {e}")
+            self._flush_individually(db, rows)
+            return False
+        finally:
+            db.close()
+
+        return True
+
+    def _flush_individually(self, db, rows: list):
+        for row in rows:
+            try:
+                self._insert(db, [row])
+                db.commit()
+            except OperationalError:
+                db.rollback()
+                self._spill([row])
+            except Exception as e:
+                db.rollback()
+                print(f"feedback-writer: dropping feedback {row.get('id')}: {e}")
+
+    # ---- spill file ----
+
+    def _spill(self, rows: list):
+        with self._spill_lock, FEEDBACK_SPILL_PATH.open("a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_spill(self):
+        replaying = FEEDBACK_SPILL_PATH.with_suffix(".replaying")
+
+        # held throughout, so two processes never replay the same rows
+        with self._spill_lock:
+            # a leftover .replaying file means a replay was interrupted
+            if not replaying.exists():
+                if not FEEDBACK_SPILL_PATH.exists():
+                    return
+                FEEDBACK_SPILL_PATH.replace(replaying)
+
+            rows = []
+            with replaying.open(encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    for field in _UUID_FIELDS:
+                        row[field] = uuid.UUID(row[field])
+                    rows.append(row)
+
+            print(f"feedback-writer: replaying {len(rows)} spilled rows")
+
+            for start in range(0, len(rows), FEEDBACK_FLUSH_ROWS):
+                chunk = rows[start:start + FEEDBACK_FLUSH_ROWS]
+                db = session_local()
+                try:
+                    self._insert(db, chunk)
+                    db.commit()
+                except OperationalError:
+                    db.rollback()
+                    self._spill(rows[start:])  # still down, keep the rest
+                    break
+                except Exception:
+                    # e.g. rows already written before an interrupted replay
+                    db.rollback()
+                    self._flush_individually(db, chunk)
+                finally:
+                    db.close()
+
+            replaying.unlink(missing_ok=True)
+
+feedback_writer = FeedbackWriter()
@@ -1,20 +1,127 @@
+import gzip
+import json
+import os
+import re
 import sys
 from pathlib import Path
 import modal
 
+from app.services.cleaning_verdicts import (
+    CLASSIFY_KEY,
+    SAFETY_MODEL,
+    SAFETY_MODEL_REVISION,
+    SAFETY_THRESHOLDS,
+)
+
 ROOT = Path(__file__).resolve().parents[3]
 sys.path.append(str(ROOT))
 
 
-def trigger_gpu_cleaning(cpu_cleaned_jsonl_url: str):
+GPU_CLEANING_POLL_SECONDS = 60
+# texts per classifier forward pass on the GPU
+SAFETY_BATCH_SIZE = int(os.getenv("SAFETY_BATCH_SIZE", "64"))
+# "resident" (SafetyCleaner, batches shared across orgs) or "function" (gpu_clean_feedbacks)
+GPU_CLEANING_WORKER = os.getenv("GPU_CLEANING_WORKER", "resident")
+
+# verdict cache key of the local stand-in, so its empty scores never
+# pass for a real classifier's
+LOCAL_CLASSIFIER = "local"
+
+
+def resolve_safety_revision() -> str:
+    """
+    The commit SAFETY_MODEL_REVISION stands for on the GPU side: itself if
+    it is one, else the weight cache's current pin for that branch.
+    """
+    if re.fullmatch(r"[0-9a-f]{40}", SAFETY_MODEL_REVISION):
+        return SAFETY_MODEL_REVISION
+
     fn = modal.Function.from_name(
         "feedback-cleaning-dev",   # Modal app name
-        "gpu_clean_feedbacks",     # function name
+        "resolve_weights",         # function name
     )
+    return fn.remote(SAFETY_MODEL, SAFETY_MODEL_REVISION)
 
-    call = fn.spawn(
-        cpu_cleaned_jsonl_url,
-    )
 
-    result = call.get()   # Modal job wait karega
-    return result
+def trigger_gpu_cleaning(cpu_cleaned_jsonl_url: str, heartbeat=None, model_revision: str = SAFETY_MODEL_REVISION):
+    """
+    Only rows carrying CLASSIFY_KEY are classified; their scores come back
+    in result["scores"] keyed by fingerprint (see cleaning_verdicts).
+    Pass the commit from resolve_safety_revision() as model_revision, so
+    the scores come from the weights the cache key names.
+
+    GPU_CLEANING_WORKER=resident (the default) sends the dataset to the
+    warm SafetyCleaner service, which shares its GPU batches with other
+    orgs' datasets; "function" starts a gpu_clean_feedbacks container for
+    it alone.
+    """
+    if GPU_CLEANING_WORKER == "resident":
+        cleaner = modal.Cls.from_name(
+            "feedback-cleaning-dev",   # Modal app name
+            "SafetyCleaner",           # class name
+        )(
+            model_name=SAFETY_MODEL,
+            model_revision=model_revision,
+            batch_size=SAFETY_BATCH_SIZE,
+        )
+        call = cleaner.clean.spawn(
+            cpu_cleaned_jsonl_url,
+            thresholds=SAFETY_THRESHOLDS,
+            classify_key=CLASSIFY_KEY,
+        )
+    else:
+        fn = modal.Function.from_name(
+            "feedback-cleaning-dev",   # Modal app name
+            "gpu_clean_feedbacks",     # function name
+        )
+
+        call = fn.spawn(
+            cpu_cleaned_jsonl_url,
+            thresholds=SAFETY_THRESHOLDS,
+            classify_key=CLASSIFY_KEY,
+            model_name=SAFETY_MODEL,
+            model_revision=model_revision,
+            batch_size=SAFETY_BATCH_SIZE,
+        )
+
+    # Modal job wait karega; wake up periodically so the caller can heartbeat
+    while True:
+        try:
+            return call.get(timeout=GPU_CLEANING_POLL_SECONDS)
+        # still running: FunctionCall.get raises the builtin TimeoutError
+        # (modal.exception.TimeoutError's subclasses mean expired / timed out)
+        except TimeoutError:
+            if heartbeat is not None:
+                heartbeat()
+
+
+def local_gpu_cleaning(cpu_cleaned_path: Path):
+    """
+    In-process stand-in for gpu_clean_feedbacks (TRAINING_EXECUTOR=local).
+    No classifier: only rows with an empty output are dropped, and rows
+    carrying CLASSIFY_KEY get empty scores. Same return shape as the Modal
+    function, with a local path as the url; the output keeps the input's
+    gzip compression.
+    """
+    name = cpu_cleaned_path.name
+    output_path = cpu_cleaned_path.with_name(name.replace("_cpu.", "_gpu.", 1))
+
+    kept = 0
+    scores = {}
+    with gzip.open(cpu_cleaned_path, "rt", encoding="utf-8") as fin, gzip.open(output_path, "wt", encoding="utf-8") as fout:
+        for line in fin:
+            row = json.loads(line)
+            fingerprint = row.pop(CLASSIFY_KEY, None)
+            if fingerprint is not None:
+                scores[fingerprint] = {}
+            if not row.get("output", "").strip():
+                continue
+            fout.write(json.dumps(row, ensure_ascii=False) + "\n")
+            kept += 1
+
+    return {
+        "rows_kept": kept,
+        "cleaned_jsonl_url": str(output_path.resolve()),
+        "classified": len(scores),
+        "scores": scores,
+    }
@@ -0,0 +1,221 @@
+# app/services/jobs.py
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.db.models import Job
+from app.db.session import session_local
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# a RUNNING job whose heartbeat is older than this was orphaned by a dead process
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "900"))
+# "modal" runs GPU stages on Modal, "local" runs in-process stand-ins (no network)
+TRAINING_EXECUTOR = os.getenv("TRAINING_EXECUTOR", "modal").lower()
+
+JOB_ACTIVE = ("QUEUED", "RUNNING")
+JOB_TERMINAL = ("SUCCEEDED", "FAILED")
+
+
+class JobError(Exception):
+    """
+    Expected failure; the message is stored on the job as-is, no traceback.
+    """
+
+
+# returned by a handler that handed the work to a remote executor: the job
+# stays RUNNING until something reports completion (callback or poller)
+DETACHED = object()
+
+
+_handlers = {}
+_executor = None
+
+
+def job_handler(kind: str, on_failure=None):
+    """
+    Register `fn(db, job, report) -> dict` as the runner for `kind`.
+    `report(stage, progress)` persists progress; the returned dict becomes
+    job.result, or DETACHED leaves the job RUNNING. `on_failure(db, job)`
+    runs after a failure, e.g. to roll a model version back.
+    """
+    def register(fn):
+        _handlers[kind] = (fn, on_failure)
+        return fn
+
+    return register
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def create_job(db: Session, org_id, model_version_id, kind: str) -> Job:
+    """
+    Add a QUEUED job to the session. Caller commits, then submit_job().
+    A second active job of the same kind violates uq_job_active.
+    """
+    job = Job(
+        org_id=org_id,
+        model_version_id=model_version_id,
+        kind=kind,
+        status="QUEUED",
+        progress=0.0,
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def update_job(job_id, **fields):
+    """
+    Write job fields from any thread in a short session of its own, so
+    progress is visible while the handler's transaction is still open.
+    """
+    db = session_local()
+    try:
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(updated_at=_now(), **fields)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _claim(db: Session, job_id):
+    # atomic QUEUED -> RUNNING, so a job is never run twice
+    claimed = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == "QUEUED")
+        .values(status="RUNNING", started_at=_now(), updated_at=_now())
+        .returning(Job.id)
+    ).first()
+    db.commit()
+
+    return db.get(Job, job_id) if claimed else None
+
+
+def _run_job(job_id):
+    db = session_local()
+
+    try:
+        job = _claim(db, job_id)
+        if job is None:
+            return
+
+        handler, on_failure = _handlers[job.kind]
+
+        def report(stage: str, progress: float):
+            update_job(job_id, stage=stage, progress=progress)
+
+        try:
+            result = handler(db, job, report)
+        except Exception as e:
+            db.rollback()
+
+            if isinstance(e, JobError):
+                error = str(e)
+            else:
+                error = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+
+            print(f"job {job_id} ({job.kind}) failed: {error}")
+            update_job(job_id, status="FAILED", error=error[:2000], finished_at=_now())
+
+            if on_failure is not None:
+                on_failure(db, db.get(Job, job_id))
+            return
+
+        if result is DETACHED:
+            return
+
+        update_job(
+            job_id,
+            status="SUCCEEDED",
+            stage="done",
+            progress=1.0,
+            result=result,
+            finished_at=_now(),
+        )
+
+    except Exception:
+        db.rollback()
+        traceback.print_exc()
+
+    finally:
+        db.close()
+
+
+def submit_job(job_id):
+    if _executor is None:
+        raise RuntimeError("job runner not started")
+    _executor.submit(_run_job, job_id)
+
+
+def recover_jobs():
+    """
+    Re-queue RUNNING jobs whose heartbeat went stale (their process died)
+    and submit everything QUEUED. Detached jobs (external_id set) are left
+    to whoever reconciles their remote calls. Safe to run in several processes: the
+    claim in _run_job decides who actually runs a job.
+    """
+    db = session_local()
+
+    try:
+        db.execute(
+            update(Job)
+            .where(
+                Job.status == "RUNNING",
+                Job.external_id.is_(None),
+                Job.updated_at < _now() - timedelta(seconds=JOB_STALE_SECONDS),
+            )
+            .values(status="QUEUED", stage="requeued", updated_at=_now())
+        )
+        db.commit()
+
+        queued = (
+            db.query(Job.id)
+            .filter(Job.status == "QUEUED")
+            .order_by(Job.created_at)
+            .all()
+        )
+    finally:
+        db.close()
+
+    for (job_id,) in queued:
+        submit_job(job_id)
+
+    return len(queued)
+
+
+def start_job_runner():
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+
+    try:
+        recovered = recover_jobs()
+        if recovered:
+            print(f"job runner: resubmitted {recovered} queued jobs")
+    except Exception as e:
+        print(f"job runner: recovery skipped: {e}")
+
+
+def stop_job_runner():
+    """
+    Stop taking new work. Running jobs are not interrupted; if the process
+    exits under them their heartbeat goes stale and recover_jobs() picks
+    them up again.
+    """
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,169 @@
+# app/services/llm_adapter.py
+import copy
+import os
+import threading
+
+from cachetools import LRUCache
+from sqlalchemy import event
+
+from app.db.models import Organization
+from app.services.feedback import compile_path, walk_path
+
+
+# OpenAI-style chunk: {"choices": [{"delta": {"content": "..."}}]}
+DEFAULT_STREAM_TEXT_PATH = "choices[0].delta.content"
+DEFAULT_STREAM_DONE_MARKER = "[DONE]"
+
+LLM_ADAPTER_CACHE_SIZE = int(os.getenv("LLM_ADAPTER_CACHE_SIZE", "1024"))
+
+# canonical inputs that come from the request, everything else is static
+_REQUEST_KEYS = ("messages", "temperature", "max_tokens")
+
+_MISSING = object()
+
+
+class CompiledLLMAdapter:
+    """
+    An org's llm_request_schema compiled once: provider field mapping,
+    static headers (with the decrypted API key) and pre-split response paths.
+    """
+
+    __slots__ = (
+        "fingerprint",
+        "method",
+        "url",
+        "headers",
+        "text_path",
+        "stream_text_path",
+        "_fields",
+        "_model",
+        "_stream_key",
+    )
+
+    def __init__(self, org, fingerprint):
+        schema = org.llm_request_schema or {}
+
+        request_mapping = schema.get("request_mapping") or {}
+        payload_defaults = schema.get("payload_defaults") or {}
+        response_mapping = schema.get("response_mapping") or {}
+
+        self.fingerprint = fingerprint
+        self.method = schema.get("method", "POST").upper()
+        self.url = org.inference_url
+        self._model = org.model
+        self._stream_key = request_mapping.get("stream") or "stream"
+
+        # canonical → provider, resolved to either a request field or a constant
+        static = {"model": org.model}
+        for k, v in payload_defaults.items():
+            static.setdefault(k, v)
+
+        self._fields = []
+        for canonical_key, provider_key in request_mapping.items():
+            if not provider_key:
+                continue
+            if canonical_key in _REQUEST_KEYS:
+                self._fields.append((provider_key, canonical_key, _MISSING))
+            elif canonical_key in static:
+                self._fields.append((provider_key, None, static[canonical_key]))
+
+        self.headers = {
+            "Content-Type": "application/json",
+        }
+
+        auth_cfg = schema.get("auth")
+        api_key = org.llm_api_key
+
+        if auth_cfg and api_key:
+            header_name = auth_cfg.get("header", "Authorization")
+            prefix = auth_cfg.get("prefix", "")
+            self.headers[header_name] = f"{prefix}{api_key}"
+
+        text_path = response_mapping.get("text")
+        self.text_path = compile_path(text_path) if text_path else None
+        self.stream_text_path = compile_path(
+            response_mapping.get("stream_text") or DEFAULT_STREAM_TEXT_PATH
+        )
+
+    def build_request(self, payload, stream: bool = False):
+        """
+        Returns (method, headers, request_body) for a GenerateRequest.
+        """
+        values = {
+            "messages": [{"role": "user", "content": payload.prompt}],
+            "temperature": payload.temperature,
+            "max_tokens": payload.max_tokens,
+        }
+
+        request_body = {}
+        for provider_key, canonical_key, constant in self._fields:
+            request_body[provider_key] = (
+                values[canonical_key] if constant is _MISSING else constant
+            )
+
+        if self._model:
+            request_body["model"] = self._model
+
+        if stream:
+            request_body[self._stream_key] = True
+
+        return self.method, self.headers, request_body
+
+    def extract_text(self, response_json):
+        if self.text_path is None:
+            raise KeyError("response_mapping.text missing")
+        return walk_path(response_json, self.text_path)
+
+    def extract_stream_text(self, chunk_json):
+        return walk_path(chunk_json, self.stream_text_path)
+
+
+_adapters = LRUCache(maxsize=LLM_ADAPTER_CACHE_SIZE)
+_lock = threading.Lock()
+
+
+def _fingerprint(org) -> tuple:
+    # compared with ==, so the schema dict needs no serialisation per request
+    return (
+        org.inference_url,
+        org.model,
+        org.llm_api_key_encrypted,
+        org.llm_request_schema,
+    )
+
+
+def get_llm_adapter(org) -> CompiledLLMAdapter:
+    """
+    Return the compiled adapter for `org`, recompiling when any part of its
+    LLM configuration differs from what was cached.
+    """
+    key = str(org.id)
+    fingerprint = _fingerprint(org)
+
+    with _lock:
+        adapter = _adapters.get(key)
+
+    if adapter is not None and adapter.fingerprint == fingerprint:
+        return adapter
+
+    adapter = CompiledLLMAdapter(org, copy.deepcopy(fingerprint))
+
+    with _lock:
+        _adapters[key] = adapter
+
+    return adapter
+
+
+def invalidate_llm_adapter(org_id):
+    with _lock:
+        _adapters.pop(str(org_id), None)
+
+
+@event.listens_for(Organization, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    invalidate_llm_adapter(target.id)
+
+
+@event.listens_for(Organization, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    invalidate_llm_adapter(target.id)
@@ -0,0 +1,175 @@
+# app/services/llm_client.py
+import asyncio
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import HTTPException, status
+
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() in ("true", "1", "yes")
+
+# pool limits, applied per upstream origin
+LLM_MAX_CONNECTIONS_PER_HOST = int(os.getenv("LLM_MAX_CONNECTIONS_PER_HOST", "20"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+# tenant isolation: in-flight upstream calls per org, and how long to queue for a slot
+LLM_MAX_CONCURRENCY_PER_ORG = int(os.getenv("LLM_MAX_CONCURRENCY_PER_ORG", "8"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "5"))
+
+
+# httpx limits are per client, so each upstream origin gets its own pool.
+# Keeping pools small also matters for CPU: httpcore scans every pooled
+# connection when assigning a request.
+_clients: dict[str, httpx.AsyncClient] = {}
+_org_slots: dict[str, asyncio.Semaphore] = {}
+_host_slots: dict[str, asyncio.Semaphore] = {}
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_llm_client(url: str) -> httpx.AsyncClient:
+    """
+    Process-wide pooled client for the origin of `url`, created lazily
+    inside the running loop. Connections are kept alive between chat turns
+    so only the first request to an org's endpoint pays for TCP + TLS.
+    """
+    origin = _origin(url)
+    client = _clients.get(origin)
+
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=LLM_HTTP2,
+            timeout=httpx.Timeout(
+                LLM_TIMEOUT_SECONDS,
+                connect=LLM_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS_PER_HOST,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+        _clients[origin] = client
+
+    return client
+
+
+async def close_llm_client():
+    clients = list(_clients.values())
+    _clients.clear()
+
+    for client in clients:
+        await client.aclose()
+
+    _org_slots.clear()
+    _host_slots.clear()
+
+
+async def _acquire(sem: asyncio.Semaphore, detail: str):
+    try:
+        await asyncio.wait_for(sem.acquire(), timeout=LLM_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+        )
+
+
+@asynccontextmanager
+async def llm_slot(org_id, url: str):
+    """
+    Hold one per-org and one per-host slot for the duration of an upstream
+    call, so a slow tenant endpoint queues only its own requests.
+    """
+    host = _origin(url)
+    org_sem = _org_slots.setdefault(
+        str(org_id), asyncio.Semaphore(LLM_MAX_CONCURRENCY_PER_ORG)
+    )
+    host_sem = _host_slots.setdefault(
+        host, asyncio.Semaphore(LLM_MAX_CONNECTIONS_PER_HOST)
+    )
+
+    await _acquire(org_sem, "Too many concurrent generation requests for this organization")
+    try:
+        await _acquire(host_sem, "LLM endpoint is saturated, retry shortly")
+        try:
+            yield
+        finally:
+            host_sem.release()
+    finally:
+        org_sem.release()
+
+
+async def send_llm_request(
+    org_id,
+    method: str,
+    url: str,
+    headers: dict,
+    body: dict,
+) -> httpx.Response:
+    async with llm_slot(org_id, url):
+        return await get_llm_client(url).request(
+            method,
+            url,
+            headers=headers,
+            json=body,
+        )
+
+
+async def open_llm_stream(
+    org_id,
+    method: str,
+    url: str,
+    headers: dict,
+    body: dict,
+):
+    """
+    Start a streamed upstream call. Returns (response, stack); the org/host
+    slots and the connection stay held until the caller runs
+    `await stack.aclose()`.
+    """
+    stack = AsyncExitStack()
+
+    try:
+        await stack.enter_async_context(llm_slot(org_id, url))
+        response = await stack.enter_async_context(
+            get_llm_client(url).stream(
+                method,
+                url,
+                headers=headers,
+                json=body,
+            )
+        )
+    except BaseException:
+        await stack.aclose()
+        raise
+
+    return response, stack
+
+
+async def iter_sse_data(response: httpx.Response):
+    """
+    Yield the `data:` payloads of an upstream server-sent-events stream,
+    joining multi-line events.
+    """
+    data_lines = []
+
+    async for line in response.aiter_lines():
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+
+        if line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+
+    if data_lines:
+        yield "\n".join(data_lines)
@@ -0,0 +1,138 @@
+# app/services/model_version.py
+import os
+import threading
+
+from cachetools import TTLCache
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.models import Feedback, ModelVersion, ModelVersionFeedback
+
+
+DEPLOYED_VERSION_CACHE_SIZE = int(os.getenv("DEPLOYED_VERSION_CACHE_SIZE", "4096"))
+DEPLOYED_VERSION_CACHE_TTL_SECONDS = float(os.getenv("DEPLOYED_VERSION_CACHE_TTL_SECONDS", "30"))
+
+# org_id -> id of the version in COLLECTING_FEEDBACK
+_deployed = TTLCache(
+    maxsize=DEPLOYED_VERSION_CACHE_SIZE,
+    ttl=DEPLOYED_VERSION_CACHE_TTL_SECONDS,
+)
+_lock = threading.Lock()
+
+
+def get_deployed_version_id(db: Session, org_id):
+    """
+    Id of the org's deployed (COLLECTING_FEEDBACK) model version, or None.
+
+    Hits are served from a per-process TTL cache; misses are a single probe
+    on the uq_model_version_org_collecting partial index. Transitions made
+    in this process invalidate explicitly, other workers converge within
+    DEPLOYED_VERSION_CACHE_TTL_SECONDS.
+    """
+    key = str(org_id)
+
+    with _lock:
+        version_id = _deployed.get(key)
+
+    if version_id is not None:
+        return version_id
+
+    row = (
+        db.query(ModelVersion.id)
+        .filter(
+            ModelVersion.org_id == org_id,
+            ModelVersion.status == "COLLECTING_FEEDBACK",
+        )
+        .one_or_none()
+    )
+
+    if row is None:
+        # not cached: a version may be created at any moment
+        return None
+
+    with _lock:
+        _deployed[key] = row.id
+
+    return row.id
+
+
+def get_deployed_version(db: Session, org_id):
+    """
+    The deployed ModelVersion row, for callers that read or mutate it.
+    Re-checks the status so a stale cache entry cannot leak a version that
+    has already moved on.
+    """
+    for _ in range(2):
+        version_id = get_deployed_version_id(db, org_id)
+
+        if version_id is None:
+            return None
+
+        model_version = db.get(ModelVersion, version_id)
+
+        if model_version is not None and model_version.status == "COLLECTING_FEEDBACK":
+            return model_version
+
+        # stale entry: drop it and resolve once more from the database
+        invalidate_deployed_version(org_id)
+
+    return None
+
+
+def lock_deployed_version_id(db: Session, org_id):
+    """
+    For writers: the deployed version's id, re-checked and share-locked in
+    the caller's transaction, or None. Until the caller commits, a
+    transition out of COLLECTING_FEEDBACK (start-training) waits, so rows
+    written here are visible to the version's /filter.
+    """
+    for _ in range(2):
+        version_id = get_deployed_version_id(db, org_id)
+
+        if version_id is None:
+            return None
+
+        locked = (
+            db.query(ModelVersion.id)
+            .filter(
+                ModelVersion.id == version_id,
+                ModelVersion.status == "COLLECTING_FEEDBACK",
+            )
+            .with_for_update(read=True)
+            .scalar()
+        )
+
+        if locked is not None:
+            return locked
+
+        invalidate_deployed_version(org_id)
+
+    return None
+
+
+def invalidate_deployed_version(org_id):
+    with _lock:
+        _deployed.pop(str(org_id), None)
+
+
+def selected_feedback_query(db: Session, model_version_id):
+    """
+    Feedback rows selected for training on `model_version_id`.
+    """
+    return (
+        db.query(Feedback)
+        .join(
+            ModelVersionFeedback,
+            ModelVersionFeedback.feedback_id == Feedback.id,
+        )
+        .filter(ModelVersionFeedback.model_version_id == model_version_id)
+    )
+
+
+def count_selected_feedback(db: Session, model_version_id) -> int:
+    return (
+        db.query(func.count())
+        .select_from(ModelVersionFeedback)
+        .filter(ModelVersionFeedback.model_version_id == model_version_id)
+        .scalar()
+    )
@@ -33,7 +33,7 @@ def create_organization_with_initial_model(db: Session, payload):
 
     print('between org creation')
 
-    org.hmac_secret = secrets.token_urlsafe(16)
+    org.hmac = secrets.token_urlsafe(16)
     
     if payload.llm_config.api_key: org.llm_api_key = payload.llm_config.api_key
     # print('created org')
@@ -45,7 +45,6 @@ def create_organization_with_initial_model(db: Session, payload):
         org_id=org.id,
         version=0,
         parent_model_version_id=None,
-        feedback_ids=[],
         status="COLLECTING_FEEDBACK",
         sha256="bootstrap"  # explicit placeholder
     )
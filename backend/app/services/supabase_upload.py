@@ -1,26 +1,34 @@
-# app/services/supabase_storage.py
-from supabase import create_client
-import os
+# app/services/supabase_upload.py
+import sys
 from pathlib import Path
+from typing import Iterable
 
-supabase = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_SERVICE_ROLE_KEY"),
-)
+ROOT = Path(__file__).resolve().parents[3]  # project root
+sys.path.append(str(ROOT))
+
+from modal_apps.storage import storage_from_env
 
 BUCKET = "training-data"
 
+# export chunk size: one Supabase resumable (TUS) chunk; the storage
+# backend rechunks to its own part size anyway
+UPLOAD_CHUNK_BYTES = 6 * 1024 * 1024
+
 
 def upload_jsonl(file_path: Path, object_path: str) -> str:
-    with file_path.open("rb") as f:
-        supabase.storage.from_(BUCKET).upload(
-            path=object_path,
-            file=f,
-            file_options={
-                "content-type": "application/jsonl",
-                "upsert": False,
-            },
-        )
-
-    # public url
-    return supabase.storage.from_(BUCKET).get_public_url(object_path)
+    """Upload a file (chunked, resumable after a failure). Returns its url."""
+    return storage_from_env(BUCKET).upload_file(file_path, object_path, "application/jsonl")
+
+
+def upload_stream(
+    chunks: Iterable[bytes],
+    object_path: str,
+    content_type: str,
+    bucket: str = BUCKET,
+) -> str:
+    """
+    Upload a stream of unknown length through the configured storage
+    backend (STORAGE_BACKEND, see modal_apps/storage.py): only a few parts
+    are held in memory. Replaces an existing object. Returns its url.
+    """
+    return storage_from_env(bucket).upload_stream(chunks, object_path, content_type)
@@ -1,4 +1,6 @@
+import json
 import sys
+import tempfile
 from pathlib import Path
 
 import modal
@@ -6,23 +8,83 @@ import modal
 ROOT = Path(__file__).resolve().parents[3]  # project root
 sys.path.append(str(ROOT))
 
+from modal_apps.artifact_store import FilesystemArtifactStore
 
 
-
-
-def trigger_training(model_version_id: str, json_url: str, adapter_config_json: str):
-
-    fn = modal.Function.from_name(
+def _train_lora_fn():
+    return modal.Function.from_name(
         "lora-training-dev",   # app name
         "train_lora",          # function name
     )
 
-    call = fn.spawn(
+
+def spawn_training(
+    model_version_id: str,
+    json_url: str,
+    adapter_config_json: str,
+    job_id: str = None,
+    callback_url: str = None,
+    parent_adapter_url: str = None,
+    replay_json_urls: list = None,
+    metrics_url: str = None,
+) -> str:
+    """
+    Start train_lora on Modal without waiting. Returns the call id, to be
+    polled with get_training_result(). With parent_adapter_url the LoRA
+    continues from that adapter; replay_json_urls are earlier datasets to
+    sample replay rows from; metrics_url receives live telemetry.
+    """
+    call = _train_lora_fn().spawn(
         model_version_id,
         json_url,
         adapter_config_json,
+        job_id,
+        callback_url,
+        parent_adapter_url=parent_adapter_url,
+        replay_json_urls=replay_json_urls or [],
+        metrics_url=metrics_url,
     )
 
-    result = call.get()  # waits for Modal job
+    return call.object_id
+
+
+def get_training_result(call_id: str):
+    """
+    The train_lora result dict, or None while the call is still running.
+    Raises whatever the remote function raised if it failed.
+    """
+    try:
+        return modal.FunctionCall.from_id(call_id).get(timeout=0)
+    except TimeoutError:
+        # pending calls raise the builtin TimeoutError; modal's own
+        # TimeoutError subclasses (expired output, function timeout) are failures
+        return None
+
+
+def local_training(model_version_id: str, adapter_config_json: str, output_dir: Path, parent_adapter_url: str = None):
+    """
+    In-process stand-in for train_lora (TRAINING_EXECUTOR=local). Trains
+    nothing: publishes the adapter config to a filesystem artifact store
+    under output_dir/artifacts and returns the same shape as the Modal
+    function (adapter_dir is the manifest path).
+    """
+    store = FilesystemArtifactStore(output_dir / "artifacts")
+
+    with tempfile.TemporaryDirectory() as adapter_dir:
+        adapter_dir = Path(adapter_dir)
+        (adapter_dir / "adapter_config.json").write_text(
+            json.dumps(json.loads(adapter_config_json), indent=2),
+            encoding="utf-8",
+        )
+
+        artifact = store.publish(model_version_id, adapter_dir)
+        files = [p.name for p in adapter_dir.iterdir()]
 
-    return result
+    return {
+        "model_version_id": model_version_id,
+        "adapter_dir": artifact["ref"],
+        "sha256": artifact["sha256"],
+        "artifact": artifact,
+        "files": files,
+        "warm_start_from": parent_adapter_url,
+    }
@@ -0,0 +1,306 @@
+# app/services/training_dispatch.py
+"""
+The "train_lora" job behind /v1/training/configure-lora.
+
+The handler only dispatches: it spawns the Modal call, records its id on
+the job and detaches. Completion comes from whichever arrives first:
+
+  - the worker's signed callback (POST /v1/training/callback)
+  - the poller, which checks in-flight calls every TRAINING_POLL_SECONDS
+
+Both end in complete_training() / fail_training(), which lock the job and
+are no-ops once it is terminal, so the READY transition and the bootstrap
+of the next version happen exactly once.
+"""
+import json
+import os
+import threading
+import traceback
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.models import Job, ModelVersion
+from app.db.session import session_local
+from app.services.dataset_preparation import TRAINING_DATA_DIR
+from app.services.jobs import (
+    DETACHED,
+    JOB_TERMINAL,
+    TRAINING_EXECUTOR,
+    JobError,
+    job_handler,
+    update_job,
+)
+from app.services.model_version import invalidate_deployed_version
+from app.services.training import get_training_result, local_training, spawn_training
+
+
+TRAIN_LORA = "train_lora"
+
+# public url of /v1/training/callback; unset = rely on the poller alone
+TRAINING_CALLBACK_URL = os.getenv("TRAINING_CALLBACK_URL")
+# public url of /v1/training/metrics (telemetry); defaults to the callback's sibling
+TRAINING_METRICS_URL = os.getenv("TRAINING_METRICS_URL") or (
+    TRAINING_CALLBACK_URL.rsplit("/", 1)[0] + "/metrics" if TRAINING_CALLBACK_URL else None
+)
+TRAINING_POLL_SECONDS = float(os.getenv("TRAINING_POLL_SECONDS", "60"))
+# how many ancestor datasets replay sampling may draw from
+REPLAY_MAX_VERSIONS = int(os.getenv("REPLAY_MAX_VERSIONS", "5"))
+
+
+def warm_start_parent(db: Session, model_version: ModelVersion):
+    """
+    The parent version if its adapter can be trained further, else None.
+    """
+    if model_version.parent_model_version_id is None:
+        return None
+
+    parent = db.get(ModelVersion, model_version.parent_model_version_id)
+
+    if parent is None or parent.status != "READY" or not parent.adapter_url or not parent.adapter_config:
+        return None
+
+    return parent
+
+
+def warm_start_mismatch(parent: ModelVersion, adapter_config: dict):
+    """
+    Why `adapter_config` cannot continue the parent's adapter, or None.
+    """
+    if parent.adapter_config["base_model"] != adapter_config["base_model"]:
+        return "base_model differs from the parent version's"
+
+    parent_lora, lora = parent.adapter_config["lora"], adapter_config["lora"]
+
+    if parent_lora["r"] != lora["r"] or set(parent_lora["target_modules"]) != set(lora["target_modules"]):
+        return "LoRA r / target_modules differ from the parent version's"
+
+    return None
+
+
+def replay_dataset_urls(db: Session, model_version: ModelVersion) -> list:
+    """
+    Cleaned dataset urls of up to REPLAY_MAX_VERSIONS ancestors, newest first.
+    """
+    urls = []
+    parent_id = model_version.parent_model_version_id
+
+    while parent_id is not None and len(urls) < REPLAY_MAX_VERSIONS:
+        parent = db.get(ModelVersion, parent_id)
+        if parent is None:
+            break
+        if parent.json_url:
+            urls.append(parent.json_url)
+        parent_id = parent.parent_model_version_id
+
+    return urls
+
+
+def _lock_training_job(db: Session, job_id):
+    job = db.get(Job, job_id, with_for_update=True, populate_existing=True)
+
+    if job is None or job.kind != TRAIN_LORA or job.status in JOB_TERMINAL:
+        db.rollback()
+        return None
+
+    return job
+
+
+def _revert_version(db: Session, model_version_id):
+    # back to TRAINING_REQUESTED so the adapter can be configured again
+    model_version = db.get(
+        ModelVersion, model_version_id, with_for_update=True, populate_existing=True
+    )
+
+    if model_version is not None and model_version.status == "TRAINING_IN_PROGRESS":
+        model_version.status = "TRAINING_REQUESTED"
+        model_version.adapter_config = None
+
+
+def complete_training(db: Session, job_id, result: dict) -> bool:
+    """
+    Mark the version READY and bootstrap the next one. Returns False if
+    the job was already settled.
+    """
+    job = _lock_training_job(db, job_id)
+    if job is None:
+        return False
+
+    model_version = db.get(
+        ModelVersion, job.model_version_id, with_for_update=True, populate_existing=True
+    )
+
+    if model_version.status == "TRAINING_IN_PROGRESS":
+        model_version.status = "READY"
+        model_version.adapter_url = result["adapter_dir"]
+        # manifest digest from the artifact store; older workers send none
+        model_version.sha256 = result.get("sha256") or model_version.sha256
+
+        next_model_version = ModelVersion(
+            org_id = model_version.org_id,
+            version = model_version.version + 1,
+            parent_model_version_id = model_version.id,
+            status="COLLECTING_FEEDBACK",
+            sha256="bootstrap"
+        )
+
+        db.add(next_model_version)
+
+    job.status = "SUCCEEDED"
+    job.stage = "done"
+    job.progress = 1.0
+    job.result = result
+    job.finished_at = func.now()
+    job.updated_at = func.now()
+
+    org_id = job.org_id
+    db.commit()
+    invalidate_deployed_version(org_id)
+
+    return True
+
+
+def fail_training(db: Session, job_id, error: str) -> bool:
+    job = _lock_training_job(db, job_id)
+    if job is None:
+        return False
+
+    _revert_version(db, job.model_version_id)
+
+    job.status = "FAILED"
+    job.error = error[:2000]
+    job.finished_at = func.now()
+    job.updated_at = func.now()
+
+    db.commit()
+    print(f"training job {job_id} failed: {error}")
+
+    return True
+
+
+def _on_dispatch_failure(db: Session, job: Job):
+    _revert_version(db, job.model_version_id)
+    db.commit()
+
+
+@job_handler(TRAIN_LORA, on_failure=_on_dispatch_failure)
+def train_lora(db, job, report):
+    model_version = db.get(ModelVersion, job.model_version_id)
+
+    if model_version is None or model_version.status != "TRAINING_IN_PROGRESS":
+        raise JobError("Model version is not waiting for training")
+
+    adapter_config = model_version.adapter_config
+    adapter_config_json = json.dumps(adapter_config)
+    training_cfg = adapter_config["training"]
+
+    parent_adapter_url = None
+    if training_cfg.get("warm_start"):
+        parent = warm_start_parent(db, model_version)
+        if parent is None:
+            raise JobError("Warm start needs a READY parent version with an adapter")
+
+        mismatch = warm_start_mismatch(parent, adapter_config)
+        if mismatch:
+            raise JobError(f"Cannot warm start: {mismatch}")
+
+        parent_adapter_url = parent.adapter_url
+
+    replay_json_urls = []
+    if training_cfg.get("replay_fraction"):
+        replay_json_urls = replay_dataset_urls(db, model_version)
+
+    if TRAINING_EXECUTOR == "local":
+        report("training", 0.1)
+        result = local_training(
+            str(model_version.id),
+            adapter_config_json,
+            TRAINING_DATA_DIR,
+            parent_adapter_url=parent_adapter_url,
+        )
+        db.rollback()
+
+        # same completion path as a callback; the job is settled already
+        complete_training(db, job.id, result)
+        return DETACHED
+
+    report("dispatching", 0.05)
+    call_id = spawn_training(
+        model_version_id=str(model_version.id),
+        json_url=model_version.json_url,
+        adapter_config_json=adapter_config_json,
+        job_id=str(job.id),
+        callback_url=TRAINING_CALLBACK_URL,
+        metrics_url=TRAINING_METRICS_URL,
+        parent_adapter_url=parent_adapter_url,
+        replay_json_urls=replay_json_urls,
+    )
+    update_job(job.id, external_id=call_id, stage="training", progress=0.1)
+
+    return DETACHED
+
+
+# ---- poller ----
+
+def reconcile_training_jobs() -> int:
+    """
+    Settle detached training jobs whose Modal call has finished. Returns
+    how many were settled.
+    """
+    db = session_local()
+    settled = 0
+
+    try:
+        in_flight = (
+            db.query(Job.id, Job.external_id)
+            .filter(
+                Job.kind == TRAIN_LORA,
+                Job.status == "RUNNING",
+                Job.external_id.isnot(None),
+            )
+            .all()
+        )
+        db.rollback()
+
+        for job_id, call_id in in_flight:
+            try:
+                result = get_training_result(call_id)
+            except Exception as e:
+                settled += fail_training(db, job_id, f"{type(e).__name__}: {e}")
+                continue
+
+            if result is not None:
+                settled += complete_training(db, job_id, result)
+
+    finally:
+        db.close()
+
+    return settled
+
+
+_poller_stop = threading.Event()
+_poller = None
+
+
+def _poll_loop():
+    while not _poller_stop.wait(TRAINING_POLL_SECONDS):
+        try:
+            reconcile_training_jobs()
+        except Exception:
+            traceback.print_exc()
+
+
+def start_training_poller():
+    global _poller
+
+    # local training completes in-process, nothing to reconcile
+    if TRAINING_EXECUTOR == "local" or (_poller is not None and _poller.is_alive()):
+        return
+
+    _poller_stop.clear()
+    _poller = threading.Thread(target=_poll_loop, name="training-poller", daemon=True)
+    _poller.start()
+
+
+def stop_training_poller():
+    _poller_stop.set()
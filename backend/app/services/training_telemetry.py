@@ -0,0 +1,167 @@
+# app/services/training_telemetry.py
+"""
+Live telemetry of train_lora runs.
+
+The trainer's callback (modal_apps/train_lora_app.py, telemetry_callback)
+posts a batch of points every TELEMETRY_INTERVAL_SECONDS to the signed
+POST /v1/training/metrics; each point is one logging step: loss, learning
+rate, seconds per step, tokens/s and peak memory. store_metrics() keeps
+them per job and ModelVersion and moves the job's progress bar.
+Without a metrics URL the trainer writes the same request bodies to a
+JSONL file on a Modal volume instead, which can be posted afterwards
+(FileTelemetrySink).
+
+training_progress() is what GET /v1/training/progress/{model_version_id}
+returns: the latest point, an ETA from the recent step time, and whether
+the run looks stalled (RUNNING but silent for TELEMETRY_STALL_SECONDS).
+Silence only means something when the trainer reports to this backend:
+without TRAINING_METRICS_URL (or the local executor) a run is never
+flagged stalled until it has reported at least once.
+"""
+import os
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models import Job, ModelVersion, TrainingMetric
+from app.services.training_dispatch import TRAIN_LORA, TRAINING_EXECUTOR, TRAINING_METRICS_URL
+
+
+TELEMETRY_STALL_SECONDS = int(os.getenv("TELEMETRY_STALL_SECONDS", "600"))
+# points returned by the progress endpoint (evenly thinned out beyond this)
+TELEMETRY_MAX_POINTS = int(os.getenv("TELEMETRY_MAX_POINTS", "200"))
+# points averaged for the ETA's seconds per step
+ETA_WINDOW_POINTS = 5
+
+# the trainer's share of the job's progress bar (dispatch takes 0-0.1)
+TRAINING_PROGRESS_START = 0.1
+TRAINING_PROGRESS_END = 0.95
+
+POINT_FIELDS = (
+    "max_steps",
+    "epoch",
+    "loss",
+    "learning_rate",
+    "grad_norm",
+    "step_seconds",
+    "tokens_per_second",
+    "peak_memory_mb",
+)
+
+
+def store_metrics(db: Session, job: Job, points: list) -> int:
+    """
+    Insert the points of `job` (repeats of a step are ignored) and, while
+    the job runs, move its progress to the latest step. Returns how many
+    points were new.
+    """
+    if not points:
+        return 0
+
+    rows = [
+        {
+            "job_id": job.id,
+            "model_version_id": job.model_version_id,
+            "step": p["step"],
+            **{field: p.get(field) for field in POINT_FIELDS},
+        }
+        for p in points
+    ]
+
+    stored = db.execute(
+        pg_insert(TrainingMetric)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["job_id", "step"])
+        .returning(TrainingMetric.step)
+    ).all()
+
+    latest = max(points, key=lambda p: p["step"])
+    if latest.get("max_steps"):
+        done = min(latest["step"] / latest["max_steps"], 1.0)
+        db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == "RUNNING")
+            .values(
+                stage="training",
+                progress=TRAINING_PROGRESS_START + done * (TRAINING_PROGRESS_END - TRAINING_PROGRESS_START),
+                updated_at=datetime.now(timezone.utc),
+            )
+        )
+
+    db.commit()
+    return len(stored)
+
+
+def _point(metric: TrainingMetric) -> dict:
+    return {"step": metric.step, **{field: getattr(metric, field) for field in POINT_FIELDS}}
+
+
+def _thin(points: list, limit: int) -> list:
+    # every n-th point, always keeping the latest
+    if len(points) <= limit:
+        return points
+    stride = -(-len(points) // limit)
+    return points[::-1][::stride][::-1]
+
+
+def training_progress(db: Session, model_version: ModelVersion) -> dict:
+    """
+    Progress of the version's latest train_lora job; see TrainingProgressOut.
+    """
+    progress = {"model_version_id": model_version.id, "stalled": False, "points": []}
+
+    job = (
+        db.query(Job)
+        .filter(Job.model_version_id == model_version.id, Job.kind == TRAIN_LORA)
+        .order_by(Job.created_at.desc())
+        .first()
+    )
+    if job is None:
+        return progress
+
+    progress.update(job_id=job.id, job_status=job.status)
+
+    metrics = (
+        db.query(TrainingMetric)
+        .filter(TrainingMetric.job_id == job.id)
+        .order_by(TrainingMetric.step)
+        .all()
+    )
+
+    now = datetime.now(timezone.utc)
+    last_report_at = metrics[-1].created_at if metrics else None
+    silent_since = last_report_at or job.started_at or job.created_at
+    reporting = bool(metrics) or (TRAINING_METRICS_URL is not None and TRAINING_EXECUTOR != "local")
+    progress["stalled"] = (
+        reporting
+        and job.status == "RUNNING"
+        and (now - silent_since).total_seconds() > TELEMETRY_STALL_SECONDS
+    )
+
+    if not metrics:
+        return progress
+
+    latest = metrics[-1]
+    recent = [m.step_seconds for m in metrics[-ETA_WINDOW_POINTS:] if m.step_seconds]
+    step_seconds = sum(recent) / len(recent) if recent else None
+
+    eta_seconds = None
+    if step_seconds and latest.max_steps and job.status == "RUNNING":
+        eta_seconds = round(max(latest.max_steps - latest.step, 0) * step_seconds, 1)
+
+    progress.update(
+        step=latest.step,
+        max_steps=latest.max_steps,
+        progress=round(latest.step / latest.max_steps, 4) if latest.max_steps else None,
+        loss=latest.loss,
+        learning_rate=latest.learning_rate,
+        step_seconds=step_seconds,
+        tokens_per_second=latest.tokens_per_second,
+        peak_memory_mb=max((m.peak_memory_mb or 0) for m in metrics) or None,
+        eta_seconds=eta_seconds,
+        last_report_at=last_report_at,
+        points=_thin([_point(m) for m in metrics], TELEMETRY_MAX_POINTS),
+    )
+    return progress
@@ -0,0 +1,96 @@
+# scripts/bench_cleaning_worker.py
+"""
+Many small datasets from different orgs through the safety cleaning step
+(modal_apps/clean_feedback_app.py), on CPU:
+
+  one-shot   what gpu_clean_feedbacks does: per dataset, load the
+             classifier (a cold start) and clean it alone
+  resident   one CleaningWorker (what SafetyCleaner runs in its warm
+             container), every dataset submitted at once; their rows
+             share batches
+
+Datasets live in a temporary FilesystemStorage. Reports wall seconds,
+cold starts (model loads), batches, mean rows per batch, batches holding
+rows of several datasets, and the model's utilization.
+
+Usage (needs torch, transformers), e.g. with a tiny classifier:
+    python scripts/bench_cleaning_worker.py --orgs 12 --rows 150 \\
+        --model hf-internal-testing/tiny-random-BertForSequenceClassification
+"""
+import argparse
+import gzip
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent / "modal_apps"))
+
+from clean_feedback_app import CleaningWorker, clean_dataset, load_classifier, synthetic_texts
+from storage import FilesystemStorage
+
+
+def write_datasets(storage: FilesystemStorage, orgs: int, rows: int) -> list:
+    texts = synthetic_texts(orgs * rows)
+    urls = []
+    for org in range(orgs):
+        data = "".join(
+            json.dumps({"instruction": "i", "input": "", "output": t}) + "\n"
+            for t in texts[org * rows:(org + 1) * rows]
+        )
+        urls.append(storage.upload_bytes(gzip.compress(data.encode()), f"org{org}/cpu_cleaned.jsonl.gz", "application/gzip"))
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="unitary/toxic-bert")
+    parser.add_argument("--orgs", type=int, default=12)
+    parser.add_argument("--rows", type=int, default=150, help="rows per org dataset")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = FilesystemStorage(Path(tmp) / "training-data")
+        workdir = Path(tmp) / "work"
+        workdir.mkdir()
+
+        # one-shot: a model load per dataset
+        urls = write_datasets(storage, args.orgs, args.rows)
+        started = time.perf_counter()
+        one_shot = []
+        for url in urls:
+            score = load_classifier(args.model, device="cpu")
+            one_shot.append(clean_dataset(url, score, None, None, args.batch_size, storage, workdir))
+        one_shot_seconds = time.perf_counter() - started
+
+        # resident: one load, every dataset at once
+        urls = write_datasets(storage, args.orgs, args.rows)
+        started = time.perf_counter()
+        worker = CleaningWorker(args.model, "cpu", args.batch_size, storage, workdir)
+        with ThreadPoolExecutor(max_workers=args.orgs) as pool:
+            resident = list(pool.map(worker.clean, urls))
+        resident_seconds = time.perf_counter() - started
+        stats = worker.stats()
+        worker.close()
+
+    assert [r["rows_kept"] for r in one_shot] == [r["rows_kept"] for r in resident]
+
+    print(f"\n{args.orgs} datasets x {args.rows} rows, batch {args.batch_size}, {args.model} on CPU")
+    print(f"{'mode':<10} {'seconds':>8} {'cold starts':>12} {'batches':>8} {'rows/batch':>11} {'shared':>7} {'util':>6}")
+    one_shot_batches = sum(-(-r["classified"] // args.batch_size) for r in one_shot)
+    print(
+        f"{'one-shot':<10} {one_shot_seconds:>8.2f} {args.orgs:>12} {one_shot_batches:>8} "
+        f"{args.orgs * args.rows / one_shot_batches:>11.1f} {0:>7} {'-':>6}"
+    )
+    print(
+        f"{'resident':<10} {resident_seconds:>8.2f} {sum(r['worker']['cold_start'] for r in resident):>12} "
+        f"{stats['batches']:>8} {stats['mean_batch_rows']:>11.1f} {stats['shared_batches']:>7} {stats['utilization']:>6.0%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# scripts/bench_cpu_cleaning.py
+"""
+Throughput and peak memory of CPU cleaning on synthetic feedback.
+
+Each case runs in a fresh forked process, so peak RSS is per case:
+"peak MB" is the benchmark process (input generator + cleaning + dedup
+set), "workers MB" the largest pool worker. Rows are generated lazily,
+so neither includes a materialised input.
+
+Cases:
+  legacy   the previous per-row implementation (uncompiled patterns,
+           normalize_text several times per row), kept inline below
+  serial   iter_cpu_clean with CLEANING_PROCESSES=1
+  parallel iter_cpu_clean with the process pool
+
+At the smallest size the outputs of all cases are compared row by row.
+
+Usage:
+    python scripts/bench_cpu_cleaning.py --sizes 10000 100000 1000000
+"""
+import argparse
+import hashlib
+import multiprocessing
+import random
+import re
+import resource
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.schemas import jsonl_cleaning
+
+
+# ---- synthetic feedback ----
+
+WORDS = (
+    "the model answer should include more context about pricing refunds "
+    "shipping policy account settings error code retry later support team "
+    "customer order invoice delivery window warranty return label"
+).split()
+
+PII = ["call me at 9876543210", "mail jane.doe@example.com", "api_key = sk-123", "password: hunter2"]
+MISALIGNED = ["As an AI I cannot say", "I cannot help with that", "The model should have refused"]
+
+
+def sentence_pool(rng, size, low, high):
+    # precomputed, so generation is cheap next to the cleaning being measured
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+        for _ in range(size)
+    ]
+
+
+def synthetic_feedback(rows: int, seed: int = 7):
+    """
+    Roughly: 70% clean, 10% duplicates, 5% PII, 5% misaligned, 10%
+    structurally invalid (empty, too short, output == prompt).
+    """
+    rng = random.Random(seed)
+    prompts = sentence_pool(rng, 2000, 8, 16)
+    responses = sentence_pool(rng, 2000, 30, 50)
+    corrections = sentence_pool(rng, 2000, 10, 60)
+    recent = []
+
+    for i in range(rows):
+        roll = rng.random()
+        prompt = f"{rng.choice(prompts)} #{i}"
+        model_response = rng.choice(responses)
+        corrected = rng.choice(corrections)
+
+        if roll < 0.10 and recent:
+            prompt, model_response, corrected = rng.choice(recent)
+            # same fingerprint, different spacing / case
+            prompt = "  " + prompt.upper()
+        elif roll < 0.15:
+            corrected += " " + rng.choice(PII)
+        elif roll < 0.20:
+            corrected = rng.choice(MISALIGNED) + " " + corrected
+        elif roll < 0.24:
+            corrected = None
+        elif roll < 0.27:
+            corrected = "ok"
+        elif roll < 0.30:
+            corrected = prompt
+
+        if corrected and len(recent) < 1000:
+            recent.append((prompt, model_response, corrected))
+
+        yield SimpleNamespace(prompt=prompt, model_response=model_response, corrected_response=corrected)
+
+
+# ---- previous implementation, for comparison ----
+
+def legacy_normalize_text(text):
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+def legacy_is_structurally_valid(fb):
+    if not fb.prompt or not fb.corrected_response:
+        return False
+    prompt = fb.prompt.strip()
+    output = fb.corrected_response.strip()
+    if not prompt or not output:
+        return False
+    if len(output) < 5 or len(output) > 5000:
+        return False
+    if legacy_normalize_text(prompt) == legacy_normalize_text(output):
+        return False
+    return True
+
+
+def legacy_fingerprint(prompt, model_resp, corrected):
+    payload = (
+        legacy_normalize_text(prompt)
+        + "|"
+        + legacy_normalize_text(model_resp or "")
+        + "|"
+        + legacy_normalize_text(corrected)
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def legacy_has_pii(fb):
+    text = fb.corrected_response or ""
+    return any(re.search(p, text) for p in jsonl_cleaning.PII_PATTERNS)
+
+
+def legacy_is_misaligned(fb):
+    output = legacy_normalize_text(fb.corrected_response or "")
+    return any(p in output for p in jsonl_cleaning.MISALIGNMENT_PATTERNS)
+
+
+def legacy_cpu_clean(feedbacks):
+    filtered = [
+        fb for fb in feedbacks
+        if legacy_is_structurally_valid(fb) and not legacy_has_pii(fb) and not legacy_is_misaligned(fb)
+    ]
+    seen, unique = set(), []
+    for fb in filtered:
+        fp = legacy_fingerprint(fb.prompt, fb.model_response, fb.corrected_response)
+        if fp not in seen:
+            seen.add(fp)
+            unique.append(fb)
+    return unique
+
+
+# ---- runner ----
+
+def _case(name: str, rows: int, processes: int, out):
+    jsonl_cleaning.CLEANING_PROCESSES = processes
+
+    started = time.perf_counter()
+    if name == "legacy":
+        kept = [fb.prompt for fb in legacy_cpu_clean(synthetic_feedback(rows))]
+    else:
+        kept = [fb.prompt for fb in jsonl_cleaning.iter_cpu_clean(synthetic_feedback(rows))]
+    elapsed = time.perf_counter() - started
+
+    # wait, so the workers are reaped and show up in RUSAGE_CHILDREN
+    jsonl_cleaning.shutdown_cleaning_pool(wait=True)
+
+    out.put(
+        {
+            "elapsed": elapsed,
+            "kept": kept if rows <= 20_000 else len(kept),
+            # ru_maxrss is KiB on Linux
+            "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "workers_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        }
+    )
+
+
+def run_case(name: str, rows: int, processes: int) -> dict:
+    ctx = multiprocessing.get_context("fork")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_case, args=(name, rows, processes, out))
+    proc.start()
+    result = out.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--processes", type=int, default=jsonl_cleaning.CLEANING_PROCESSES)
+    parser.add_argument("--skip-legacy-above", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    for _ in synthetic_feedback(args.sizes[0]):
+        pass
+    print(f"generator alone: {args.sizes[0] / (time.perf_counter() - started):,.0f} rows/s\n")
+
+    cases = [("legacy", 1), ("serial", 1), ("parallel", args.processes)]
+
+    print(f"{'rows':>9} {'case':<9} {'procs':>5} {'seconds':>8} {'rows/s':>10} {'kept':>8} {'peak MB':>8} {'workers MB':>10}")
+
+    for rows in args.sizes:
+        outputs = {}
+
+        for name, processes in cases:
+            if name == "legacy" and rows > args.skip_legacy_above:
+                continue
+
+            r = run_case(name, rows, processes)
+            kept = r["kept"] if isinstance(r["kept"], int) else len(r["kept"])
+            outputs[name] = r["kept"]
+
+            print(
+                f"{rows:>9} {name:<9} {processes:>5} {r['elapsed']:>8.2f} "
+                f"{rows / r['elapsed']:>10,.0f} {kept:>8} {r['peak_mb']:>8.1f} {r['workers_mb']:>10.1f}"
+            )
+
+        values = list(outputs.values())
+        if any(v != values[0] for v in values[1:]):
+            print(f"!! outputs differ at {rows} rows")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
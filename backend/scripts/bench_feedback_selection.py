@@ -0,0 +1,230 @@
+# scripts/bench_feedback_selection.py
+"""
+Query plans and timings for the training-selection paths at ~100k feedback
+rows, against the database in DATABASE_URL (run `alembic upgrade head`
+first).
+
+Seeds a throwaway org with several trained versions plus the deployed one,
+then compares:
+
+  legacy: feedback_ids uuid[] on model_version, NOT IN (unnest(...)) anti-join,
+          no composite feedback index, whole-array rewrite per selection
+  new:    model_version_feedback table, NOT EXISTS on its feedback_id index,
+          ix_feedback_org_version_created, one INSERT ... ON CONFLICT per selection
+
+The legacy shape is rebuilt in a temp table inside a transaction that is
+rolled back, so the schema is left untouched. Everything seeded is deleted.
+
+Usage:
+    python scripts/bench_feedback_selection.py --rows 100000 --versions 5
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.endpoints.feedback import _filter_feedback_query
+from app.db.models import ModelVersion, ModelVersionFeedback
+from app.db.session import engine, session_local
+from app.services.feedback import insert_feedback_rows
+from bench_ingest_batch import make_row, setup, teardown
+
+
+LEGACY_FILTER = """
+SELECT f.id, f.prompt, f.model_response, f.corrected_response, f.tags, f.rating, f.created_at
+FROM feedback f
+WHERE f.org_id = :org_id
+  AND f.model_version_id = :mv_id
+  AND f.id NOT IN (
+      SELECT unnest(feedback_ids) FROM legacy_model_version WHERE org_id = :org_id
+  )
+ORDER BY f.created_at DESC
+"""
+
+PAGE_SIZE = 50
+
+
+def seed(db, rows: int, versions: int, selected: float):
+    org_id, deployed_id, _ = setup(db)
+
+    # trained history: versions 0..n-1 READY, deployed is the newest
+    deployed = db.get(ModelVersion, deployed_id)
+    deployed.version = versions
+    version_ids = []
+    for v in range(versions):
+        mv = ModelVersion(org_id=org_id, version=v, status="READY", sha256="bench")
+        db.add(mv)
+        db.flush()
+        version_ids.append(mv.id)
+    version_ids.append(deployed_id)
+    db.commit()
+
+    per_version = rows // len(version_ids)
+    selections = []
+
+    for mv_id in version_ids:
+        batch = []
+        for i in range(per_version):
+            row = make_row(i)
+            row.update(id=uuid.uuid4(), org_id=org_id, model_version_id=mv_id)
+            batch.append(row)
+
+            if random.random() < selected:
+                selections.append({"model_version_id": mv_id, "feedback_id": row["id"]})
+
+        insert_feedback_rows(db, batch)
+
+    db.execute(ModelVersionFeedback.__table__.insert(), selections)
+
+    # spread timestamps so ordering is realistic
+    db.execute(
+        text(
+            "UPDATE feedback SET created_at = now() - random() * interval '90 days' "
+            "WHERE org_id = :org_id"
+        ),
+        {"org_id": org_id},
+    )
+    db.commit()
+
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+            text("ANALYZE feedback; ANALYZE model_version_feedback; ANALYZE model_version")
+        )
+
+    return org_id, deployed_id, version_ids, len(selections)
+
+
+def compile_sql(query) -> str:
+    return str(
+        query.statement.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True},
+        )
+    )
+
+
+def explain(conn, sql: str, params: dict) -> str:
+    plan = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + sql), params).scalars().all()
+    return "\n".join("    " + line for line in plan)
+
+
+def timed(conn, sql: str, params: dict, repeat: int = 5) -> float:
+    conn.execute(text(sql), params).fetchall()  # warm
+    started = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(text(sql), params).fetchall()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--versions", type=int, default=5)
+    parser.add_argument("--selected", type=float, default=0.3)
+    parser.add_argument("--clicks", type=int, default=500)
+    args = parser.parse_args()
+
+    db = session_local()
+    org_id, deployed_id, version_ids, n_selected = seed(
+        db, args.rows, args.versions, args.selected
+    )
+    print(f"seeded rows={args.rows} versions={len(version_ids)} selected={n_selected}\n")
+
+    params = {"org_id": org_id, "mv_id": deployed_id}
+    query = _filter_feedback_query(db, org_id, deployed_id)
+    new_sql = compile_sql(query)
+    new_page_sql = compile_sql(query.limit(PAGE_SIZE))
+    legacy_page_sql = LEGACY_FILTER + f"LIMIT {PAGE_SIZE}"
+
+    try:
+        with engine.connect() as conn:
+            trans = conn.begin()
+
+            # ---- legacy shape, rolled back at the end ----
+            conn.execute(text("DROP INDEX ix_feedback_org_version_created"))
+            conn.execute(
+                text(
+                    """
+                    CREATE TEMP TABLE legacy_model_version AS
+                    SELECT mv.id, mv.org_id,
+                           coalesce(array_agg(s.feedback_id) FILTER (WHERE s.feedback_id IS NOT NULL), '{}') AS feedback_ids
+                    FROM model_version mv
+                    LEFT JOIN model_version_feedback s ON s.model_version_id = mv.id
+                    WHERE mv.org_id = :org_id
+                    GROUP BY mv.id, mv.org_id
+                    """
+                ),
+                {"org_id": org_id},
+            )
+            conn.execute(text("ANALYZE legacy_model_version"))
+
+            print("legacy filter, full result:")
+            print(explain(conn, LEGACY_FILTER, params))
+            print(f"legacy filter, first page of {PAGE_SIZE}:")
+            print(explain(conn, legacy_page_sql, params))
+            legacy_ms = timed(conn, LEGACY_FILTER, params)
+            legacy_page_ms = timed(conn, legacy_page_sql, params)
+
+            click_ids = [uuid.uuid4() for _ in range(args.clicks)]
+            started = time.perf_counter()
+            for fid in click_ids:
+                # what the ORM did: read the array, append in Python, write it back
+                ids = conn.execute(
+                    text("SELECT feedback_ids FROM legacy_model_version WHERE id = :id"),
+                    {"id": deployed_id},
+                ).scalar()
+                if fid not in ids:
+                    conn.execute(
+                        text("UPDATE legacy_model_version SET feedback_ids = :ids WHERE id = :id"),
+                        {"ids": ids + [fid], "id": deployed_id},
+                    )
+            legacy_click_ms = (time.perf_counter() - started) / args.clicks * 1000
+
+            trans.rollback()
+
+        with engine.connect() as conn:
+            print("\nnew filter, full result:")
+            print(explain(conn, new_sql, params))
+            print(f"new filter, first page of {PAGE_SIZE}:")
+            print(explain(conn, new_page_sql, params))
+            new_ms = timed(conn, new_sql, params)
+            new_page_ms = timed(conn, new_page_sql, params)
+
+            # real feedback ids so the FK holds
+            click_ids = conn.execute(
+                text(
+                    "SELECT id FROM feedback WHERE model_version_id = :mv_id LIMIT :n"
+                ),
+                {"mv_id": deployed_id, "n": args.clicks},
+            ).scalars().all()
+            started = time.perf_counter()
+            for fid in click_ids:
+                conn.execute(
+                    text(
+                        "INSERT INTO model_version_feedback (model_version_id, feedback_id) "
+                        "VALUES (:mv_id, :fid) ON CONFLICT DO NOTHING RETURNING feedback_id"
+                    ),
+                    {"mv_id": deployed_id, "fid": fid},
+                ).first()
+            new_click_ms = (time.perf_counter() - started) / len(click_ids) * 1000
+            conn.rollback()
+
+        print(f"\nfilter (full result)   legacy {legacy_ms:8.1f} ms   new {new_ms:8.1f} ms")
+        print(f"filter (page of {PAGE_SIZE})    legacy {legacy_page_ms:8.1f} ms   new {new_page_ms:8.1f} ms")
+        print(f"add-feedback per click legacy {legacy_click_ms:8.2f} ms   new {new_click_ms:8.2f} ms")
+
+    finally:
+        teardown(db, org_id)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# scripts/bench_ingest_batch.py
+"""
+End-to-end throughput of POST /v1/feedback/ingest-batch against the
+database in DATABASE_URL (run `alembic upgrade head` first).
+
+Creates a throwaway org + deployed model version, posts signed NDJSON
+batches through the ASGI app in-process and reports rows/sec, then
+deletes everything it created.
+
+Usage:
+    python scripts/bench_ingest_batch.py --rows 50000 --batch-size 5000
+"""
+import argparse
+import json
+import random
+import secrets
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from fastapi.testclient import TestClient
+
+from app.db.models import Feedback, ModelVersion, Organization
+from app.db.session import session_local
+from app.main import app
+from app.services.hmac_auth import compute_signature
+
+
+TAGS = ["hallucination", "incorrect", "verbose", "too_short", "unclear"]
+
+
+def make_row(i: int) -> dict:
+    return {
+        "prompt": f"question {i}: " + "lorem ipsum " * random.randint(5, 30),
+        "model_response": "answer " * random.randint(10, 60),
+        "corrected_response": "better answer " * random.randint(5, 40) if i % 2 else None,
+        "rating": random.choice([-1, 0, 1]),
+        "tags": random.sample(TAGS, random.randint(0, 2)),
+    }
+
+
+def setup(db):
+    secret = secrets.token_urlsafe(16)
+    org = Organization(
+        name="bench",
+        contact_name="bench",
+        contact_email=f"bench-{uuid.uuid4()}@example.com",
+        inference_url="http://localhost/unused",
+    )
+    org.hmac = secret
+    db.add(org)
+    db.flush()
+
+    mv = ModelVersion(
+        org_id=org.id,
+        version=0,
+        status="COLLECTING_FEEDBACK",
+        sha256="bootstrap",
+    )
+    db.add(mv)
+    db.commit()
+    return org.id, mv.id, secret
+
+
+def teardown(db, org_id):
+    db.query(Feedback).filter(Feedback.org_id == org_id).delete()
+    db.query(ModelVersion).filter(ModelVersion.org_id == org_id).delete()
+    db.query(Organization).filter(Organization.id == org_id).delete()
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    args = parser.parse_args()
+
+    db = session_local()
+    org_id, _, secret = setup(db)
+
+    batches = []
+    for start in range(0, args.rows, args.batch_size):
+        n = min(args.batch_size, args.rows - start)
+        batches.append(
+            "\n".join(json.dumps(make_row(start + i)) for i in range(n)).encode()
+        )
+
+    accepted = 0
+    try:
+        with TestClient(app) as client:
+            started = time.perf_counter()
+
+            for body in batches:
+                ts = str(int(time.time()))
+                r = client.post(
+                    "/v1/feedback/ingest-batch",
+                    content=body,
+                    headers={
+                        "Content-Type": "application/x-ndjson",
+                        "X-Org-Id": str(org_id),
+                        "X-Timestamp": ts,
+                        "X-Signature": compute_signature(secret, ts, body),
+                    },
+                )
+                r.raise_for_status()
+                accepted += r.json()["accepted"]
+
+            elapsed = time.perf_counter() - started
+
+        print(
+            f"rows={accepted} batch_size={args.batch_size} "
+            f"elapsed={elapsed:.2f}s rows/sec={accepted / elapsed:,.0f}"
+        )
+    finally:
+        teardown(db, org_id)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
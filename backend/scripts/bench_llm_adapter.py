@@ -0,0 +1,141 @@
+# scripts/bench_llm_adapter.py
+"""
+Microbenchmark of the per-request work done around the upstream LLM call in
+/v1/feedback/generate: payload mapping, header build (incl. API key
+decryption) and response-path extraction. No network, no DB.
+
+Usage:
+    python scripts/bench_llm_adapter.py --iterations 100000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from cryptography.fernet import Fernet
+
+os.environ.setdefault("FERNET_KEY", Fernet.generate_key().decode())
+
+from app.db.models import Organization
+from app.schemas.feedback import GenerateRequest
+from app.services.llm_adapter import get_llm_adapter
+
+
+SCHEMA = {
+    "method": "POST",
+    "auth": {"type": "bearer", "header": "Authorization", "prefix": "Bearer "},
+    "payload_defaults": {"temperature": 0.7, "max_tokens": 256},
+    "request_mapping": {
+        "model": "model",
+        "messages": "messages",
+        "temperature": "temperature",
+        "max_tokens": "max_tokens",
+    },
+    "response_mapping": {"text": "choices[0].message.content"},
+}
+
+RESPONSE = {"choices": [{"index": 0, "message": {"role": "assistant", "content": "hi"}}]}
+
+
+def legacy_extract_by_path(data, path):
+    current = data
+    for part in re.split(r"\.(?![^\[]*\])", path):
+        match = re.match(r"(\w+)(?:\[(\d+)\])?", part)
+        if not match:
+            raise KeyError(part)
+
+        key, index = match.groups()
+        current = current[key]
+
+        if index is not None:
+            current = current[int(index)]
+
+    return current
+
+
+def legacy(org, payload):
+    """The pre-adapter generate_text body, minus I/O."""
+    if not org.inference_url or not org.llm_api_key:
+        raise RuntimeError
+
+    schema = org.llm_request_schema or {}
+    request_mapping = schema.get("request_mapping", {})
+    payload_defaults = schema.get("payload_defaults", {})
+
+    request_body = {}
+    canonical_payload = {
+        "model": org.model,
+        "messages": [{"role": "user", "content": payload.prompt}],
+        "temperature": payload.temperature,
+        "max_tokens": payload.max_tokens,
+    }
+    for k, v in payload_defaults.items():
+        canonical_payload.setdefault(k, v)
+    for canonical_key, provider_key in request_mapping.items():
+        if canonical_key in canonical_payload and provider_key:
+            request_body[provider_key] = canonical_payload[canonical_key]
+    if org.model:
+        request_body["model"] = org.model
+
+    headers = {"Content-Type": "application/json"}
+    auth_cfg = schema.get("auth")
+    if auth_cfg and org.llm_api_key:
+        headers[auth_cfg.get("header", "Authorization")] = (
+            f"{auth_cfg.get('prefix', '')}{org.llm_api_key}"
+        )
+
+    schema.get("method", "POST").upper()
+    return legacy_extract_by_path(RESPONSE, schema["response_mapping"]["text"])
+
+
+def compiled(org, payload):
+    if not org.inference_url or not org.llm_api_key_encrypted:
+        raise RuntimeError
+
+    adapter = get_llm_adapter(org)
+    adapter.build_request(payload)
+    return adapter.extract_text(RESPONSE)
+
+
+def bench(fn, org, payload, iterations):
+    fn(org, payload)  # warm caches
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(org, payload)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    org = Organization(
+        id=uuid.uuid4(),
+        name="bench",
+        contact_name="bench",
+        contact_email="bench@example.com",
+        inference_url="https://api.example.com/v1/chat/completions",
+        model="llama-3.1-8b-instant",
+        llm_request_schema=SCHEMA,
+    )
+    org.llm_api_key = "sk-" + "x" * 48
+    payload = GenerateRequest(prompt="What is LoRA?", max_tokens=256, temperature=0.7)
+
+    assert legacy(org, payload) == compiled(org, payload)
+
+    before = bench(legacy, org, payload, args.iterations)
+    after = bench(compiled, org, payload, args.iterations)
+
+    print(f"legacy   {before:8.2f} us/request")
+    print(f"compiled {after:8.2f} us/request  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
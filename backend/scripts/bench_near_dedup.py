@@ -0,0 +1,137 @@
+# scripts/bench_near_dedup.py
+"""
+Quality and throughput of MinHash/LSH near-duplicate detection.
+
+Synthetic rows: unique corrections plus copies with small edits (a word
+swapped, dropped or appended, case and spacing changes), ~20% of rows.
+
+  quality:    at --check-rows, compares the dropped set with brute force
+              exact shingle Jaccard (O(n^2)), keep-first semantics
+  throughput: rows/s and peak RSS growth at each of --sizes
+
+Usage:
+    python scripts/bench_near_dedup.py --sizes 10000 100000 300000
+"""
+import argparse
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.schemas.near_dedup import (
+    NEAR_DUP_SHINGLE_CHARS,
+    NEAR_DUP_THRESHOLD,
+    NearDuplicateFilter,
+    near_dup_text,
+)
+
+
+WORDS = (
+    "refund shipping invoice account password reset order delivery warranty "
+    "customer support ticket payment card billing address subscription plan "
+    "upgrade cancel renewal discount coupon tracking label return exchange"
+).split()
+
+
+def edit(rng, text: str) -> str:
+    words = text.split()
+    op = rng.randrange(4)
+
+    if op == 0:
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    elif op == 1 and len(words) > 5:
+        del words[rng.randrange(len(words))]
+    elif op == 2:
+        words.append(rng.choice(WORDS))
+    else:
+        return "  " + text.upper() + " "
+
+    return " ".join(words)
+
+
+def synthetic_rows(rows: int, dup_rate: float = 0.2, seed: int = 11):
+    rng = random.Random(seed)
+    originals = []
+
+    for i in range(rows):
+        if originals and rng.random() < dup_rate:
+            prompt, corrected = rng.choice(originals)
+            yield SimpleNamespace(prompt=prompt, corrected_response=edit(rng, corrected))
+            continue
+
+        prompt = f"question {i}: " + " ".join(rng.choice(WORDS) for _ in range(8))
+        corrected = " ".join(rng.choice(WORDS) for _ in range(rng.randint(25, 60)))
+        if len(originals) < 5000:
+            originals.append((prompt, corrected))
+
+        yield SimpleNamespace(prompt=prompt, corrected_response=corrected)
+
+
+def shingles(text: str) -> set:
+    data = text.encode("utf-8")
+    k = NEAR_DUP_SHINGLE_CHARS
+    return {data[i:i + k] for i in range(max(1, len(data) - k + 1))}
+
+
+def brute_force(texts, threshold) -> set:
+    sets = [shingles(t) for t in texts]
+    dropped = set()
+
+    for i in range(len(sets)):
+        for j in range(i):
+            if len(sets[i] & sets[j]) / len(sets[i] | sets[j]) >= threshold:
+                dropped.add(i)
+                break
+
+    return dropped
+
+
+def peak_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    parser.add_argument("--check-rows", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=NEAR_DUP_THRESHOLD)
+    args = parser.parse_args()
+
+    near = NearDuplicateFilter(args.threshold)
+    print(f"threshold={args.threshold} bands={near.bands} rows/band={near.rows}\n")
+
+    # ---- quality ----
+    texts = [near_dup_text(fb) for fb in synthetic_rows(args.check_rows)]
+    for i, text in enumerate(texts):
+        near.add(i, text)
+
+    lsh = set(map(int, near.duplicate_mask().nonzero()[0]))
+    exact = brute_force(texts, args.threshold)
+    hits = len(lsh & exact)
+
+    print(f"quality at {args.check_rows} rows: brute force drops {len(exact)}, LSH drops {len(lsh)}")
+    print(f"  precision {hits / max(1, len(lsh)):.3f}  recall {hits / max(1, len(exact)):.3f}\n")
+
+    # ---- throughput ----
+    print(f"{'rows':>9} {'seconds':>8} {'rows/s':>10} {'dropped':>8} {'peak MB':>8}")
+
+    for rows in args.sizes:
+        near = NearDuplicateFilter(args.threshold)
+        started = time.perf_counter()
+
+        for i, fb in enumerate(synthetic_rows(rows)):
+            near.add(i, near_dup_text(fb))
+        dropped = int(near.duplicate_mask().sum())
+
+        elapsed = time.perf_counter() - started
+        print(f"{rows:>9} {elapsed:>8.2f} {rows / elapsed:>10,.0f} {dropped:>8} {peak_mb():>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# scripts/bench_safety_classifier.py
+"""
+rows/s of the batched safety classifier in modal_apps/clean_feedback_app.py
+at several batch sizes (batch size 1 is the old one-call-per-line loop).
+
+  local (CPU, needs torch + transformers), e.g. with a tiny classifier:
+    python scripts/bench_safety_classifier.py --device cpu \\
+        --model hf-internal-testing/tiny-random-BertForSequenceClassification
+
+  on a Modal T4 (deployed app), fp16:
+    python scripts/bench_safety_classifier.py --modal
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT.parent / "modal_apps"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="unitary/toxic-bert")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--modal", action="store_true", help="run on the deployed GPU function")
+    args = parser.parse_args()
+
+    if args.modal:
+        import modal
+
+        fn = modal.Function.from_name("feedback-cleaning-dev", "bench_safety_classifier")
+        results = fn.remote(args.model, args.rows, args.batch_sizes)
+        device = "cuda (Modal T4)"
+    else:
+        from clean_feedback_app import benchmark_classifier
+
+        results = benchmark_classifier(args.model, device=args.device, rows=args.rows, batch_sizes=args.batch_sizes)
+        device = args.device
+
+    print(f"\n{args.model} on {device}, {args.rows} rows")
+    print(f"{'batch':>6} {'seconds':>8} {'rows/s':>10} {'speedup':>8}")
+
+    base = results[0]["rows_per_second"]
+    for r in results:
+        print(f"{r['batch_size']:>6} {r['seconds']:>8.2f} {r['rows_per_second']:>10,.1f} {r['rows_per_second'] / base:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# scripts/bench_token_cache.py
+"""
+The LoRA trainer's tokenized-row cache (modal_apps/train_lora_app.py,
+tokenize_with_cache) across consecutive model versions:
+
+  v1  N rows, cold cache
+  v2  90% of v1 + 10% new rows
+  v3  same rows as v2
+
+Each run is compared with tokenizing every row (what happened before).
+The tokenizer is the word-level one from bench_lora_packing, so the
+absolute seconds understate a real BPE tokenizer; the ratio is the point.
+
+Usage (needs transformers, datasets):
+    python scripts/bench_token_cache.py --rows 20000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "scripts"))
+sys.path.append(str(ROOT.parent / "modal_apps"))
+
+from bench_lora_packing import synthetic_rows, tiny_model_and_tokenizer
+from train_lora_app import tokenize_row, tokenize_with_cache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    from datasets import Dataset, disable_progress_bars
+
+    disable_progress_bars()
+    _, tokenizer = tiny_model_and_tokenizer(64)
+
+    v1 = synthetic_rows(args.rows, seed=1)
+    fresh = synthetic_rows(args.rows // 10, seed=2)
+    v2 = random.Random(3).sample(v1, args.rows - len(fresh)) + fresh
+    versions = [("v1", v1), ("v2", v2), ("v3", v2)]
+
+    print(f"{'run':<4} {'rows':>7} {'hits':>7} {'misses':>7} {'cached s':>9} {'uncached s':>11} {'saved est s':>12}")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, rows in versions:
+            dataset = Dataset.from_list(rows)
+
+            started = time.perf_counter()
+            cached, report = tokenize_with_cache(dataset, tokenizer, Path(cache_dir))
+            cached_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            uncached = dataset.map(lambda row: tokenize_row(tokenizer, row), remove_columns=dataset.column_names)
+            uncached_seconds = time.perf_counter() - started
+
+            assert cached["prompt_ids"] == uncached["prompt_ids"]
+            assert cached["output_ids"] == uncached["output_ids"]
+
+            saved = report["seconds_saved"]
+            print(
+                f"{name:<4} {len(rows):>7} {report['hits']:>7} {report['misses']:>7} "
+                f"{cached_seconds:>9.2f} {uncached_seconds:>11.2f} {saved if saved is not None else '-':>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
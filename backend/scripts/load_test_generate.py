@@ -0,0 +1,198 @@
+# scripts/load_test_generate.py
+"""
+Load test for the /v1/feedback/generate upstream call path.
+
+Starts local fake OpenAI-style inference servers (one fast, one slow tenant
+endpoint) and compares:
+  - before: blocking requests.request() per call, dispatched onto a 40-thread
+            pool (FastAPI's default sync threadpool), no shared session
+  - after:  pooled per-origin httpx.AsyncClient with per-org semaphores
+
+Latency is measured from the moment a simulated user issues the request, so
+time spent waiting for a free worker thread or slot is included.
+
+Usage:
+    python scripts/load_test_generate.py --requests 2000 --concurrency 100 \
+        --latency-ms 50 --slow-latency-ms 2000 --slow-fraction 0.1
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+import requests
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+def build_fake_server(latency_ms: float) -> Starlette:
+    async def completions(request):
+        await request.body()
+        await asyncio.sleep(latency_ms / 1000)
+        return JSONResponse(
+            {"choices": [{"message": {"role": "assistant", "content": "ok"}}]}
+        )
+
+    return Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"])])
+
+
+def serve_fake(port: int, latency_ms: float):
+    uvicorn.run(
+        build_fake_server(latency_ms),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        backlog=4096,
+    )
+
+
+def start_fake_server(port: int, latency_ms: float):
+    # separate process so the server does not share a GIL with the clients
+    server = multiprocessing.Process(
+        target=serve_fake, args=(port, latency_ms), daemon=True
+    )
+    server.start()
+
+    for _ in range(100):
+        try:
+            requests.post(f"http://127.0.0.1:{port}/v1/chat/completions", json={}, timeout=0.2)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.1)
+        except requests.Timeout:
+            break  # listening, just slow
+
+    return server
+
+
+BODY = {
+    "model": "fake",
+    "messages": [{"role": "user", "content": "hello"}],
+    "max_tokens": 16,
+}
+HEADERS = {"Content-Type": "application/json", "Authorization": "Bearer test"}
+
+
+def report(name: str, results: list, wall: float):
+    for label, rows in (
+        ("all", results),
+        ("fast", [r for r in results if not r[2]]),
+    ):
+        ok = sorted(r[0] for r in rows if r[1])
+        errors = sum(1 for r in rows if not r[1])
+
+        if not ok:
+            print(f"{name:<7}{label:<5} no successful requests")
+            continue
+
+        p50 = statistics.median(ok) * 1000
+        p99 = ok[max(int(len(ok) * 0.99) - 1, 0)] * 1000
+        print(
+            f"{name:<7}{label:<5} n={len(rows):<6} errors={errors:<5} "
+            f"p50={p50:8.1f}ms  p99={p99:8.1f}ms  rps={len(ok) / wall:8.1f}"
+        )
+
+
+def pick_target(i: int, args, fast_url: str, slow_url: str):
+    # every 1/slow_fraction-th request belongs to the slow tenant
+    every = max(int(1 / args.slow_fraction), 1) if args.slow_fraction else 0
+    if every and i % every == 0:
+        return "org-slow", slow_url, True
+    return f"org-{i % args.orgs}", fast_url, False
+
+
+async def run_users(args, one):
+    queue = iter(range(args.requests))
+    results = []
+
+    async def user():
+        for i in queue:
+            results.append(await one(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(args.concurrency)))
+    return results, time.perf_counter() - start
+
+
+async def run_before(args, fast_url: str, slow_url: str):
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=args.threads)
+
+    def call(url):
+        r = requests.request(method="POST", url=url, headers=HEADERS, json=BODY, timeout=30)
+        return r.status_code == 200
+
+    async def one(i):
+        _, url, slow = pick_target(i, args, fast_url, slow_url)
+        start = time.perf_counter()
+        try:
+            ok = await loop.run_in_executor(pool, call, url)
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok, slow
+
+    results, wall = await run_users(args, one)
+    pool.shutdown()
+    report("before", results, wall)
+
+
+async def run_after(args, fast_url: str, slow_url: str):
+    from app.services.llm_client import close_llm_client, send_llm_request
+
+    async def one(i):
+        org_id, url, slow = pick_target(i, args, fast_url, slow_url)
+        start = time.perf_counter()
+        try:
+            r = await send_llm_request(org_id, "POST", url, HEADERS, BODY)
+            ok = r.status_code == 200
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok, slow
+
+    results, wall = await run_users(args, one)
+    await close_llm_client()
+    report("after", results, wall)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--orgs", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--slow-latency-ms", type=float, default=2000)
+    parser.add_argument("--slow-fraction", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=18080)
+    args = parser.parse_args()
+
+    fast = start_fake_server(args.port, args.latency_ms)
+    slow = start_fake_server(args.port + 1, args.slow_latency_ms)
+    fast_url = f"http://127.0.0.1:{args.port}/v1/chat/completions"
+    slow_url = f"http://127.0.0.1:{args.port + 1}/v1/chat/completions"
+
+    print(
+        f"requests={args.requests} concurrency={args.concurrency} orgs={args.orgs} "
+        f"fast={args.latency_ms}ms slow={args.slow_latency_ms}ms "
+        f"slow_fraction={args.slow_fraction}"
+    )
+
+    try:
+        asyncio.run(run_before(args, fast_url, slow_url))
+        asyncio.run(run_after(args, fast_url, slow_url))
+    finally:
+        fast.terminate()
+        slow.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# scripts/prefetch_weights.py
+"""
+Fill the GPU jobs' weight cache (modal_apps/weight_cache.py) with every
+ALLOWED_BASE_MODELS entry and the safety classifier (SAFETY_MODEL @
+SAFETY_MODEL_REVISION), so no job waits on the HF hub.
+
+  into the Modal "model-weights" volume (deployed lora-training-dev app):
+    python scripts/prefetch_weights.py
+  into a local directory (needs huggingface_hub):
+    python scripts/prefetch_weights.py --local-dir /data/weights
+
+  --refresh   move branch pins (main) to the hub's current commit
+  --check     re-hash every cached file first, dropping damaged snapshots
+  --models    only these repo ids (optionally repo@revision)
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT.parent))
+
+from app.schemas.training import ALLOWED_BASE_MODELS
+from app.services.cleaning_verdicts import SAFETY_MODEL, SAFETY_MODEL_REVISION
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--local-dir", type=Path)
+    parser.add_argument("--models", nargs="+")
+    parser.add_argument("--refresh", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    if args.models:
+        models = [tuple(m.split("@", 1)) if "@" in m else (m, "main") for m in args.models]
+    else:
+        models = [(m, "main") for m in sorted(ALLOWED_BASE_MODELS)] + [(SAFETY_MODEL, SAFETY_MODEL_REVISION)]
+
+    if args.local_dir:
+        from modal_apps.weight_cache import prefetch
+
+        reports = prefetch(models, args.local_dir, os.getenv("HF_TOKEN"), args.refresh, args.check)
+    else:
+        import modal
+
+        fn = modal.Function.from_name("lora-training-dev", "prefetch_weights")
+        reports = fn.remote([list(m) for m in models], refresh=args.refresh, check=args.check)
+
+    print(f"\n{'model':<45} {'commit':<12} {'cached':>7} {'GB':>6} {'download s':>11}")
+    for r in reports:
+        print(
+            f"{r['repo_id']:<45} {r['revision'][:12]:<12} {str(r['cached']):>7} "
+            f"{r['bytes'] / 1024 ** 3:>6.2f} {r['download_seconds']:>11.1f}"
+        )
+        for evicted in r["evicted"]:
+            print(f"  evicted {evicted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -176,7 +176,7 @@ const toggleTargetModule = (module: string) => {
         throw new Error("Failed to configure LoRA adapter");
       }
 
-      toast.success("LoRA configuration Generated successfully!", {
+      toast.success("LoRA training started! The new model appears once training finishes.", {
         position: "top-right",
         autoClose: 5500,
         toastId: "submit-success",
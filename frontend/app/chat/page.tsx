@@ -38,7 +38,7 @@ export default function ChatPage() {
     try {
       let tkn = localStorage.getItem("token");
       const res = await fetch(
-        `${process.env.NEXT_PUBLIC_SERVER_URL}/v1/feedback/generate`,
+        `${process.env.NEXT_PUBLIC_SERVER_URL}/v1/feedback/generate-stream`,
         {
           method: "POST",
           credentials: "include",
@@ -54,7 +54,7 @@ export default function ChatPage() {
         }
       );
 
-      if (!res.ok) {
+      if (!res.ok || !res.body) {
         let message = "Generation failed";
         try {
           const err = await res.json();
@@ -63,8 +63,45 @@ export default function ChatPage() {
         throw new Error(message);
       }
 
-      const data = await res.json();
-      setResponse(data.output);
+      // server-sent events: token* then done | error
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let streamed = "";
+      let finished = false;
+
+      while (!finished) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop() || "";
+
+        for (const raw of events) {
+          const lines = raw.split("\n");
+          const event = lines.find((l) => l.startsWith("event:"))?.slice(6).trim();
+          const data = lines
+            .filter((l) => l.startsWith("data:"))
+            .map((l) => l.slice(5).trim())
+            .join("\n");
+
+          if (!event || !data) continue;
+          const parsed = JSON.parse(data);
+
+          if (event === "token") {
+            streamed += parsed.text;
+            setResponse(streamed);
+            setLoading(false);
+          } else if (event === "done") {
+            setResponse(parsed.output);
+            finished = true;
+          } else if (event === "error") {
+            throw new Error(parsed.detail || "Generation failed");
+          }
+        }
+      }
+
       setShowFeedback(true);
     } catch (error: any) {
       setResponse(`Error: ${error.message}`);
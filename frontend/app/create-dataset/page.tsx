@@ -173,6 +173,48 @@ export default function ManageFeedbacksPage() {
     }
   };
 
+  const addAllFeedbacks = async () => {
+    try {
+      const res = await fetch(
+        `${process.env.NEXT_PUBLIC_SERVER_URL}/v1/feedback/add-feedback-bulk`,
+        {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            Authorization: `Bearer ${localStorage.getItem("token")}`,
+          },
+          body: JSON.stringify({
+            feedback_ids: feedbacks.map((f) => f.id),
+          }),
+        }
+      );
+
+      if (!res.ok) {
+        throw new Error("Failed to add feedbacks");
+      }
+
+      const data = await res.json();
+      const rejected = new Set<string>(data.rejected_ids || []);
+      setFeedbacks((prev) => prev.filter((f) => rejected.has(f.id)));
+
+      toast.success(
+        `Added ${data.accepted} feedback(s)` +
+          (data.rejected ? `, ${data.rejected} skipped` : ""),
+        {
+          position: "top-right",
+          autoClose: 2000,
+          toastId: "add-all",
+        }
+      );
+    } catch (error: any) {
+      toast.error(`Error: ${error.message}`, {
+        position: "top-right",
+        autoClose: 3000,
+        toastId: "add-all-error",
+      });
+    }
+  };
+
   const clearFilters = () => {
     setSelectedRatings([]);
     setSelectedTags([]);
@@ -344,6 +386,12 @@ export default function ManageFeedbacksPage() {
               <h2 className="text-xl font-semibold text-white">
                 Results ({feedbacks.length})
               </h2>
+              <button
+                onClick={addAllFeedbacks}
+                className="px-6 py-2 bg-green-500/20 text-green-400 rounded-lg hover:bg-green-500/30 transition-all duration-200 font-medium border border-green-500/30"
+              >
+                Add all to training set
+              </button>
             </div>
 
             <div className="space-y-4">
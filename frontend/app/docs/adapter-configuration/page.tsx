@@ -228,6 +228,73 @@ export default function AdapterConfigurationDoc() {
                   <p><span className="text-gray-500">Purpose:</span> Ensures reproducible training results</p>
                 </div>
               </div>
+
+              {/* Padding */}
+              <div className="bg-gray-900/30 border border-gray-800 rounded-lg p-6">
+                <div className="flex items-start gap-3 mb-3">
+                  <code className="text-sm bg-gray-800 px-2 py-1 rounded text-gray-300">
+                    padding
+                  </code>
+                </div>
+                <p className="text-gray-300 leading-relaxed mb-4">
+                  How examples are laid out into training sequences. &quot;dynamic&quot; pads each batch only to its longest example and groups examples of similar length together. &quot;packed&quot; concatenates whole examples into full-length sequences, so almost no compute is spent on padding. &quot;max_length&quot; pads every example to max_seq_length and computes the loss on the whole sequence, as training always has. With &quot;dynamic&quot; and &quot;packed&quot;, the loss is computed on the output only, not on the prompt or the padding.
+                </p>
+                <div className="text-sm text-gray-400">
+                  <p className="mb-2"><span className="text-gray-500">Type:</span> String (optional)</p>
+                  <p className="mb-2"><span className="text-gray-500">Values:</span> &quot;max_length&quot;, &quot;dynamic&quot;, &quot;packed&quot;</p>
+                  <p><span className="text-gray-500">Default:</span> &quot;max_length&quot;; try &quot;packed&quot; for datasets of many short feedback pairs</p>
+                </div>
+              </div>
+
+              {/* Max Sequence Length */}
+              <div className="bg-gray-900/30 border border-gray-800 rounded-lg p-6">
+                <div className="flex items-start gap-3 mb-3">
+                  <code className="text-sm bg-gray-800 px-2 py-1 rounded text-gray-300">
+                    max_seq_length
+                  </code>
+                </div>
+                <p className="text-gray-300 leading-relaxed mb-4">
+                  The maximum number of tokens in one training sequence. Longer examples are truncated, and the number truncated is reported with the training result. With &quot;packed&quot;, this is also the length that examples are packed up to. Memory grows with max_seq_length times batch_size, so lower batch_size when raising it on large base models.
+                </p>
+                <div className="text-sm text-gray-400">
+                  <p className="mb-2"><span className="text-gray-500">Type:</span> Integer (optional, 128-4096)</p>
+                  <p className="mb-2"><span className="text-gray-500">Common values:</span> 256, 512, 1024</p>
+                  <p><span className="text-gray-500">Default:</span> 256</p>
+                </div>
+              </div>
+
+              {/* Warm Start */}
+              <div className="bg-gray-900/30 border border-gray-800 rounded-lg p-6">
+                <div className="flex items-start gap-3 mb-3">
+                  <code className="text-sm bg-gray-800 px-2 py-1 rounded text-gray-300">
+                    warm_start
+                  </code>
+                </div>
+                <p className="text-gray-300 leading-relaxed mb-4">
+                  Continue training the previous version&apos;s adapter instead of starting a new one from the base model. Each version then only trains on its own new feedback, so training time grows with the new feedback rather than with all feedback so far. Requires the previous version to be trained, with the same base_model and the same LoRA r and target_modules.
+                </p>
+                <div className="text-sm text-gray-400">
+                  <p className="mb-2"><span className="text-gray-500">Type:</span> Boolean (optional)</p>
+                  <p><span className="text-gray-500">Default:</span> false</p>
+                </div>
+              </div>
+
+              {/* Replay Fraction */}
+              <div className="bg-gray-900/30 border border-gray-800 rounded-lg p-6">
+                <div className="flex items-start gap-3 mb-3">
+                  <code className="text-sm bg-gray-800 px-2 py-1 rounded text-gray-300">
+                    replay_fraction
+                  </code>
+                </div>
+                <p className="text-gray-300 leading-relaxed mb-4">
+                  Mixes in examples from earlier versions&apos; datasets, as a fraction of this version&apos;s examples (0.2 adds one old example for every five new ones). Replaying some older data helps a warm-started adapter keep what it learned before.
+                </p>
+                <div className="text-sm text-gray-400">
+                  <p className="mb-2"><span className="text-gray-500">Type:</span> Float (optional, 0-1)</p>
+                  <p className="mb-2"><span className="text-gray-500">Common values:</span> 0, 0.1, 0.25</p>
+                  <p><span className="text-gray-500">Default:</span> 0 (no replay)</p>
+                </div>
+              </div>
             </div>
           </section>
 
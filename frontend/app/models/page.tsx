@@ -60,7 +60,11 @@ export default function ModelVersionsPage() {
     setSelectedModel(null);
   };
 
-  const handleDownload = async (url: string, filename: string) => {
+  const handleDownload = async (
+    url: string,
+    filename: string,
+    authenticated = false
+  ) => {
     try {
       toast.info("Starting download...", {
         position: "top-right",
@@ -68,7 +72,16 @@ export default function ModelVersionsPage() {
         toastId: "download-start",
       });
 
-      const response = await fetch(url);
+      const response = await fetch(
+        url,
+        authenticated
+          ? {
+              headers: {
+                Authorization: `Bearer ${localStorage.getItem("token")}`,
+              },
+            }
+          : undefined
+      );
       if (!response.ok) throw new Error("Download failed");
       
       const blob = await response.blob();
@@ -254,9 +267,11 @@ export default function ModelVersionsPage() {
                 disabled={!selectedModel?.adapter_url}
                 onClick={() =>
                   selectedModel?.adapter_url &&
+                  // adapter_url is the artifact manifest; the backend zips its files
                   handleDownload(
-                    selectedModel.adapter_url,
-                    `lora_adapter_v${selectedModel.version}.safetensors`
+                    `${process.env.NEXT_PUBLIC_SERVER_URL}/v1/model_version/${selectedModel.id}/adapter`,
+                    `lora_adapter_v${selectedModel.version}.zip`,
+                    true
                   )
                 }
                 className={`rounded-xl p-6 transition-all duration-200 flex items-center gap-4 group
@@ -285,7 +300,7 @@ export default function ModelVersionsPage() {
                   <h3 className="font-semibold text-lg">LoRA Adapter</h3>
                   <p className="text-sm">
                     {selectedModel?.adapter_url
-                      ? "SafeTensors format zip"
+                      ? "SafeTensors weights, config and tokenizer (zip)"
                       : "Not available"}
                   </p>
                 </div>
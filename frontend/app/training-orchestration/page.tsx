@@ -59,6 +59,34 @@ export default function TrainingOrchestrationPage() {
     }
   };
 
+  // dataset preparation runs as a background job; poll until it settles
+  const waitForJob = async (jobId: string) => {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+
+      const res = await fetch(
+        `${process.env.NEXT_PUBLIC_SERVER_URL}/v1/training/jobs/${jobId}`,
+        {
+          method: "GET",
+          headers: {
+            Authorization: `Bearer ${localStorage.getItem("token")}`,
+          },
+        }
+      );
+
+      if (!res.ok) {
+        throw new Error("Failed to fetch training job status");
+      }
+
+      const job = await res.json();
+
+      if (job.status === "SUCCEEDED") return job;
+      if (job.status === "FAILED") {
+        throw new Error(job.error || "Training dataset preparation failed");
+      }
+    }
+  };
+
   const startTraining = async () => {
     setTrainingInProgress(true);
     try {
@@ -78,6 +106,9 @@ export default function TrainingOrchestrationPage() {
         throw new Error(errorData.detail || "Failed to start training");
       }
 
+      const { job_id } = await res.json();
+      await waitForJob(job_id);
+
       toast.success("Training started successfully!", {
         position: "top-right",
         autoClose: 3000,
@@ -0,0 +1,171 @@
+"""
+Content-addressed store for adapter artifacts:
+
+  blobs/<sha256>            file contents, written once per distinct file
+  manifests/<name>.json     {"name", "files": [{"path", "sha256", "size"}], "sha256"}
+
+The manifest's sha256 is the digest of its file list, so it identifies the
+adapter's exact contents; it is what ModelVersion.sha256 records. Blobs
+already in the store (tokenizer files repeat in every version) are not
+uploaded again; the rest are uploaded in parallel. The manifest is written
+last, so a manifest never points at a missing blob. Consumers fetch the
+manifest and only the files they need.
+
+Imported by the Modal trainer and by the backend's local stand-in; the
+bytes move through storage.py, so any of its backends can hold the store.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    from storage import FilesystemStorage, Storage, file_sha256
+except ImportError:  # the backend imports this module as modal_apps.artifact_store
+    from modal_apps.storage import FilesystemStorage, Storage, file_sha256
+
+
+MANIFEST_VERSION = 1
+UPLOAD_WORKERS = int(os.environ.get("ARTIFACT_UPLOAD_WORKERS", "8"))
+
+
+def manifest_digest(files: list) -> str:
+    canonical = json.dumps(sorted(files, key=lambda f: f["path"]), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def build_manifest(name: str, directory: Path) -> dict:
+    directory = Path(directory)
+    files = [
+        {
+            "path": path.relative_to(directory).as_posix(),
+            "sha256": file_sha256(path),
+            "size": path.stat().st_size,
+        }
+        for path in sorted(directory.rglob("*"))
+        if path.is_file()
+    ]
+
+    return {
+        "version": MANIFEST_VERSION,
+        "name": name,
+        "files": files,
+        "sha256": manifest_digest(files),
+    }
+
+
+class ArtifactStore:
+    """
+    Backends implement the blob / manifest primitives; publish() and
+    download() are shared.
+    """
+
+    def has_blob(self, digest: str) -> bool:
+        raise NotImplementedError
+
+    def put_blob(self, digest: str, path: Path):
+        raise NotImplementedError
+
+    def get_blob(self, digest: str, dest: Path):
+        """Fetch the blob to `dest`; raises if its content doesn't match `digest`."""
+        raise NotImplementedError
+
+    def put_manifest(self, name: str, manifest: dict) -> str:
+        """Store the manifest; returns its reference (url or path)."""
+        raise NotImplementedError
+
+    def get_manifest(self, ref: str) -> dict:
+        raise NotImplementedError
+
+    def publish(self, name: str, directory: Path) -> dict:
+        """
+        Upload every file under `directory` and its manifest. Returns
+        ref, sha256, files, bytes, uploaded_blobs, deduplicated_blobs.
+        """
+        directory = Path(directory)
+        manifest = build_manifest(name, directory)
+
+        # identical files within one adapter are one blob too
+        unique = {f["sha256"]: directory / f["path"] for f in manifest["files"]}
+
+        def upload(item) -> int:
+            digest, path = item
+            if self.has_blob(digest):
+                return 0
+            self.put_blob(digest, path)
+            return 1
+
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+            uploaded = sum(pool.map(upload, unique.items()))
+
+        ref = self.put_manifest(name, manifest)
+
+        return {
+            "ref": ref,
+            "sha256": manifest["sha256"],
+            "files": len(manifest["files"]),
+            "bytes": sum(f["size"] for f in manifest["files"]),
+            "uploaded_blobs": uploaded,
+            "deduplicated_blobs": len(unique) - uploaded,
+        }
+
+    def download(self, ref: str, dest: Path, paths=None) -> dict:
+        """
+        Fetch the files of manifest `ref` (or only `paths`) into `dest`,
+        in parallel; get_blob checks each digest. Returns the manifest.
+        """
+        dest = Path(dest)
+        manifest = self.get_manifest(ref)
+        files = [f for f in manifest["files"] if paths is None or f["path"] in paths]
+
+        def fetch(f):
+            target = dest / f["path"]
+            target.parent.mkdir(parents=True, exist_ok=True)
+            self.get_blob(f["sha256"], target)
+
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+            list(pool.map(fetch, files))
+
+        return manifest
+
+
+class StorageArtifactStore(ArtifactStore):
+    """
+    The layout in a bucket of any storage backend (storage.py). Blobs are
+    uploaded resumably and downloaded with their digest checked.
+    """
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+
+    def has_blob(self, digest: str) -> bool:
+        return self.storage.exists(f"blobs/{digest}")
+
+    def put_blob(self, digest: str, path: Path):
+        self.storage.upload_file(path, f"blobs/{digest}")
+
+    def get_blob(self, digest: str, dest: Path):
+        self.storage.download(f"blobs/{digest}", dest, sha256=digest)
+
+    def put_manifest(self, name: str, manifest: dict) -> str:
+        return self.storage.upload_bytes(
+            json.dumps(manifest, indent=2).encode("utf-8"),
+            f"manifests/{name}.json",
+            "application/json",
+        )
+
+    def get_manifest(self, ref: str) -> dict:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.storage.download_url(ref, Path(tmp) / "manifest.json")
+            return json.loads(path.read_text(encoding="utf-8"))
+
+
+class FilesystemArtifactStore(StorageArtifactStore):
+    """
+    Local stand-in: the same layout under a directory.
+    """
+
+    def __init__(self, root: Path):
+        super().__init__(FilesystemStorage(root))
@@ -1,7 +1,17 @@
 import modal
 from pathlib import Path
-import requests
+import gzip
 import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from itertools import islice
+
+from storage import storage_from_env
+import weight_cache
 
 # -------- Modal App --------
 app = modal.App("feedback-cleaning-dev")
@@ -17,23 +27,240 @@ image = (
         "transformers",
         "sentencepiece",
         "requests",
-        "supabase",
+        "boto3",
     )
+    # must match train_lora_app: both evict from the same volume
+    .env({"WEIGHT_CACHE_MAX_GB": os.environ.get("WEIGHT_CACHE_MAX_GB", "100")})
+    .add_local_python_source("storage", "weight_cache")
 )
 
+# the trainer's weights volume (see weight_cache)
+weights = modal.Volume.from_name("model-weights", create_if_missing=True)
+WEIGHTS_DIR = Path("/weights")
+
+BUCKET = "training-data"
+
 GPU = "T4"
 
+# Conservative thresholds; the backend passes its own (SAFETY_THRESHOLDS)
+DEFAULT_THRESHOLDS = {"toxic": 0.85, "severe_toxic": 0.7}
+
+DEFAULT_BATCH_SIZE = 64
+# rows read ahead and length-sorted together, in batches; bounds memory
+SORT_WINDOW_BATCHES = 32
+# cap on tokens per text, on top of the model's own limit
+MAX_TOKENS = 512
+
+# resident service (SafetyCleaner): containers kept warm even when idle,
+# how long an idle one lingers, and datasets cleaned at once per container
+CLEANER_MIN_CONTAINERS = int(os.environ.get("CLEANER_MIN_CONTAINERS", "0"))
+CLEANER_IDLE_SECONDS = int(os.environ.get("CLEANER_IDLE_SECONDS", str(20 * 60)))
+CLEANER_MAX_REQUESTS = int(os.environ.get("CLEANER_MAX_REQUESTS", "16"))
+
+
+# -------- Batched classifier (no Modal / GPU specifics: also runs on CPU) --------
+
+def load_classifier(model_name: str, revision: str = "main", device: str = None):
+    """
+    Returns score(texts) -> [{label: score}], one dict per text. fp16 on
+    CUDA; texts are truncated to the model's max length (and MAX_TOKENS).
+    Same scores as a text-classification pipeline with return_all_scores.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    dtype = torch.float16 if device.startswith("cuda") else torch.float32
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        model_name, revision=revision, torch_dtype=dtype,
+    ).to(device).eval()
+
+    config = model.config
+    labels = [config.id2label[i].lower() for i in range(config.num_labels)]
+    max_length = min(
+        MAX_TOKENS,
+        tokenizer.model_max_length,
+        getattr(config, "max_position_embeddings", MAX_TOKENS),
+    )
+    # the pipeline's choice: sigmoid for multi-label heads, softmax otherwise
+    multi_label = config.problem_type == "multi_label_classification" or config.num_labels == 1
+
+    def score(texts: list) -> list:
+        encoded = tokenizer(
+            texts,
+            padding="longest",
+            truncation=True,
+            max_length=max_length,
+            return_tensors="pt",
+        ).to(device)
+
+        with torch.inference_mode():
+            logits = model(**encoded).logits.float()
+
+        probs = logits.sigmoid() if multi_label else logits.softmax(dim=-1)
+        return [dict(zip(labels, row)) for row in probs.cpu().tolist()]
+
+    return score
+
+
+def iter_scored(rows, score, needs_score, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    (row, scores) for every row in input order; scores is None for rows
+    needs_score() rejects. Rows are read SORT_WINDOW_BATCHES batches at a
+    time and batched by output length, so padding is mostly real tokens.
+    """
+    rows = iter(rows)
+
+    while window := list(islice(rows, batch_size * SORT_WINDOW_BATCHES)):
+        scores = [None] * len(window)
+        pending = sorted(
+            (i for i, row in enumerate(window) if needs_score(row)),
+            key=lambda i: len(window[i]["output"]),
+        )
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            for i, s in zip(batch, score([window[i]["output"] for i in batch])):
+                scores[i] = s
+
+        yield from zip(window, scores)
+
+
+def synthetic_texts(rows: int, seed: int = 3) -> list:
+    import random
+
+    rng = random.Random(seed)
+    words = (
+        "refund shipping invoice account password order delivery warranty support "
+        "you are useless idiot terrible awful great thanks please help customer"
+    ).split()
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(5, 300))) for _ in range(rows)]
+
+
+def benchmark_classifier(model_name: str, revision: str = "main", device: str = None,
+                         rows: int = 2000, batch_sizes=(1, 16, 64)) -> list:
+    """
+    rows/s of iter_scored() at each batch size, on synthetic texts of
+    5-300 words. Batch size 1 is the old one-call-per-line loop.
+    """
+    score = load_classifier(model_name, revision, device)
+    texts = [{"output": t} for t in synthetic_texts(rows)]
+    score([t["output"] for t in texts[:8]])  # warm-up
+
+    results = []
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        for _ in iter_scored(texts, score, lambda row: True, batch_size):
+            pass
+        elapsed = time.perf_counter() - started
+        results.append({"batch_size": batch_size, "seconds": round(elapsed, 2), "rows_per_second": round(rows / elapsed, 1)})
+        print(results[-1])
+
+    return results
+
+
+def clean_dataset(cpu_cleaned_jsonl_url: str, score, thresholds: dict, classify_key: str,
+                  batch_size: int, storage, workdir: Path) -> dict:
+    """
+    Download one CPU-cleaned dataset, drop the unsafe rows and upload the
+    result over the original. score(texts) is only called when some row
+    needs classifying. Shared by gpu_clean_feedbacks and CleaningWorker.
+    """
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+
+    input_path = workdir / "input.jsonl"
+    output_path = workdir / "cleaned.jsonl"
+
+    # 1️⃣ Download CPU-cleaned JSONL (plain or gzip, the backend exports .jsonl.gz),
+    # streamed to disk and resumed on a dropped connection
+    compressed = cpu_cleaned_jsonl_url.split("?")[0].endswith(".gz")
+    storage.download_url(cpu_cleaned_jsonl_url, input_path)
+
+    open_jsonl = gzip.open if compressed else open
+
+    scored = 0
+    classify_seconds = 0.0
+
+    def timed_score(texts: list) -> list:
+        nonlocal scored, classify_seconds
+
+        started = time.perf_counter()
+        scores = score(texts)
+        classify_seconds += time.perf_counter() - started
+        scored += len(texts)
+        return scores
+
+    def needs_score(row: dict) -> bool:
+        # with classify_key, rows without it were cached as safe by the backend
+        return classify_key is None or classify_key in row
+
+    def is_safe(score_map: dict) -> bool:
+        return all(score_map.get(label, 0) <= limit for label, limit in thresholds.items())
+
+    kept = 0
+    classified = {}
+
+    # 3️⃣ Filter semantically, in length-sorted batches
+    with open_jsonl(input_path, "rt") as fin, open_jsonl(output_path, "wt") as fout:
+        rows = (json.loads(line) for line in fin)
+
+        for row, score_map in iter_scored(rows, timed_score, needs_score, batch_size):
+            if classify_key is not None:
+                fingerprint = row.pop(classify_key, None)
+                if fingerprint is not None:
+                    classified[fingerprint] = score_map
+
+            if score_map is not None and not is_safe(score_map):
+                continue
+
+            fout.write(json.dumps(row) + "\n")
+            kept += 1
+
+    rows_per_second = scored / classify_seconds if classify_seconds else 0.0
+    print(f"clean_dataset: classified {scored} rows in {classify_seconds:.1f}s ({rows_per_second:.0f} rows/s, batch {batch_size})")
+
+    # 4️⃣ Upload cleaned.jsonl back to the same location (replace original)
+    # Extract the object path from the input URL
+    # Example: https://xxx.supabase.co/storage/v1/object/public/training-data/feedback/data.jsonl
+    # Extract: feedback/data.jsonl
+    object_path = cpu_cleaned_jsonl_url.split(f"{BUCKET}/")[-1].split("?")[0]
+
+    # chunked and resumable; replaces the original
+    final_url = storage.upload_file(
+        output_path,
+        object_path,
+        "application/gzip" if compressed else "application/jsonl",
+    )
+
+    return {
+        "rows_kept": kept,
+        "cleaned_jsonl_url": final_url,
+        "classified": scored,
+        "scores": classified,
+        "classify_rows_per_second": round(rows_per_second, 1),
+    }
+
 
 @app.function(
     image=image,
     gpu=GPU,
     timeout=30 * 60,
+    volumes={str(WEIGHTS_DIR): weights},
     secrets=[
         modal.Secret.from_name("hf-platform"),
         modal.Secret.from_name("supabase"),
     ],
 )
-def gpu_clean_feedbacks(cpu_cleaned_jsonl_url: str):
+def gpu_clean_feedbacks(
+    cpu_cleaned_jsonl_url: str,
+    thresholds: dict = None,
+    classify_key: str = None,
+    model_name: str = "unitary/toxic-bert",
+    model_revision: str = "main",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+):
     """
     GPU checks:
     - toxicity / hate / violence
@@ -41,86 +268,272 @@ def gpu_clean_feedbacks(cpu_cleaned_jsonl_url: str):
     - self-harm
     - medical / legal risk
     - jailbreak patterns
-    """
 
+    With classify_key set, only rows carrying that field are classified
+    (the backend already judged the rest from its verdict cache); the field
+    is stripped from the output and the scores of the classified rows are
+    returned keyed by its value.
+
+    One container and one model load per dataset; SafetyCleaner is the
+    resident alternative.
+    """
     workdir = Path("/workspace")
     workdir.mkdir(exist_ok=True)
 
-    input_path = workdir / "input.jsonl"
-    output_path = workdir / "cleaned.jsonl"
+    # 2️⃣ Load safety classifier (lightweight)
+    safety_clf = None
+    weights_report = None
 
-    # 1️⃣ Download CPU-cleaned JSONL
-    r = requests.get(cpu_cleaned_jsonl_url, timeout=30)
-    r.raise_for_status()
-    input_path.write_bytes(r.content)
+    def score(texts: list) -> list:
+        nonlocal safety_clf, weights_report
 
-    # 2️⃣ Load safety classifier (lightweight)
-    from transformers import pipeline
-    import os
-    from supabase import create_client
-
-    safety_clf = pipeline(
-        "text-classification",
-        model="unitary/toxic-bert",
-        device=0,
-        return_all_scores=True,
+        # loaded on first use: a fully cached dataset never needs the model
+        if safety_clf is None:
+            model_dir, weights_report = _cached_weights(model_name, model_revision)
+
+            started = time.perf_counter()
+            safety_clf = load_classifier(str(model_dir), device="cuda")
+            weights_report["load_seconds"] = round(time.perf_counter() - started, 1)
+            print(f"gpu_clean_feedbacks: weights {weights_report}")
+
+        return safety_clf(texts)
+
+    result = clean_dataset(
+        cpu_cleaned_jsonl_url, score, thresholds, classify_key, batch_size, storage_from_env(BUCKET), workdir,
     )
+    return {**result, "weights": weights_report}
 
-    def is_safe(text: str) -> bool:
-        scores = safety_clf(text)[0]
-        score_map = {s["label"].lower(): s["score"] for s in scores}
 
-        # Conservative thresholds
-        if score_map.get("toxic", 0) > 0.85:
-            return False
-        if score_map.get("severe_toxic", 0) > 0.7:
-            return False
+def _cached_weights(model_name: str, model_revision: str):
+    weights.reload()
+    model_dir, report = weight_cache.ensure(model_name, model_revision, WEIGHTS_DIR, os.environ.get("HF_TOKEN"))
+    weights.commit()
+    return model_dir, report
 
-        return True
 
-    kept = 0
+@app.function(
+    image=image,
+    timeout=5 * 60,
+    volumes={str(WEIGHTS_DIR): weights},
+    secrets=[modal.Secret.from_name("hf-platform")],
+)
+def resolve_weights(model_name: str, model_revision: str = "main") -> str:
+    """
+    The commit the cleaning jobs load for model_revision: itself if it is
+    one, else the weight cache's pin (moved by prefetch_weights --refresh).
+    The backend keys its verdict cache by it.
+    """
+    weights.reload()
+    commit = weight_cache.resolve(model_name, model_revision, WEIGHTS_DIR, os.environ.get("HF_TOKEN"))
+    weights.commit()
+    return commit
 
-    # 3️⃣ Filter semantically
-    with input_path.open() as fin, output_path.open("w") as fout:
-        for line in fin:
-            row = json.loads(line)
-            output = row["output"]
 
-            if not is_safe(output):
+# -------- Resident cleaning service (batches across requests) --------
+
+class SharedBatcher:
+    """
+    score() for many concurrent callers, merged into shared batches: one
+    thread drives the model and sends a batch once it holds batch_size
+    texts, or max_wait_seconds after its first text. Small datasets from
+    different orgs then fill one batch instead of each paying for its own.
+    """
+
+    def __init__(self, score, batch_size: int = DEFAULT_BATCH_SIZE, max_wait_seconds: float = 0.02):
+        self._score = score
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        self.started_at = time.perf_counter()
+        self.batches = 0
+        self.rows = 0
+        self.shared_batches = 0
+        self.busy_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="shared-batcher", daemon=True)
+        self._thread.start()
+
+    def score(self, texts: list, request_id=None) -> list:
+        pending = [(text, request_id, Future()) for text in texts]
+        for item in pending:
+            self._queue.put(item)
+        return [future.result() for _, _, future in pending]
+
+    def _next_batch(self) -> list:
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_seconds
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            # similar lengths together keep the padding down
+            batch.sort(key=lambda item: len(item[0]))
+            started = time.perf_counter()
+            try:
+                scores = self._score([text for text, _, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
                 continue
+            elapsed = time.perf_counter() - started
 
-            fout.write(json.dumps(row) + "\n")
-            kept += 1
+            for (_, _, future), s in zip(batch, scores):
+                future.set_result(s)
 
-    # 4️⃣ Upload cleaned.jsonl back to the same location (replace original)
-    supabase = create_client(
-        os.environ["SUPABASE_URL"],
-        os.environ["SUPABASE_SERVICE_ROLE_KEY"],
-    )
+            with self._lock:
+                self.batches += 1
+                self.rows += len(batch)
+                self.busy_seconds += elapsed
+                if len({request_id for _, request_id, _ in batch}) > 1:
+                    self.shared_batches += 1
 
-    BUCKET = "training-data"
+    def stats(self) -> dict:
+        with self._lock:
+            uptime = time.perf_counter() - self.started_at
+            return {
+                "batches": self.batches,
+                "rows": self.rows,
+                "mean_batch_rows": round(self.rows / self.batches, 1) if self.batches else 0.0,
+                "batch_fill": round(self.rows / (self.batches * self.batch_size), 3) if self.batches else 0.0,
+                "shared_batches": self.shared_batches,
+                "busy_seconds": round(self.busy_seconds, 2),
+                # share of the worker's lifetime the model was computing
+                "utilization": round(self.busy_seconds / uptime, 3) if uptime else 0.0,
+            }
 
-    # Extract the object path from the input URL
-    # Example: https://xxx.supabase.co/storage/v1/object/public/training-data/feedback/data.jsonl
-    # Extract: feedback/data.jsonl
-    object_path = cpu_cleaned_jsonl_url.split(f"{BUCKET}/")[-1].split("?")[0]
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+class CleaningWorker:
+    """
+    The resident cleaning service without Modal: the classifier is loaded
+    once, and clean() may be called from any number of threads (one per
+    request); their rows share batches through a SharedBatcher. With
+    device="cpu" it runs locally, e.g. against a FilesystemStorage.
+
+    Each result carries "worker": cold_start (the first request this
+    worker served, i.e. the one that waited for the model load),
+    load_seconds, requests served and the batcher's stats.
+    """
+
+    def __init__(self, model_dir, device: str = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 storage=None, workdir: Path = Path("/workspace"), weights_report: dict = None):
+        started = time.perf_counter()
+        self.batcher = SharedBatcher(load_classifier(str(model_dir), device=device), batch_size)
+        self.load_seconds = round(time.perf_counter() - started, 1)
+
+        self.storage = storage or storage_from_env(BUCKET)
+        self.workdir = Path(workdir)
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.weights = {**(weights_report or {}), "load_seconds": self.load_seconds}
+
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def clean(self, cpu_cleaned_jsonl_url: str, thresholds: dict = None, classify_key: str = None) -> dict:
+        with self._lock:
+            self.requests += 1
+            request_id = self.requests
+
+        with tempfile.TemporaryDirectory(dir=self.workdir) as workdir:
+            result = clean_dataset(
+                cpu_cleaned_jsonl_url,
+                lambda texts: self.batcher.score(texts, request_id),
+                thresholds,
+                classify_key,
+                self.batcher.batch_size,
+                self.storage,
+                Path(workdir),
+            )
+
+        return {**result, "weights": self.weights, "worker": {"cold_start": request_id == 1, **self.stats()}}
+
+    def stats(self) -> dict:
+        return {"load_seconds": self.load_seconds, "requests": self.requests, **self.batcher.stats()}
+
+    def close(self):
+        self.batcher.close()
+
+
+@app.cls(
+    image=image,
+    gpu=GPU,
+    timeout=30 * 60,
+    volumes={str(WEIGHTS_DIR): weights},
+    secrets=[
+        modal.Secret.from_name("hf-platform"),
+        modal.Secret.from_name("supabase"),
+    ],
+    min_containers=CLEANER_MIN_CONTAINERS,
+    scaledown_window=CLEANER_IDLE_SECONDS,
+)
+@modal.concurrent(max_inputs=CLEANER_MAX_REQUESTS)
+class SafetyCleaner:
+    """
+    Long-lived gpu_clean_feedbacks: the model loads once per container
+    (@modal.enter), the container stays warm for CLEANER_IDLE_SECONDS, and
+    up to CLEANER_MAX_REQUESTS datasets, from any orgs, are cleaned at once
+    with their rows in shared GPU batches. Same result as
+    gpu_clean_feedbacks, plus "worker" (see CleaningWorker).
+    """
 
-    with output_path.open("rb") as f:
-        supabase.storage.from_(BUCKET).upload(
-            path=object_path,
-            file=f,
-            file_options={
-                "content-type": "application/jsonl",
-                "upsert": "true",  # This replaces the file if it exists
-            },
+    model_name: str = modal.parameter(default="unitary/toxic-bert")
+    model_revision: str = modal.parameter(default="main")
+    batch_size: int = modal.parameter(default=DEFAULT_BATCH_SIZE)
+
+    @modal.enter()
+    def load(self):
+        self.model_dir, weights_report = _cached_weights(self.model_name, self.model_revision)
+        self.leased_at = time.time()
+        self.worker = CleaningWorker(
+            self.model_dir, "cuda", self.batch_size, storage_from_env(BUCKET), Path("/workspace"), weights_report,
         )
+        print(f"SafetyCleaner: cold start, {self.model_name} loaded in {self.worker.load_seconds}s")
 
-    final_url = supabase.storage.from_(BUCKET).get_public_url(object_path)
+    def _renew_lease(self):
+        # this container outlives any job timeout; keep other containers'
+        # evict() off the snapshot it loaded (see weight_cache)
+        if time.time() - self.leased_at < weight_cache.LEASE_SECONDS / 4:
+            return
+        self.leased_at = time.time()
+        weight_cache.touch(self.model_dir)
+        weights.commit()
 
-    return {
-        "rows_kept": kept,
-        "cleaned_jsonl_url": final_url
-    }
+    @modal.method()
+    def clean(self, cpu_cleaned_jsonl_url: str, thresholds: dict = None, classify_key: str = None) -> dict:
+        self._renew_lease()
+        return self.worker.clean(cpu_cleaned_jsonl_url, thresholds, classify_key)
+
+    @modal.method()
+    def stats(self) -> dict:
+        return self.worker.stats()
+
+    @modal.exit()
+    def close(self):
+        print(f"SafetyCleaner: shutting down after {self.worker.stats()}")
+        self.worker.close()
+
+
+@app.function(image=image, gpu=GPU, timeout=30 * 60, secrets=[modal.Secret.from_name("hf-platform")])
+def bench_safety_classifier(model_name: str = "unitary/toxic-bert", rows: int = 2000, batch_sizes: list = None):
+    return benchmark_classifier(model_name, device="cuda", rows=rows, batch_sizes=batch_sizes or [1, 16, 64, 128])
 
 
 if __name__ == "__main__":
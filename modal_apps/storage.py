@@ -0,0 +1,613 @@
+"""
+Object storage shared by the backend and both Modal apps. One interface,
+three backends (STORAGE_BACKEND):
+
+  supabase    Supabase Storage. Uploads go through the resumable (TUS)
+              endpoint in 6 MB chunks; the default.
+  s3          any S3-compatible store (AWS, R2, MinIO, Supabase's S3
+              endpoint). Uploads are multipart, parts sent in parallel.
+  filesystem  a directory, for local runs.
+
+Uploads never hold more than a few parts in memory. upload_file() leaves a
+small state file next to the source while it runs, so calling it again
+after a failure continues the same upload instead of starting over.
+Downloads stream to disk and resume a partial file with Range requests;
+given a sha256 (or, on S3, the one recorded at upload), the result is
+verified and removed on mismatch.
+
+Only the stdlib and requests are needed; boto3 only for the s3 backend.
+"""
+import base64
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+import requests
+
+
+# S3 multipart parts must be at least 5 MB (except the last)
+PART_BYTES = int(os.environ.get("STORAGE_PART_BYTES", str(16 * 1024 * 1024)))
+# Supabase resumable (TUS) uploads take fixed 6 MB chunks, only the last may be shorter
+TUS_CHUNK_BYTES = 6 * 1024 * 1024
+TRANSFER_WORKERS = int(os.environ.get("STORAGE_TRANSFER_WORKERS", "4"))
+RETRIES = int(os.environ.get("STORAGE_RETRIES", "4"))
+TIMEOUT_SECONDS = float(os.environ.get("STORAGE_TIMEOUT_SECONDS", os.environ.get("UPLOAD_TIMEOUT_SECONDS", "120")))
+COPY_BYTES = 1024 * 1024
+
+
+class ChecksumError(Exception):
+    pass
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(COPY_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _retry(fn, *args, **kwargs):
+    """fn(*args), retried with exponential backoff on any error."""
+    for attempt in range(RETRIES):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == RETRIES - 1:
+                raise
+            print(f"storage: {type(e).__name__}: {e}; retry {attempt + 1}/{RETRIES - 1}")
+            time.sleep(2 ** attempt)
+
+
+def _verify(path: Path, sha256: str):
+    if sha256 and file_sha256(path) != sha256:
+        path.unlink()
+        raise ChecksumError(f"sha256 mismatch for {path.name}")
+
+
+def _read_range(path: Path, offset: int, size: int) -> bytes:
+    with path.open("rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def rechunk(chunks: Iterable[bytes], size: int):
+    """Chunks of exactly `size` bytes (the last may be shorter)."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def _partial_path(dest: Path) -> Path:
+    return dest.with_name(f"{dest.name}.part")
+
+
+def download_url(url: str, dest: Path, sha256: str = None, headers: dict = None) -> Path:
+    """
+    Stream `url` to `dest`. A leftover dest.part from an interrupted
+    attempt (this call's or an earlier one) is continued with a Range
+    request; servers that ignore Range get the whole file again.
+    """
+    dest = Path(dest)
+    partial = _partial_path(dest)
+
+    def attempt():
+        have = partial.stat().st_size if partial.exists() else 0
+        range_headers = {**(headers or {}), **({"Range": f"bytes={have}-"} if have else {})}
+
+        with requests.get(url, headers=range_headers, stream=True, timeout=TIMEOUT_SECONDS) as r:
+            # the partial file already holds everything
+            if r.status_code == 416 and have:
+                return
+            r.raise_for_status()
+
+            resumed = have and r.status_code == 206
+            with partial.open("ab" if resumed else "wb") as f:
+                for block in r.iter_content(chunk_size=COPY_BYTES):
+                    f.write(block)
+
+    _retry(attempt)
+    os.replace(partial, dest)
+    _verify(dest, sha256)
+    return dest
+
+
+class Storage:
+    """
+    Backends implement url / exists / the uploads / download; the state
+    file and rechunking helpers are shared.
+    """
+
+    def url(self, key: str) -> str:
+        """Where consumers (the Modal apps, the browser) read `key` from."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def upload_file(self, path: Path, key: str, content_type: str = "application/octet-stream") -> str:
+        """Upload `path` to `key`, resuming an earlier failed attempt. Returns url(key)."""
+        raise NotImplementedError
+
+    def upload_stream(self, chunks: Iterable[bytes], key: str, content_type: str) -> str:
+        """Upload a stream of unknown length, replacing `key`. Returns url(key)."""
+        raise NotImplementedError
+
+    def upload_bytes(self, data: bytes, key: str, content_type: str) -> str:
+        return self.upload_stream([data], key, content_type)
+
+    def download(self, key: str, dest: Path, sha256: str = None) -> Path:
+        raise NotImplementedError
+
+    def download_url(self, url: str, dest: Path, sha256: str = None) -> Path:
+        """Download something url() returned."""
+        return download_url(url, dest, sha256)
+
+    @staticmethod
+    def _state_path(path: Path, key: str) -> Path:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+        return Path(path).with_name(f".{Path(path).name}.{digest}.upload")
+
+    @staticmethod
+    def _load_state(state_path: Path, path: Path):
+        """The saved upload state, if it was for this very file."""
+        if not state_path.exists():
+            return None
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        stat = Path(path).stat()
+        if state.get("size") != stat.st_size or state.get("mtime") != stat.st_mtime_ns:
+            return None
+        return state
+
+    @staticmethod
+    def _save_state(state_path: Path, path: Path, **state):
+        stat = Path(path).stat()
+        state_path.write_text(
+            json.dumps({**state, "size": stat.st_size, "mtime": stat.st_mtime_ns}),
+            encoding="utf-8",
+        )
+
+
+class FilesystemStorage(Storage):
+    """
+    Objects are files under `root`; url() is the absolute path. Writes go
+    to a temporary name and are renamed, so an object is either absent or
+    complete.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def url(self, key: str) -> str:
+        return str(self._path(key).resolve())
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def upload_stream(self, chunks: Iterable[bytes], key: str, content_type: str) -> str:
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+
+        try:
+            with tmp.open("wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        return self.url(key)
+
+    def upload_file(self, path: Path, key: str, content_type: str = "application/octet-stream") -> str:
+        with Path(path).open("rb") as f:
+            return self.upload_stream(iter(lambda: f.read(COPY_BYTES), b""), key, content_type)
+
+    def download(self, key: str, dest: Path, sha256: str = None) -> Path:
+        return self.download_url(self.url(key), dest, sha256)
+
+    def download_url(self, url: str, dest: Path, sha256: str = None) -> Path:
+        if "://" in url:
+            return download_url(url, dest, sha256)
+
+        dest = Path(dest)
+        partial = _partial_path(dest)
+        have = partial.stat().st_size if partial.exists() else 0
+
+        with open(url, "rb") as src, partial.open("ab" if have else "wb") as f:
+            src.seek(have)
+            shutil.copyfileobj(src, f, COPY_BYTES)
+
+        os.replace(partial, dest)
+        _verify(dest, sha256)
+        return dest
+
+
+class SupabaseStorage(Storage):
+    """
+    A public Supabase Storage bucket. Uploads use the TUS endpoint, which
+    takes one chunk at a time per upload (no parallel parts); a failed
+    PATCH is retried from the offset the server reports. Reads use the
+    authenticated object endpoint, so private buckets work too.
+    """
+
+    def __init__(self, url: str, service_key: str, bucket: str):
+        self.base = url.rstrip("/")
+        self.bucket = bucket
+        self.headers = {"Authorization": f"Bearer {service_key}", "apikey": service_key}
+
+    def url(self, key: str) -> str:
+        return f"{self.base}/storage/v1/object/public/{self.bucket}/{key}"
+
+    def _object_url(self, key: str) -> str:
+        return f"{self.base}/storage/v1/object/{self.bucket}/{key}"
+
+    def exists(self, key: str) -> bool:
+        r = _retry(requests.head, self._object_url(key), headers=self.headers, timeout=TIMEOUT_SECONDS)
+        return r.status_code == 200
+
+    # ---- TUS ----
+
+    @staticmethod
+    def _tus_metadata(**fields) -> str:
+        return ",".join(
+            f"{key} {base64.b64encode(value.encode()).decode()}"
+            for key, value in fields.items()
+        )
+
+    def _tus_create(self, key: str, content_type: str, length: int = None) -> str:
+        length_header = {"Upload-Length": str(length)} if length is not None else {"Upload-Defer-Length": "1"}
+        r = requests.post(
+            f"{self.base}/storage/v1/upload/resumable",
+            headers={
+                **self.headers,
+                **length_header,
+                "Tus-Resumable": "1.0.0",
+                "Upload-Metadata": self._tus_metadata(
+                    bucketName=self.bucket,
+                    objectName=key,
+                    contentType=content_type,
+                ),
+                "x-upsert": "true",
+            },
+            timeout=TIMEOUT_SECONDS,
+        )
+        r.raise_for_status()
+        return r.headers["Location"]
+
+    def _tus_offset(self, location: str) -> int:
+        """The server's offset; raises if the upload is gone (expired or finished)."""
+        r = requests.head(location, headers={**self.headers, "Tus-Resumable": "1.0.0"}, timeout=TIMEOUT_SECONDS)
+        r.raise_for_status()
+        return int(r.headers["Upload-Offset"])
+
+    def _tus_patch(self, location: str, offset: int, data: bytes, final_length: int = None) -> int:
+        """Send `data` at `offset`; after a failure, resend only what the server lacks."""
+
+        def attempt():
+            have = self._tus_offset(location)
+            if have >= offset + len(data):
+                return
+            headers = {
+                **self.headers,
+                "Tus-Resumable": "1.0.0",
+                "Content-Type": "application/offset+octet-stream",
+                "Upload-Offset": str(have),
+            }
+            if final_length is not None:
+                headers["Upload-Length"] = str(final_length)
+            r = requests.patch(location, headers=headers, data=data[have - offset:], timeout=TIMEOUT_SECONDS)
+            r.raise_for_status()
+
+        _retry(attempt)
+        return offset + len(data)
+
+    def upload_stream(self, chunks: Iterable[bytes], key: str, content_type: str) -> str:
+        location = _retry(self._tus_create, key, content_type)
+        offset = 0
+        pending = None
+
+        # one chunk of lookahead: the last PATCH has to declare the length
+        for chunk in itertools.chain(rechunk(chunks, TUS_CHUNK_BYTES), [None]):
+            if pending is not None:
+                final_length = offset + len(pending) if chunk is None else None
+                offset = self._tus_patch(location, offset, pending, final_length)
+            pending = chunk
+
+        return self.url(key)
+
+    def upload_file(self, path: Path, key: str, content_type: str = "application/octet-stream") -> str:
+        path = Path(path)
+        size = path.stat().st_size
+        state_path = self._state_path(path, key)
+        state = self._load_state(state_path, path)
+
+        offset = 0
+        location = None
+        if state:
+            try:
+                location = state["location"]
+                offset = self._tus_offset(location)
+                print(f"storage: resuming {key} at {offset}/{size} bytes")
+            except requests.RequestException:
+                location = None
+
+        if location is None:
+            location = _retry(self._tus_create, key, content_type, size)
+            self._save_state(state_path, path, location=location)
+
+        while offset < size:
+            offset = self._tus_patch(location, offset, _read_range(path, offset, TUS_CHUNK_BYTES))
+
+        state_path.unlink(missing_ok=True)
+        return self.url(key)
+
+    def download(self, key: str, dest: Path, sha256: str = None) -> Path:
+        return download_url(self._object_url(key), dest, sha256, self.headers)
+
+    def download_url(self, url: str, dest: Path, sha256: str = None) -> Path:
+        # our own public urls go through the authenticated endpoint
+        prefix = f"{self.base}/storage/v1/object/public/{self.bucket}/"
+        if url.startswith(prefix):
+            return self.download(url[len(prefix):].split("?")[0], dest, sha256)
+        return download_url(url, dest, sha256)
+
+
+class S3Storage(Storage):
+    """
+    An S3-compatible bucket. Files above PART_BYTES are multipart uploads
+    with TRANSFER_WORKERS parts in flight; the upload id is kept in the
+    state file, and a rerun asks the store which parts it already has.
+    The sha256 of uploaded files is stored as object metadata and checked
+    on download. Downloads fetch TRANSFER_WORKERS byte ranges in parallel
+    into a preallocated file.
+
+    url() is public_url/key when the bucket is public, else a presigned
+    url valid for PRESIGN_SECONDS.
+    """
+
+    PRESIGN_SECONDS = 7 * 24 * 3600
+
+    def __init__(self, bucket: str, endpoint_url: str = None, region: str = None,
+                 access_key: str = None, secret_key: str = None, public_url: str = None):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            config=Config(
+                retries={"max_attempts": RETRIES, "mode": "standard"},
+                max_pool_connections=max(10, TRANSFER_WORKERS * 2),
+                s3={"addressing_style": "path"},
+            ),
+        )
+
+    def url(self, key: str) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{key}"
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=self.PRESIGN_SECONDS,
+        )
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def _upload_parts(self, key: str, upload_id: str, parts) -> dict:
+        """Upload (number, data_fn) parts with TRANSFER_WORKERS in flight; {number: etag}."""
+
+        def send(number, data_fn):
+            r = _retry(
+                self.client.upload_part,
+                Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=data_fn(),
+            )
+            return number, r["ETag"]
+
+        done = {}
+        with ThreadPoolExecutor(max_workers=TRANSFER_WORKERS) as pool:
+            in_flight = []
+            for number, data_fn in parts:
+                # bounded: at most TRANSFER_WORKERS parts read into memory
+                if len(in_flight) >= TRANSFER_WORKERS:
+                    done.update([in_flight.pop(0).result()])
+                in_flight.append(pool.submit(send, number, data_fn))
+            done.update(f.result() for f in in_flight)
+        return done
+
+    def _complete(self, key: str, upload_id: str, etags: dict):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": n, "ETag": etags[n]} for n in sorted(etags)]},
+        )
+
+    def _uploaded_parts(self, key: str, upload_id: str) -> dict:
+        etags = {}
+        for page in self.client.get_paginator("list_parts").paginate(Bucket=self.bucket, Key=key, UploadId=upload_id):
+            etags.update({p["PartNumber"]: p["ETag"] for p in page.get("Parts", [])})
+        return etags
+
+    def upload_stream(self, chunks: Iterable[bytes], key: str, content_type: str) -> str:
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=content_type,
+        )["UploadId"]
+
+        try:
+            parts = (
+                (number, lambda data=data: data)
+                for number, data in enumerate(rechunk(chunks, PART_BYTES), start=1)
+            )
+            etags = self._upload_parts(key, upload_id, parts)
+            if not etags:
+                etags = self._upload_parts(key, upload_id, [(1, lambda: b"")])
+            self._complete(key, upload_id, etags)
+        except BaseException:
+            # a stream can't be replayed, so there is nothing to resume
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+        return self.url(key)
+
+    def upload_file(self, path: Path, key: str, content_type: str = "application/octet-stream") -> str:
+        from botocore.exceptions import ClientError
+
+        path = Path(path)
+        size = path.stat().st_size
+        sha256 = file_sha256(path)
+
+        if size <= PART_BYTES:
+            _retry(
+                self.client.put_object,
+                Bucket=self.bucket, Key=key, Body=path.read_bytes(),
+                ContentType=content_type, Metadata={"sha256": sha256},
+            )
+            return self.url(key)
+
+        state_path = self._state_path(path, key)
+        state = self._load_state(state_path, path)
+        etags = {}
+
+        if state and state.get("sha256") == sha256:
+            try:
+                etags = self._uploaded_parts(key, state["upload_id"])
+                upload_id = state["upload_id"]
+                print(f"storage: resuming {key}, {len(etags)} parts already uploaded")
+            except ClientError:
+                state = None
+        else:
+            state = None
+
+        if state is None:
+            upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=key, ContentType=content_type, Metadata={"sha256": sha256},
+            )["UploadId"]
+            self._save_state(state_path, path, upload_id=upload_id, sha256=sha256)
+
+        count = (size + PART_BYTES - 1) // PART_BYTES
+        missing = [
+            (number, lambda number=number: _read_range(path, (number - 1) * PART_BYTES, PART_BYTES))
+            for number in range(1, count + 1)
+            if number not in etags
+        ]
+        etags.update(self._upload_parts(key, upload_id, missing))
+        self._complete(key, upload_id, etags)
+
+        state_path.unlink(missing_ok=True)
+        return self.url(key)
+
+    def download(self, key: str, dest: Path, sha256: str = None) -> Path:
+        dest = Path(dest)
+        head = self.client.head_object(Bucket=self.bucket, Key=key)
+        size = head["ContentLength"]
+        sha256 = sha256 or head.get("Metadata", {}).get("sha256")
+
+        partial = _partial_path(dest)
+        done_path = partial.with_name(f"{partial.name}.json")
+
+        # finished ranges of an interrupted download, if it was of this object
+        done = set()
+        if partial.exists() and done_path.exists():
+            saved = json.loads(done_path.read_text(encoding="utf-8"))
+            if saved.get("etag") == head["ETag"] and saved.get("part_bytes") == PART_BYTES:
+                done = set(saved["parts"])
+
+        if not done:
+            with partial.open("wb") as f:
+                f.truncate(size)
+
+        def fetch(number):
+            start = number * PART_BYTES
+            end = min(start + PART_BYTES, size) - 1
+
+            def attempt():
+                body = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}")["Body"]
+                offset = start
+                with partial.open("r+b") as f:
+                    for block in body.iter_chunks(COPY_BYTES):
+                        f.seek(offset)
+                        f.write(block)
+                        offset += len(block)
+
+            _retry(attempt)
+            return number
+
+        count = (size + PART_BYTES - 1) // PART_BYTES
+        with ThreadPoolExecutor(max_workers=TRANSFER_WORKERS) as pool:
+            for number in pool.map(fetch, [n for n in range(count) if n not in done]):
+                done.add(number)
+                done_path.write_text(
+                    json.dumps({"etag": head["ETag"], "part_bytes": PART_BYTES, "parts": sorted(done)}),
+                    encoding="utf-8",
+                )
+
+        os.replace(partial, dest)
+        done_path.unlink(missing_ok=True)
+        _verify(dest, sha256)
+        return dest
+
+    def download_url(self, url: str, dest: Path, sha256: str = None) -> Path:
+        # our own urls go through the client (parallel ranges, metadata checksum)
+        prefix = f"{self.public_url}/" if self.public_url else None
+        if prefix and url.startswith(prefix):
+            return self.download(url[len(prefix):].split("?")[0], dest, sha256)
+        return download_url(url, dest, sha256)
+
+
+def storage_from_env(bucket: str) -> Storage:
+    """
+    The configured backend for `bucket`:
+
+      supabase    SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
+      s3          S3_ENDPOINT_URL, S3_REGION, S3_ACCESS_KEY_ID,
+                  S3_SECRET_ACCESS_KEY, S3_PUBLIC_URL (optional; the base
+                  url of the public buckets, bucket name appended)
+      filesystem  STORAGE_ROOT/<bucket>
+    """
+    backend = os.environ.get("STORAGE_BACKEND", "supabase")
+
+    if backend == "supabase":
+        return SupabaseStorage(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"], bucket)
+
+    if backend == "s3":
+        public_url = os.environ.get("S3_PUBLIC_URL")
+        return S3Storage(
+            bucket,
+            endpoint_url=os.environ.get("S3_ENDPOINT_URL"),
+            region=os.environ.get("S3_REGION"),
+            access_key=os.environ.get("S3_ACCESS_KEY_ID"),
+            secret_key=os.environ.get("S3_SECRET_ACCESS_KEY"),
+            public_url=f"{public_url.rstrip('/')}/{bucket}" if public_url else None,
+        )
+
+    if backend == "filesystem":
+        return FilesystemStorage(Path(os.environ.get("STORAGE_ROOT", "storage")) / bucket)
+
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
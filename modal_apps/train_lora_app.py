@@ -1,11 +1,18 @@
 import modal
 from pathlib import Path
+import gzip
+import hashlib
+import hmac
 import os
 import requests
 import json
+import time
 
 import shutil
-from supabase import create_client
+
+from artifact_store import StorageArtifactStore
+from storage import download_url, storage_from_env
+import weight_cache
 
 # ---------- Modal app ----------
 app = modal.App("lora-training-dev")
@@ -25,28 +32,599 @@ image = (
         "bitsandbytes",
         "accelerate",
         "requests",
-        "supabase",
+        "boto3",
     )
+    # the weights volume's size cap (free disk space says nothing about a volume)
+    .env({"WEIGHT_CACHE_MAX_GB": os.environ.get("WEIGHT_CACHE_MAX_GB", "100")})
+    .add_local_python_source("artifact_store", "storage", "weight_cache")
 )
 
+# adapters: blobs/<sha256> + manifests/<model_version_id>.json (artifact_store)
+ADAPTER_BUCKET = "lora-adapters"
+
 # ---------- GPU ----------
 GPU = "T4" # cheapest, enough for QLoRA dev
 
+# ---------- Token cache volume (see tokenize_with_cache) ----------
+token_cache = modal.Volume.from_name("lora-token-cache", create_if_missing=True)
+TOKEN_CACHE_DIR = Path("/cache/tokens")
+# telemetry of runs without a metrics URL (FileTelemetrySink)
+TELEMETRY_DIR = Path("/cache/telemetry")
+
+# ---------- Weight cache volume (see weight_cache; shared with the cleaning app) ----------
+weights = modal.Volume.from_name("model-weights", create_if_missing=True)
+WEIGHTS_DIR = Path("/weights")
+
+# ---------- Sequence layout (adapter_config["training"]["padding"]) ----------
+# max_length: the original layout. Every example is padded to
+#             max_seq_length; the loss covers prompt and padding.
+# dynamic:    batches are padded to their longest example, and similar lengths
+#             are grouped into the same batch.
+# packed:     whole examples are bin-packed into sequences of up to
+#             max_seq_length, so there is almost no padding. Attention
+#             crosses example boundaries; EOS separates them.
+# dynamic and packed compute the loss on the output tokens only.
+# Configs without the keys (all stored before them) keep the original layout.
+PADDING_MODES = ("max_length", "dynamic", "packed")
+DEFAULT_PADDING = "max_length"
+DEFAULT_MAX_SEQ_LENGTH = 256
+# rows packed together per datasets.map() batch
+PACK_ROWS = 1000
+
+
+def format_example(row) -> tuple:
+    """
+    (prompt, output); prompt + output is the text the trainer always used.
+    """
+    prompt = f"""### Instruction:
+{row['instruction']}
+
+### Input:
+{row['input']}
+
+### Output:
+"""
+    return prompt, row["output"]
+
+
+def tokenize_row(tokenizer, row) -> dict:
+    """
+    Untruncated prompt / output token ids (output closed by EOS). This is
+    what the token cache stores, so max_seq_length and the layout can
+    change without re-tokenizing.
+    """
+    prompt, output = format_example(row)
+    return {
+        "prompt_ids": tokenizer(prompt)["input_ids"],
+        "output_ids": tokenizer(output, add_special_tokens=False)["input_ids"] + [tokenizer.eos_token_id],
+    }
+
+
+def layout_example(row, max_seq_length: int) -> dict:
+    """
+    Unpadded input_ids / labels, with labels -100 on the prompt. "truncated"
+    is set if the example did not fit.
+    """
+    prompt_ids, output_ids = row["prompt_ids"], row["output_ids"]
+
+    input_ids = (prompt_ids + output_ids)[:max_seq_length]
+    labels = ([-100] * len(prompt_ids) + output_ids)[:max_seq_length]
+
+    return {
+        "input_ids": input_ids,
+        "attention_mask": [1] * len(input_ids),
+        "labels": labels,
+        "truncated": len(prompt_ids) + len(output_ids) > max_seq_length,
+    }
+
+
+def tokenize_example(tokenizer, row, max_seq_length: int) -> dict:
+    return layout_example(tokenize_row(tokenizer, row), max_seq_length)
+
+
+def tokenize_padded(tokenizer, row, max_seq_length: int) -> dict:
+    """
+    The "max_length" layout (the original tokenize()).
+    """
+    prompt, output = format_example(row)
+    tokens = tokenizer(
+        prompt + output,
+        truncation=True,
+        padding="max_length",
+        max_length=max_seq_length,
+    )
+    tokens["labels"] = tokens["input_ids"]
+    return tokens
+
+
+def pack_examples(batch: dict, max_seq_length: int) -> dict:
+    """
+    datasets.map(batched=True) function: first-fit decreasing bin packing
+    of whole examples into sequences of at most max_seq_length tokens.
+    """
+    order = sorted(range(len(batch["input_ids"])), key=lambda i: -len(batch["input_ids"][i]))
+    bins = []  # [free tokens, input_ids, labels]
+
+    for i in order:
+        ids, labels = batch["input_ids"][i], batch["labels"][i]
+
+        for b in bins:
+            if b[0] >= len(ids):
+                break
+        else:
+            b = [max_seq_length, [], []]
+            bins.append(b)
+
+        b[0] -= len(ids)
+        b[1].extend(ids)
+        b[2].extend(labels)
+
+    return {
+        "input_ids": [b[1] for b in bins],
+        "attention_mask": [[1] * len(b[1]) for b in bins],
+        "labels": [b[2] for b in bins],
+    }
+
+
+def build_train_dataset(dataset, tokenizer, mode: str, max_seq_length: int, cache_dir: Path = None):
+    """
+    Tokenized (and, for "packed", packed) training set plus a report:
+    examples, truncated, dropped (nothing left to learn after truncation),
+    sequences, tokens (non-padding, per epoch), and token_cache when
+    cache_dir is given (dynamic and packed only).
+    """
+    if mode not in PADDING_MODES:
+        raise ValueError(f"Unknown padding mode: {mode}")
+
+    columns = dataset.column_names
+
+    if mode == "max_length":
+        tokenized = dataset.map(lambda row: tokenize_padded(tokenizer, row, max_seq_length), remove_columns=columns)
+        masks = tokenized["attention_mask"]
+        return tokenized, {
+            "examples": len(dataset),
+            # no padding left: the text filled (or overflowed) the sequence
+            "truncated": sum(mask[-1] == 1 for mask in masks),
+            "dropped": 0,
+            "sequences": len(tokenized),
+            "tokens": sum(sum(mask) for mask in masks),
+        }
+
+    report = {"examples": len(dataset)}
+
+    if cache_dir is not None:
+        rows, report["token_cache"] = tokenize_with_cache(dataset, tokenizer, cache_dir)
+    else:
+        rows = dataset.map(lambda row: tokenize_row(tokenizer, row), remove_columns=columns)
+
+    tokenized = rows.map(lambda row: layout_example(row, max_seq_length), remove_columns=rows.column_names)
+    truncated = sum(tokenized["truncated"])
+    tokenized = tokenized.remove_columns("truncated")
+
+    # an output truncated away entirely has no label left to train on
+    trainable = tokenized.filter(lambda row: any(label != -100 for label in row["labels"]))
+    dropped = len(tokenized) - len(trainable)
+
+    if mode == "packed":
+        trainable = trainable.map(
+            lambda batch: pack_examples(batch, max_seq_length),
+            batched=True,
+            batch_size=PACK_ROWS,
+        )
+
+    return trainable, {
+        **report,
+        "truncated": truncated,
+        "dropped": dropped,
+        "sequences": len(trainable),
+        "tokens": sum(len(ids) for ids in trainable["input_ids"]),
+    }
+
+
+# ---------- Token cache ----------
+# Tokenized rows (tokenize_row) persisted as Arrow shards under
+#   <cache_dir>/<tokenizer fingerprint>-t<TEMPLATE_VERSION>/shard-*/
+# keyed by row_fingerprint(). Each run loads the shards memory-mapped,
+# tokenizes only the rows none of them has, and adds those as one new
+# shard. Shards are written under a temporary name and renamed, so
+# concurrent runs never read a partial one. Deleting a namespace
+# directory resets that tokenizer's cache.
+#
+# Every row records when it was tokenized or last used by a compacting
+# run (used_at). Once a namespace has more than TOKEN_CACHE_MAX_SHARDS
+# shards or TOKEN_CACHE_MAX_ROWS rows, or its oldest shard is older than
+# TOKEN_CACHE_MAX_AGE_DAYS, the run compacts its shards into one: rows
+# with used_at older than TOKEN_CACHE_MAX_AGE_DAYS are dropped and the
+# rest capped at the TOKEN_CACHE_MAX_ROWS most recent (the current run's
+# rows are always kept). Namespaces no run has added a shard to for
+# TOKEN_CACHE_MAX_AGE_DAYS (old tokenizers or templates) are removed.
+
+# bump when format_example() or tokenize_row() changes what a row becomes
+TEMPLATE_VERSION = 1
+
+TOKEN_CACHE_MAX_SHARDS = int(os.environ.get("TOKEN_CACHE_MAX_SHARDS", "8"))
+TOKEN_CACHE_MAX_ROWS = int(os.environ.get("TOKEN_CACHE_MAX_ROWS", "1000000"))
+TOKEN_CACHE_MAX_AGE_DAYS = float(os.environ.get("TOKEN_CACHE_MAX_AGE_DAYS", "30"))
+
+
+def row_fingerprint(row) -> str:
+    payload = json.dumps([row["instruction"], row["input"], row["output"]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def tokenizer_fingerprint(tokenizer) -> str:
+    """
+    Content hash of the tokenizer (vocab, merges, normalizers, special
+    tokens), so any revision that tokenizes differently gets its own cache.
+    """
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    content = backend.to_str() if backend is not None else f"{tokenizer.name_or_path}:{len(tokenizer)}"
+    content += json.dumps(tokenizer.special_tokens_map, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def _shard_time(path: Path) -> float:
+    # shard-<time_ns>-<suffix>
+    return int(path.name.split("-")[1]) / 1e9
+
+
+def _load_shard(path: Path):
+    from datasets import load_from_disk
+
+    shard = load_from_disk(str(path))
+    if "used_at" not in shard.column_names:
+        # written before rows recorded their use
+        shard = shard.add_column("used_at", [_shard_time(path)] * len(shard))
+    return shard
+
+
+def _save_shard(namespace: Path, rows) -> Path:
+    import uuid
+
+    name = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    tmp_path = namespace / f".tmp-{name}"
+    rows.save_to_disk(str(tmp_path))
+    os.rename(tmp_path, namespace / f"shard-{name}")
+    return namespace / f"shard-{name}"
+
+
+def _sweep_namespaces(cache_dir: Path, keep: Path):
+    """Remove namespaces no run has added a shard to for TOKEN_CACHE_MAX_AGE_DAYS."""
+    cutoff = time.time() - TOKEN_CACHE_MAX_AGE_DAYS * 86400
+
+    for namespace in Path(cache_dir).iterdir():
+        if namespace == keep or not namespace.is_dir():
+            continue
+        times = [_shard_time(path) for path in namespace.glob("shard-*")]
+        if max(times, default=namespace.stat().st_mtime) < cutoff:
+            shutil.rmtree(namespace, ignore_errors=True)
+            print(f"token cache: removed unused namespace {namespace.name}")
+
+
+def _compact(namespace: Path, cached, used: set, shard_paths: list):
+    """
+    Rewrite `cached` (the rows of `shard_paths`) as one shard: one copy of
+    each row, `used` ones stamped now, rows unused for
+    TOKEN_CACHE_MAX_AGE_DAYS dropped, at most TOKEN_CACHE_MAX_ROWS of the
+    most recently used kept. Returns (the new shard's path, rows dropped).
+    """
+    now = time.time()
+    cutoff = now - TOKEN_CACHE_MAX_AGE_DAYS * 86400
+
+    latest = {}  # fingerprint -> (index, used_at) of its newest copy
+    for i, (fp, used_at) in enumerate(zip(cached["fingerprint"], cached["used_at"])):
+        if fp in used:
+            used_at = now
+        if fp not in latest or used_at > latest[fp][1]:
+            latest[fp] = (i, used_at)
+
+    kept = sorted(
+        (entry for entry in latest.values() if entry[1] >= cutoff),
+        key=lambda entry: -entry[1],
+    )[:max(TOKEN_CACHE_MAX_ROWS, len(used))]
+    kept.sort()
+
+    compacted = (
+        cached.select([i for i, _ in kept])
+        .remove_columns("used_at")
+        .add_column("used_at", [used_at for _, used_at in kept])
+    )
+    path = _save_shard(namespace, compacted)
+
+    # concurrent runs hold their own view of the volume; they are unaffected
+    for old in shard_paths:
+        shutil.rmtree(old, ignore_errors=True)
+
+    return path, len(cached) - len(kept)
+
+
+def tokenize_with_cache(dataset, tokenizer, cache_dir: Path):
+    """
+    (rows with prompt_ids / output_ids in dataset order, report). report:
+    hits, misses, shards, tokenize_seconds (new rows, including the shard
+    write), seconds_saved (hits at the per-row tokenization cost last
+    measured for this namespace), compacted_rows_dropped when this run
+    compacted the namespace.
+    """
+    from datasets import concatenate_datasets
+
+    namespace = Path(cache_dir) / f"{tokenizer_fingerprint(tokenizer)}-t{TEMPLATE_VERSION}"
+    namespace.mkdir(parents=True, exist_ok=True)
+    stats_path = namespace / "stats.json"
+    _sweep_namespaces(cache_dir, keep=namespace)
+
+    fingerprints = [row_fingerprint(row) for row in dataset]
+
+    shard_paths = sorted(namespace.glob("shard-*"))
+    shards = [_load_shard(path) for path in shard_paths]
+    cached = concatenate_datasets(shards) if shards else None
+
+    position = {}
+    if cached is not None:
+        for i, fp in enumerate(cached["fingerprint"]):
+            position.setdefault(fp, i)
+
+    missing = {}
+    for i, fp in enumerate(fingerprints):
+        if fp not in position:
+            missing.setdefault(fp, i)
+
+    started = time.perf_counter()
+    if missing:
+        now = time.time()
+        new = dataset.select(list(missing.values())).map(
+            lambda row: {**tokenize_row(tokenizer, row), "fingerprint": row_fingerprint(row), "used_at": now},
+            remove_columns=dataset.column_names,
+        )
+        map_seconds = time.perf_counter() - started
+
+        # reopen memory-mapped rather than keeping the in-memory copy
+        shard_paths.append(_save_shard(namespace, new))
+        new = _load_shard(shard_paths[-1])
+        offset = len(cached) if cached is not None else 0
+        for i, fp in enumerate(new["fingerprint"]):
+            position.setdefault(fp, offset + i)
+        cached = concatenate_datasets([cached, new]) if cached is not None else new
+    tokenize_seconds = time.perf_counter() - started
+
+    report = {}
+    max_age = TOKEN_CACHE_MAX_AGE_DAYS * 86400
+    if (
+        len(shard_paths) > TOKEN_CACHE_MAX_SHARDS
+        or len(cached) > TOKEN_CACHE_MAX_ROWS
+        or time.time() - _shard_time(shard_paths[0]) > max_age
+    ):
+        path, report["compacted_rows_dropped"] = _compact(namespace, cached, set(fingerprints), shard_paths)
+        shard_paths = [path]
+        cached = _load_shard(path)
+        position = {fp: i for i, fp in enumerate(cached["fingerprint"])}
+        print(f"token cache: compacted {namespace.name} to {len(cached)} rows")
+
+    seconds_per_row = None
+    if stats_path.exists():
+        seconds_per_row = json.loads(stats_path.read_text()).get("seconds_per_row")
+    if len(missing) >= 100:
+        seconds_per_row = map_seconds / len(missing)
+        stats_path.write_text(json.dumps({"seconds_per_row": seconds_per_row}))
+
+    hits = len(fingerprints) - len(missing)
+    rows = cached.select([position[fp] for fp in fingerprints]).remove_columns(["fingerprint", "used_at"])
+
+    return rows, {
+        "hits": hits,
+        "misses": len(missing),
+        "shards": len(shard_paths),
+        "tokenize_seconds": round(tokenize_seconds, 2),
+        "seconds_saved": round(hits * seconds_per_row, 2) if seconds_per_row else None,
+        **report,
+    }
+
+
+def data_collator(tokenizer, mode: str):
+    from transformers import DataCollatorForSeq2Seq, default_data_collator
+
+    if mode == "max_length":
+        return default_data_collator
+
+    # pads input_ids with pad_token_id and labels with -100, per batch
+    return DataCollatorForSeq2Seq(tokenizer, padding="longest", label_pad_token_id=-100, pad_to_multiple_of=8)
+
+
+def sampling_arguments(mode: str) -> dict:
+    """
+    TrainingArguments kwargs for length-grouped batches in "dynamic" mode
+    (group_by_length before transformers 5, train_sampling_strategy since).
+    """
+    from transformers import TrainingArguments
+
+    if mode != "dynamic":
+        return {}
+
+    if "train_sampling_strategy" in TrainingArguments.__dataclass_fields__:
+        return {"train_sampling_strategy": "group_by_length"}
+    return {"group_by_length": True}
+
+
+def _signed_post(url: str, payload: dict, timeout: float = 30) -> bool:
+    """
+    POST `payload` signed like the server-to-server endpoints:
+    X-Signature = hex(HMAC_SHA256(secret, "<timestamp>." + body)).
+    Best effort; returns whether it was delivered.
+    """
+    secret = os.environ.get("TRAINING_CALLBACK_SECRET")
+    if not url or not secret:
+        return False
+
+    body = json.dumps(payload).encode()
+    timestamp = str(int(time.time()))
+    signature = hmac.new(
+        secret.encode(),
+        timestamp.encode() + b"." + body,
+        hashlib.sha256,
+    ).hexdigest()
+
+    try:
+        r = requests.post(
+            url,
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Timestamp": timestamp,
+                "X-Signature": signature,
+            },
+            timeout=timeout,
+        )
+        r.raise_for_status()
+        return True
+    except requests.RequestException as e:
+        print(f"POST {url} failed: {e}")
+        return False
+
+
+def _post_callback(callback_url: str, payload: dict):
+    """
+    Report completion to the backend. The backend poller reconciles
+    anything that gets lost.
+    """
+    _signed_post(callback_url, payload)
+
+
+# ---------- Telemetry (backend: app/services/training_telemetry.py) ----------
+
+TELEMETRY_INTERVAL_SECONDS = float(os.environ.get("TELEMETRY_INTERVAL_SECONDS", "30"))
+# unsent points kept while the backend is unreachable
+TELEMETRY_MAX_BUFFER = 1000
+
+
+class HttpTelemetrySink:
+    """Signed POSTs to the backend's /v1/training/metrics."""
+
+    def __init__(self, url: str, job_id: str, model_version_id: str):
+        self.url = url
+        self.job_id = job_id
+        self.model_version_id = model_version_id
+
+    def send(self, points: list) -> bool:
+        payload = {"job_id": self.job_id, "model_version_id": self.model_version_id, "points": points}
+        return _signed_post(self.url, payload, timeout=10)
+
+
+class FileTelemetrySink:
+    """
+    The same request bodies, one JSON line per batch, for runs without a
+    metrics URL. The file is kept on the token cache volume
+    (TELEMETRY_DIR), so it outlives the container: fetch it with
+    `modal volume get lora-token-cache telemetry/<model_version_id>.jsonl`
+    and POST each line to /v1/training/metrics, signed like the trainer's
+    requests (_signed_post).
+    """
+
+    def __init__(self, path: Path, job_id: str, model_version_id: str):
+        self.path = Path(path)
+        self.job_id = job_id
+        self.model_version_id = model_version_id
+
+    def send(self, points: list) -> bool:
+        payload = {"job_id": self.job_id, "model_version_id": self.model_version_id, "points": points}
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(payload) + "\n")
+        return True
+
+
+def telemetry_callback(sink, tokens_per_epoch: int, epochs: float, interval_seconds: float = TELEMETRY_INTERVAL_SECONDS):
+    """
+    A TrainerCallback that turns every log (logging_steps) into a point:
+    step / max_steps, epoch, loss, learning rate, grad norm, seconds per
+    step and tokens/s since the previous log, and peak memory (CUDA, else
+    the process's peak RSS). Points are sent to `sink` in batches every
+    interval_seconds, and at the end of training. tokens/s assumes every
+    step trains the run's average number of tokens.
+    """
+    import resource
+
+    import torch
+    from transformers import TrainerCallback
+
+    class TelemetryCallback(TrainerCallback):
+        def __init__(self):
+            self.buffer = []
+            self.sent = 0
+            self.tokens_per_step = None
+            self.last_time = self.last_step = self.last_flush = None
+
+        def _peak_memory_mb(self) -> float:
+            if torch.cuda.is_available():
+                return torch.cuda.max_memory_allocated() / 2 ** 20
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        def _flush(self):
+            if self.buffer and sink.send(self.buffer):
+                self.sent += len(self.buffer)
+                self.buffer = []
+            # backend down for long: keep the latest points only
+            del self.buffer[:-TELEMETRY_MAX_BUFFER]
+            self.last_flush = time.perf_counter()
+
+        def on_train_begin(self, args, state, control, **kwargs):
+            if torch.cuda.is_available():
+                torch.cuda.reset_peak_memory_stats()
+            if state.max_steps:
+                self.tokens_per_step = tokens_per_epoch * epochs / state.max_steps
+            self.last_time = self.last_flush = time.perf_counter()
+            self.last_step = state.global_step
+
+        def on_log(self, args, state, control, logs=None, **kwargs):
+            logs = logs or {}
+            # the summary log after the last step carries train_loss, not loss
+            if "loss" not in logs or state.global_step == self.last_step:
+                return
+
+            now = time.perf_counter()
+            step_seconds = (now - self.last_time) / (state.global_step - self.last_step)
+            self.last_time, self.last_step = now, state.global_step
+
+            self.buffer.append({
+                "step": state.global_step,
+                "max_steps": state.max_steps,
+                "epoch": state.epoch,
+                "loss": logs.get("loss"),
+                "learning_rate": logs.get("learning_rate"),
+                "grad_norm": logs.get("grad_norm"),
+                "step_seconds": round(step_seconds, 4),
+                "tokens_per_second": round(self.tokens_per_step / step_seconds, 1) if self.tokens_per_step else None,
+                "peak_memory_mb": round(self._peak_memory_mb(), 1),
+            })
+
+            if now - self.last_flush >= interval_seconds:
+                self._flush()
+
+        def on_train_end(self, args, state, control, **kwargs):
+            self._flush()
+
+    return TelemetryCallback()
+
 
 @app.function(
     image=image,
     gpu=GPU,
     timeout=60 * 60,      # 1 hour max
     retries=0,
+    volumes={"/cache": token_cache, str(WEIGHTS_DIR): weights},
     secrets=[
         modal.Secret.from_name("hf-platform"),
         modal.Secret.from_name("supabase"),
+        modal.Secret.from_name("training-callback"),
     ],
 )
 def train_lora(
     model_version_id: str,
     json_url: str,
     adapter_config_json: str,
+    job_id: str = None,
+    callback_url: str = None,
+    parent_adapter_url: str = None,
+    replay_json_urls: list = None,
+    metrics_url: str = None,
 ):
     """
     This function runs INSIDE Modal GPU.
@@ -54,7 +632,90 @@ def train_lora(
       - model_version_id
       - json_url (Supabase public URL)
       - adapter_config (from DB)
+      - job_id / callback_url (optional): where to report completion
+      - parent_adapter_url (optional): adapter zip to continue training
+      - replay_json_urls (optional): earlier datasets for replay sampling
+      - metrics_url (optional): where to stream telemetry; without it, the
+        telemetry goes to TELEMETRY_DIR/<model_version_id>.jsonl on the
+        token cache volume (see FileTelemetrySink)
     """
+    payload = {"job_id": job_id, "model_version_id": model_version_id}
+
+    try:
+        result = _run_training(
+            model_version_id,
+            json_url,
+            adapter_config_json,
+            parent_adapter_url,
+            replay_json_urls or [],
+            job_id,
+            metrics_url,
+        )
+    except Exception as e:
+        _post_callback(callback_url, {**payload, "status": "failed", "error": f"{type(e).__name__}: {e}"})
+        raise
+
+    _post_callback(callback_url, {**payload, "status": "succeeded", "result": result})
+    return result
+
+
+def _download_jsonl(url: str, path: Path):
+    # streamed to disk (resumable), never held in memory
+    download = download_url(url, path.with_name(f"{path.name}.download"))
+
+    # the backend exports gzip-compressed JSONL
+    with download.open("rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+
+    if compressed:
+        with gzip.open(download, "rb") as src, path.open("wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        download.unlink()
+    else:
+        os.replace(download, path)
+
+
+def _adapter_store() -> StorageArtifactStore:
+    return StorageArtifactStore(storage_from_env(ADAPTER_BUCKET))
+
+
+def _download_adapter(url: str, adapter_dir: Path):
+    if ".zip" not in url:
+        _adapter_store().download(url, adapter_dir)
+        return
+
+    # versions trained before the artifact store: one zip
+    zip_path = download_url(url, adapter_dir.with_suffix(".zip"))
+    shutil.unpack_archive(str(zip_path), str(adapter_dir), "zip")
+
+
+def sample_replay(new_dataset, replay_datasets: list, fraction: float, seed: int):
+    """
+    new_dataset plus round(fraction * len(new_dataset)) rows drawn uniformly
+    from the pooled replay datasets, shuffled together.
+    """
+    from datasets import concatenate_datasets
+
+    n = min(round(fraction * len(new_dataset)), sum(len(d) for d in replay_datasets))
+    if n <= 0:
+        return new_dataset, 0
+
+    columns = new_dataset.column_names
+    pool = concatenate_datasets([d.select_columns(columns) for d in replay_datasets])
+    replay = pool.shuffle(seed=seed).select(range(n))
+
+    return concatenate_datasets([new_dataset, replay]).shuffle(seed=seed), n
+
+
+def _run_training(
+    model_version_id: str,
+    json_url: str,
+    adapter_config_json: str,
+    parent_adapter_url: str = None,
+    replay_json_urls: list = (),
+    job_id: str = None,
+    metrics_url: str = None,
+):
 
     workdir = Path("/workspace")
     workdir.mkdir(exist_ok=True)
@@ -65,11 +726,14 @@ def train_lora(
     adapter_config = json.loads(adapter_config_json)
 
     # --------------------
-    # 1️⃣ Download JSONL
+    # 1️⃣ Download JSONL (and the earlier versions' for replay)
     # --------------------
-    r = requests.get(json_url, timeout=30)
-    r.raise_for_status()
-    dataset_path.write_bytes(r.content)
+    _download_jsonl(json_url, dataset_path)
+
+    replay_paths = []
+    for i, url in enumerate(replay_json_urls):
+        replay_paths.append(workdir / f"replay_{i}.jsonl")
+        _download_jsonl(url, replay_paths[-1])
 
     # --------------------
     # 2️⃣ Load dataset
@@ -81,13 +745,24 @@ def train_lora(
         data_files=str(dataset_path),
         split="train",
     )
+    new_rows = len(dataset)
+
+    replay_rows = 0
+    if replay_paths:
+        replay_datasets = [load_dataset("json", data_files=str(p), split="train") for p in replay_paths]
+        dataset, replay_rows = sample_replay(
+            dataset,
+            replay_datasets,
+            adapter_config["training"].get("replay_fraction", 0.0),
+            adapter_config["training"]["seed"],
+        )
 
     # --------------------
     # 3️⃣ Load base model (QLoRA)
     # --------------------
     import torch
     from transformers import AutoModelForCausalLM, AutoTokenizer
-    from peft import LoraConfig, get_peft_model
+    from peft import LoraConfig, PeftModel, get_peft_model
 
     base_model = adapter_config["base_model"]
     lora_cfg_raw = adapter_config["lora"]
@@ -95,15 +770,23 @@ def train_lora(
 
     hf_token = os.environ["HF_TOKEN"]
 
-    tokenizer = AutoTokenizer.from_pretrained(base_model, token=hf_token)
+    # from the weights volume; the hub only on a cache miss
+    weights.reload()
+    model_dir, weights_report = weight_cache.ensure(base_model, "main", WEIGHTS_DIR, hf_token)
+    weights.commit()
+
+    started = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
     tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "right"
 
     model = AutoModelForCausalLM.from_pretrained(
-        base_model,
-        token=hf_token,
+        model_dir,
         load_in_4bit=True,
         device_map="auto",
     )
+    weights_report["load_seconds"] = round(time.perf_counter() - started, 1)
+    print(f"train_lora {model_version_id}: weights {weights_report}")
 
     lora_cfg = LoraConfig(
         r=lora_cfg_raw["r"],
@@ -114,7 +797,14 @@ def train_lora(
     )
 
 
-    model = get_peft_model(model, lora_cfg)
+    if parent_adapter_url:
+        # warm start: keep training the parent version's LoRA weights (its
+        # saved alpha / dropout apply; the backend checked r and modules)
+        parent_dir = workdir / "parent_adapter"
+        _download_adapter(parent_adapter_url, parent_dir)
+        model = PeftModel.from_pretrained(model, str(parent_dir), is_trainable=True)
+    else:
+        model = get_peft_model(model, lora_cfg)
 
     model.gradient_checkpointing_enable()
     model.enable_input_require_grads()
@@ -125,25 +815,14 @@ def train_lora(
     # --------------------
     from transformers import TrainingArguments, Trainer
 
-    def tokenize(row):
-        text = f"""### Instruction:
-{row['instruction']}
+    padding = training_cfg.get("padding", DEFAULT_PADDING)
+    max_seq_length = training_cfg.get("max_seq_length", DEFAULT_MAX_SEQ_LENGTH)
 
-### Input:
-{row['input']}
-
-### Output:
-{row['output']}"""
-        tokens = tokenizer(
-            text,
-            truncation=True,
-            padding="max_length",
-            max_length=256,
-        )
-        tokens["labels"] = tokens["input_ids"]
-        return tokens
-
-    tokenized = dataset.map(tokenize, remove_columns=dataset.column_names)
+    # pick up shards committed by other runs since this container started
+    token_cache.reload()
+    tokenized, data_report = build_train_dataset(dataset, tokenizer, padding, max_seq_length, TOKEN_CACHE_DIR)
+    token_cache.commit()
+    print(f"train_lora {model_version_id}: {padding} @ {max_seq_length} {data_report}")
 
     training_args = TrainingArguments(
         output_dir=str(adapter_dir),
@@ -156,69 +835,87 @@ def train_lora(
         save_strategy="no",
         report_to="none",
         optim="paged_adamw_8bit",
+        **sampling_arguments(padding),
     )
 
+    if metrics_url and job_id:
+        sink = HttpTelemetrySink(metrics_url, job_id, model_version_id)
+    else:
+        telemetry_dir = Path(os.environ.get("TELEMETRY_DIR", str(TELEMETRY_DIR)))
+        telemetry_dir.mkdir(parents=True, exist_ok=True)
+        sink = FileTelemetrySink(telemetry_dir / f"{model_version_id}.jsonl", job_id, model_version_id)
+    telemetry = telemetry_callback(sink, data_report["tokens"], training_cfg["epochs"])
 
     trainer = Trainer(
         model=model,
         args=training_args,
         train_dataset=tokenized,
+        data_collator=data_collator(tokenizer, padding),
+        callbacks=[telemetry],
     )
 
-    trainer.train()
+    try:
+        metrics = trainer.train().metrics
+    finally:
+        if isinstance(sink, FileTelemetrySink):
+            # keep the points of a failed run too
+            token_cache.commit()
+    runtime = metrics.get("train_runtime") or 0
+    data_report["tokens_per_second"] = round(data_report["tokens"] * training_cfg["epochs"] / runtime, 1) if runtime else None
 
     # --------------------
     # 5️⃣ Save adapter
     # --------------------
     adapter_dir.mkdir(exist_ok=True)
-    model.save_pretrained(adapter_dir)
+    model.save_pretrained(adapter_dir, safe_serialization=True)
     tokenizer.save_pretrained(adapter_dir)
 
     # --------------------
-    # 5.5️⃣ Zip adapter
+    # 5.5️⃣ Publish to the artifact store (deduplicated, parallel)
     # --------------------
-
-    zip_path = workdir / f"{model_version_id}.zip"
-
-    shutil.make_archive(
-        base_name=str(zip_path).replace(".zip", ""),
-        format="zip",
-        root_dir=str(adapter_dir),
-    )
-
-    # --------------------
-    # 5.6️⃣ Upload to Supabase
-    # --------------------
-    supabase = create_client(
-        os.environ["SUPABASE_URL"],
-        os.environ["SUPABASE_SERVICE_ROLE_KEY"],
-    )
-
-    BUCKET = "lora-adapters"
-    object_path = f"{model_version_id}/adapter.zip"
-
-    with zip_path.open("rb") as f:
-        supabase.storage.from_(BUCKET).upload(
-            path=object_path,
-            file=f,
-            file_options={
-                "content-type": "application/zip",
-                "upsert": "true",
-            },
-        )
-
-    adapter_url = supabase.storage.from_(BUCKET).get_public_url(object_path)
-    
+    artifact = _adapter_store().publish(model_version_id, adapter_dir)
+    print(f"train_lora {model_version_id}: artifact {artifact}")
 
     # --------------------
     # 6️⃣ Return metadata
     # --------------------
     return {
         "model_version_id": model_version_id,
-        "adapter_dir": str(adapter_url),
+        # the manifest url; kept under the old key the backend reads
+        "adapter_dir": artifact["ref"],
+        "sha256": artifact["sha256"],
+        "artifact": artifact,
         "files": [p.name for p in adapter_dir.iterdir()],
+        "data": {"padding": padding, "max_seq_length": max_seq_length, **data_report},
+        "warm_start_from": parent_adapter_url,
+        "new_rows": new_rows,
+        "replay_rows": replay_rows,
+        "weights": weights_report,
+        "telemetry": {
+            "sink": metrics_url if isinstance(sink, HttpTelemetrySink) else str(sink.path),
+            "points_sent": telemetry.sent,
+        },
     }
 
 
+@app.function(
+    image=image,
+    timeout=2 * 60 * 60,
+    volumes={str(WEIGHTS_DIR): weights},
+    secrets=[modal.Secret.from_name("hf-platform")],
+)
+def prefetch_weights(models: list, refresh: bool = False, check: bool = False) -> list:
+    """
+    Download (repo_id, revision) pairs into the weights volume ahead of the
+    jobs; CPU only. refresh moves branch pins to the current commit, check
+    re-hashes the cached files first (see weight_cache).
+    """
+    weights.reload()
+    try:
+        return weight_cache.prefetch(models, WEIGHTS_DIR, os.environ.get("HF_TOKEN"), refresh, check)
+    finally:
+        weights.commit()
+
+
 if __name__ == "__main__":
     app.run()
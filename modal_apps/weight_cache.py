@@ -0,0 +1,278 @@
+"""
+Model weights for the GPU jobs, cached in a directory that outlives the
+container (a Modal Volume, or any local directory):
+
+  <root>/pins.json                        {"<repo_id>@<branch>": commit}
+  <root>/<org>--<name>/<commit>/          the snapshot (weights, config, tokenizer)
+  <root>/<org>--<name>/<commit>/.cache.json
+      {"repo_id", "revision", "files": [{"path", "sha256", "size"}], "bytes", "last_used"}
+
+A snapshot is downloaded into a temporary directory, every weight file is
+checked against the sha256 the hub publishes for it, and the directory is
+renamed into place, so a snapshot with .cache.json is complete. Loading
+only compares file sizes with .cache.json; verify() re-hashes everything.
+
+Branches are pinned: the first download of "<repo>@main" records the
+commit, and every later job gets those same weights until a prefetch with
+refresh=True moves the pin. Before a download, the least recently used
+snapshots are evicted until the new one fits: within MAX_BYTES if it is
+set, else with MIN_FREE_BYTES of free disk to spare. Free disk space says
+nothing about a Modal Volume's capacity, so the Modal apps always set
+WEIGHT_CACHE_MAX_GB.
+
+The root is shared by containers running at the same time, so eviction
+never removes a snapshot used within LEASE_SECONDS (the longest job
+timeout): another container may be loading it, or have it memory-mapped.
+A container holding weights for longer renews its lease with touch().
+
+Needs huggingface_hub (a transformers dependency) only for downloads.
+"""
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+try:
+    from storage import ChecksumError, file_sha256
+except ImportError:  # the backend imports this module as modal_apps.weight_cache
+    from modal_apps.storage import ChecksumError, file_sha256
+
+
+GB = 1024 ** 3
+DEFAULT_ROOT = Path(os.environ.get("WEIGHT_CACHE_DIR", "/weights"))
+MIN_FREE_BYTES = int(float(os.environ.get("WEIGHT_CACHE_MIN_FREE_GB", "10")) * GB)
+MAX_BYTES = int(float(os.environ.get("WEIGHT_CACHE_MAX_GB", "0")) * GB) or None
+# prefetch_weights, the longest job, runs for up to 2 hours
+LEASE_SECONDS = float(os.environ.get("WEIGHT_CACHE_LEASE_HOURS", "2")) * 3600
+
+META = ".cache.json"
+PINS = "pins.json"
+# a temporary download directory this old belongs to a container that died
+PARTIAL_MAX_AGE_SECONDS = 6 * 3600
+
+# configs, tokenizers, generation settings
+SMALL_FILES = (".json", ".model", ".txt", ".tiktoken", ".py")
+
+
+def _is_commit(revision: str) -> bool:
+    return bool(re.fullmatch(r"[0-9a-f]{40}", revision or ""))
+
+
+def _entry_dir(root: Path, repo_id: str, commit: str) -> Path:
+    return Path(root) / repo_id.replace("/", "--") / commit
+
+
+def _read_json(path: Path, default):
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else default
+
+
+def _write_json(path: Path, data):
+    # rename over the old file, so readers never see half of it
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def entries(root: Path = DEFAULT_ROOT) -> list:
+    """(directory, metadata) of every complete snapshot, least recently used first."""
+    found = [
+        (meta.parent, _read_json(meta, {}))
+        for meta in Path(root).glob(f"*/*/{META}")
+        if not meta.parent.name.startswith(".")
+    ]
+    return sorted(found, key=lambda e: e[1].get("last_used", 0))
+
+
+def resolve(repo_id: str, revision: str = "main", root: Path = DEFAULT_ROOT,
+            token: str = None, refresh: bool = False) -> str:
+    """The commit to load for `revision`: itself if it is one, else the pinned commit."""
+    if _is_commit(revision):
+        return revision
+
+    pins_path = Path(root) / PINS
+    pins = _read_json(pins_path, {})
+    key = f"{repo_id}@{revision}"
+
+    if key not in pins or refresh:
+        from huggingface_hub import HfApi
+
+        pins[key] = HfApi().model_info(repo_id, revision=revision, token=token).sha
+        Path(root).mkdir(parents=True, exist_ok=True)
+        _write_json(pins_path, pins)
+        print(f"weight_cache: pinned {key} to {pins[key]}")
+
+    return pins[key]
+
+
+def _remote_files(repo_id: str, commit: str, token: str = None) -> list:
+    """
+    (path, size, sha256 or None) of the files a job needs: top-level only
+    (sub-folders hold other formats, e.g. Llama's original/ or onnx/),
+    safetensors if the repo has them, else .bin.
+    """
+    from huggingface_hub import HfApi
+
+    info = HfApi().model_info(repo_id, revision=commit, token=token, files_metadata=True)
+    siblings = [s for s in info.siblings if "/" not in s.rfilename]
+
+    weights = [s for s in siblings if s.rfilename.endswith(".safetensors")]
+    if not weights:
+        weights = [s for s in siblings if s.rfilename.endswith(".bin")]
+    small = [s for s in siblings if s.rfilename.endswith(SMALL_FILES)]
+
+    return [
+        (s.rfilename, s.size or 0, s.lfs.sha256 if s.lfs else None)
+        for s in weights + small
+    ]
+
+
+def _download(repo_id: str, commit: str, paths: list, dest: Path, token: str = None):
+    from huggingface_hub import snapshot_download
+
+    snapshot_download(repo_id, revision=commit, local_dir=str(dest), allow_patterns=paths, token=token)
+
+
+def _cache_bytes(root: Path) -> int:
+    return sum(meta.get("bytes", 0) for _, meta in entries(root))
+
+
+def touch(directory: Path):
+    """Mark a snapshot used now, renewing its lease against evict()."""
+    meta_path = Path(directory) / META
+    meta = _read_json(meta_path, None)
+    if meta is not None:
+        meta["last_used"] = time.time()
+        _write_json(meta_path, meta)
+
+
+def evict(root: Path, need_bytes: int, keep=()) -> list:
+    """
+    Remove least recently used snapshots until `need_bytes` more fit,
+    never those in `keep` or used within LEASE_SECONDS. Returns the
+    evicted "<repo_id>@<commit>"s. Downloads abandoned by a killed
+    container go first.
+    """
+    root = Path(root)
+    evicted = []
+    leased_since = time.time() - LEASE_SECONDS
+
+    for partial in root.glob("*/.*"):
+        if partial.is_dir() and time.time() - partial.stat().st_mtime > PARTIAL_MAX_AGE_SECONDS:
+            shutil.rmtree(partial, ignore_errors=True)
+
+    def fits() -> bool:
+        if MAX_BYTES is not None:
+            return _cache_bytes(root) + need_bytes <= MAX_BYTES
+        return shutil.disk_usage(root).free - need_bytes >= MIN_FREE_BYTES
+
+    for directory, meta in entries(root):
+        if fits():
+            break
+        if directory in keep or meta.get("last_used", 0) > leased_since:
+            continue
+        shutil.rmtree(directory)
+        if not any(directory.parent.iterdir()):
+            directory.parent.rmdir()
+        evicted.append(f"{meta.get('repo_id')}@{meta.get('revision')}")
+        print(f"weight_cache: evicted {evicted[-1]} ({meta.get('bytes', 0) / GB:.1f} GB)")
+
+    if not fits():
+        print(f"weight_cache: {need_bytes / GB:.1f} GB needed, cache cannot free enough "
+              f"(snapshots in use are kept); trying anyway")
+
+    return evicted
+
+
+def _sizes_match(directory: Path, meta: dict) -> bool:
+    return all(
+        (directory / f["path"]).is_file() and (directory / f["path"]).stat().st_size == f["size"]
+        for f in meta["files"]
+    )
+
+
+def ensure(repo_id: str, revision: str = "main", root: Path = DEFAULT_ROOT,
+           token: str = None, refresh: bool = False):
+    """
+    Local directory of `repo_id` at `revision`, downloading it on a miss.
+    Returns (directory, report) with repo_id, revision (the commit),
+    cached, download_seconds, bytes, evicted.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    commit = resolve(repo_id, revision, root, token, refresh)
+    directory = _entry_dir(root, repo_id, commit)
+    meta_path = directory / META
+
+    report = {"repo_id": repo_id, "revision": commit, "cached": True, "download_seconds": 0.0, "evicted": []}
+
+    meta = _read_json(meta_path, None)
+    if meta is not None and _sizes_match(directory, meta):
+        touch(directory)
+        return directory, {**report, "bytes": meta["bytes"]}
+
+    started = time.perf_counter()
+    files = _remote_files(repo_id, commit, token)
+    need = sum(size for _, size, _ in files)
+    report["evicted"] = evict(root, need, keep={directory})
+
+    tmp = directory.with_name(f".{commit}.{uuid.uuid4().hex}")
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        _download(repo_id, commit, [path for path, _, _ in files], tmp, token)
+
+        listed = []
+        for path, size, expected in files:
+            digest = file_sha256(tmp / path)
+            if expected and digest != expected:
+                raise ChecksumError(f"{repo_id}@{commit}: sha256 mismatch for {path}")
+            listed.append({"path": path, "sha256": digest, "size": (tmp / path).stat().st_size})
+
+        meta = {
+            "repo_id": repo_id,
+            "revision": commit,
+            "files": listed,
+            "bytes": sum(f["size"] for f in listed),
+            "last_used": time.time(),
+        }
+        _write_json(tmp / META, meta)
+
+        # an incomplete snapshot (size check failed) is replaced
+        if directory.exists():
+            shutil.rmtree(directory)
+        os.replace(tmp, directory)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not any(tmp.parent.iterdir()):
+            tmp.parent.rmdir()
+
+    report.update(cached=False, download_seconds=round(time.perf_counter() - started, 1), bytes=meta["bytes"])
+    print(f"weight_cache: downloaded {repo_id}@{commit} ({meta['bytes'] / GB:.2f} GB) in {report['download_seconds']}s")
+    return directory, report
+
+
+def verify(root: Path = DEFAULT_ROOT) -> list:
+    """Re-hash every cached file; snapshots that no longer match are removed."""
+    broken = []
+    for directory, meta in entries(root):
+        for f in meta["files"]:
+            path = directory / f["path"]
+            if not path.is_file() or file_sha256(path) != f["sha256"]:
+                broken.append(f"{meta['repo_id']}@{meta['revision']}")
+                print(f"weight_cache: {broken[-1]}: {f['path']} is damaged, removing the snapshot")
+                shutil.rmtree(directory)
+                break
+    return broken
+
+
+def prefetch(models: list, root: Path = DEFAULT_ROOT, token: str = None,
+             refresh: bool = False, check: bool = False) -> list:
+    """
+    ensure() every (repo_id, revision) in `models`; with check, verify()
+    the whole cache first. Returns one report per model.
+    """
+    if check:
+        verify(root)
+    return [ensure(repo_id, revision, root, token, refresh)[1] for repo_id, revision in models]